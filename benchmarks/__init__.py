@@ -0,0 +1,21 @@
+"""
+API Benchmarks
+Synthetic catalog generation and in-process latency benchmarks; not part of
+the test suite. Generated databases go to benchmarks/data and results to
+benchmarks/results.
+"""
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent / "data"
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def default_catalog_path(card_count):
+    """benchmarks/data/catalog-<scale>.db, e.g. catalog-20k.db"""
+    if card_count % 1_000_000 == 0:
+        label = f"{card_count // 1_000_000}m"
+    elif card_count % 1000 == 0:
+        label = f"{card_count // 1000}k"
+    else:
+        label = str(card_count)
+    return DATA_DIR / f"catalog-{label}.db"
@@ -0,0 +1,334 @@
+"""
+Synthetic Catalog Generator
+Builds an API database with the schema from models.py filled with generated
+sets and cards at a chosen scale, with realistic fan-out (types, subtypes,
+attacks, abilities, weaknesses, resistances, variants), then runs the same
+post-processing as a sync: stored sort keys, search index, pre-rendered
+documents and the data generation counter.
+
+Usage:
+    python -m benchmarks.generate_catalog --cards 20000
+    python -m benchmarks.generate_catalog --cards 200000 --output benchmarks/data/catalog-200k.db
+"""
+import sys
+import json
+import random
+import sqlite3
+import argparse
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine
+
+from pokemontcg.models import Base
+from pokemontcg.sort_keys import number_sort_key, rarity_rank, hp_value
+from pokemontcg.search import ensure_search_index, refresh_card_search
+from pokemontcg.documents import refresh_card_documents, refresh_set_documents
+from pokemontcg.generation import bump_generation
+from benchmarks import default_catalog_path
+
+TYPES = ['Colorless', 'Darkness', 'Dragon', 'Fairy', 'Fighting', 'Fire', 'Grass', 'Lightning', 'Metal', 'Psychic', 'Water']
+POKEMON_SUBTYPES = ['Basic', 'Stage 1', 'Stage 2', 'EX', 'GX', 'V', 'VMAX', 'VSTAR', 'ex', 'Tera', 'MEGA', 'BREAK', 'Restored']
+TRAINER_SUBTYPES = ['Item', 'Supporter', 'Stadium', 'Pokémon Tool', 'ACE SPEC', 'Technical Machine']
+ENERGY_SUBTYPES = ['Basic', 'Special']
+SUPERTYPES = ['Pokémon', 'Trainer', 'Energy']
+
+# (rarity, weight): most cards are commons and uncommons
+RARITIES = [
+    ('Common', 35), ('Uncommon', 28), ('Rare', 12), ('Rare Holo', 8), ('Rare Holo EX', 2),
+    ('Rare Holo GX', 2), ('Rare Holo V', 2), ('Rare Ultra', 3), ('Double Rare', 2),
+    ('Illustration Rare', 2), ('Rare Secret', 1), ('Hyper Rare', 1), ('Promo', 2), (None, 1)
+]
+VARIANT_TYPES = ['Normal', 'Holofoil', 'Reverse Holofoil', '1st Edition Holofoil', '1st Edition Normal']
+REGULATION_MARKS = ['D', 'E', 'F', 'G', 'H']
+SERIES = ['Base', 'Gym', 'Neo', 'E-Card', 'EX', 'Diamond & Pearl', 'Platinum', 'HeartGold & SoulSilver',
+          'Black & White', 'XY', 'Sun & Moon', 'Sword & Shield', 'Scarlet & Violet']
+
+NAME_PARTS = ['Char', 'Squir', 'Bulba', 'Pika', 'Eev', 'Gen', 'Drag', 'Lu', 'Mew', 'Snor', 'Gyar', 'Alak',
+              'Mach', 'Geo', 'Ony', 'Vapo', 'Jol', 'Flar', 'Tyra', 'Luca', 'Gard', 'Sala', 'Meta', 'Rayq']
+NAME_ENDINGS = ['mander', 'tle', 'saur', 'chu', 'ee', 'gar', 'onite', 'gia', 'two', 'lax', 'ados', 'kazam',
+                'amp', 'dude', 'ix', 'reon', 'teon', 'eon', 'nitar', 'rio', 'voir', 'mence', 'gross', 'uaza']
+TRAINER_NAMES = ['Professor\'s Research', 'Boss\'s Orders', 'Ultra Ball', 'Nest Ball', 'Switch', 'Rare Candy',
+                 'Energy Retrieval', 'Potion', 'Judge', 'Marnie', 'Iono', 'Arven', 'Path to the Peak', 'Choice Belt']
+ATTACK_WORDS = ['Flame', 'Tackle', 'Thunder', 'Hydro', 'Leaf', 'Psychic', 'Shadow', 'Iron', 'Dragon', 'Quick',
+                'Blast', 'Claw', 'Beam', 'Strike', 'Wave', 'Crush', 'Bite', 'Pulse']
+ATTACK_TEXTS = [
+    'Discard an Energy attached to this Pokémon.',
+    'Flip a coin. If heads, your opponent\'s Active Pokémon is now Paralyzed.',
+    'Your opponent\'s Active Pokémon is now Burned.',
+    'This attack does 10 damage to each of your opponent\'s Benched Pokémon.',
+    'Heal 30 damage from this Pokémon.',
+    'Draw 2 cards.',
+    None
+]
+ABILITY_TEXTS = [
+    'Once during your turn, you may draw a card.',
+    'Prevent all damage done to this Pokémon by attacks from Basic Pokémon.',
+    'Once during your turn, you may attach a basic Energy card from your hand to 1 of your Pokémon.'
+]
+
+
+def pokemon_names(rnd, count):
+    """Pool of made-up Pokémon names, so names repeat across sets like reprints do"""
+    names = sorted({a + b for a in NAME_PARTS for b in NAME_ENDINGS})
+    rnd.shuffle(names)
+    return names[:count]
+
+
+def insert_rows(cursor, table, rows):
+    """executemany an INSERT for dict rows that share the same keys"""
+    if not rows:
+        return
+    columns = list(rows[0])
+    cursor.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        [tuple(row[column] for column in columns) for row in rows]
+    )
+
+
+class CatalogGenerator:
+    """Generates one set at a time with a seeded random source"""
+
+    def __init__(self, seed=42):
+        self.rnd = random.Random(seed)
+        self.names = pokemon_names(self.rnd, 500)
+        self.rarities = [rarity for rarity, _ in RARITIES]
+        self.rarity_weights = [weight for _, weight in RARITIES]
+        self.next_product_id = 100000
+
+    def make_set(self, index, set_count):
+        """Set row; sets are released roughly monthly, oldest first"""
+        year = 1999 + index * 26 // max(set_count, 1)
+        month = 1 + index % 12
+        series = SERIES[min(index * len(SERIES) // max(set_count, 1), len(SERIES) - 1)]
+        recent = index >= set_count * 0.9
+        return {
+            'id': f'syn{index}',
+            'name': f'Synthetic Set {index}',
+            'series': series,
+            'printed_total': 0,
+            'total': 0,
+            'ptcgo_code': f'S{index % 1000:03d}',
+            'release_date': f'{year}/{month:02d}/{1 + index % 28:02d}',
+            'updated_at': f'{year}/{month:02d}/{1 + index % 28:02d} 10:00:00',
+            'standard_legal': recent,
+            'expanded_legal': index >= set_count * 0.5,
+            'unlimited_legal': True,
+            'symbol_url': f'https://images.pokemontcg.io/syn{index}/symbol.png',
+            'logo_url': f'https://images.pokemontcg.io/syn{index}/logo.png',
+            'created_at': '2025-01-01 00:00:00',
+            'synced_at': '2025-01-01 00:00:00'
+        }
+
+    def make_cards(self, set_row, size, recent):
+        """Cards of one set and their child rows, as {table: [rows]}"""
+        rnd = self.rnd
+        tables = {name: [] for name in [
+            'cards', 'card_types', 'card_subtypes', 'attacks', 'abilities',
+            'weaknesses', 'resistances', 'card_variants'
+        ]}
+        secret_start = int(size * 0.92)
+
+        for position in range(size):
+            number = str(position + 1) if position < secret_start or rnd.random() < 0.5 else f'TG{position + 1:02d}'
+            card_id = f"{set_row['id']}-{number}"
+            roll = rnd.random()
+            supertype = 'Pokémon' if roll < 0.75 else 'Trainer' if roll < 0.95 else 'Energy'
+            rarity = rnd.choices(self.rarities, self.rarity_weights)[0]
+            if position >= secret_start:
+                rarity = rnd.choice(['Rare Secret', 'Hyper Rare', 'Illustration Rare'])
+
+            if supertype == 'Pokémon':
+                name = rnd.choice(self.names)
+                hp = str(rnd.randint(3, 34) * 10)
+                types = rnd.sample(TYPES, 2 if rnd.random() < 0.08 else 1)
+                subtypes = [rnd.choice(POKEMON_SUBTYPES[:3])] + ([rnd.choice(POKEMON_SUBTYPES[3:])] if rnd.random() < 0.2 else [])
+                retreat = rnd.randint(0, 4)
+            elif supertype == 'Trainer':
+                name, hp, types, retreat = rnd.choice(TRAINER_NAMES), None, [], None
+                subtypes = [rnd.choice(TRAINER_SUBTYPES)]
+            else:
+                energy_type = rnd.choice(TYPES)
+                name, hp, types, retreat = f'{energy_type} Energy', None, [], None
+                subtypes = [rnd.choice(ENERGY_SUBTYPES)]
+
+            market_price = round(rnd.lognormvariate(0, 1.2), 2)
+            tables['cards'].append({
+                'id': card_id,
+                'name': name,
+                'supertype': supertype,
+                'hp': hp,
+                'level': None,
+                'set_id': set_row['id'],
+                'number': number,
+                'evolves_from': rnd.choice(self.names) if 'Stage 1' in subtypes or 'Stage 2' in subtypes else None,
+                'evolves_to': json.dumps([rnd.choice(self.names)]) if supertype == 'Pokémon' and rnd.random() < 0.4 else None,
+                'rules': json.dumps(['You may play only 1 Supporter card during your turn.']) if 'Supporter' in subtypes else None,
+                'flavor_text': 'It lives in a synthetic habitat far from any real data.' if supertype == 'Pokémon' and rnd.random() < 0.6 else None,
+                'artist': f'Artist {rnd.randint(1, 150)}',
+                'rarity': rarity,
+                'regulation_mark': rnd.choice(REGULATION_MARKS) if recent else None,
+                'retreat_cost': json.dumps(['Colorless'] * retreat) if retreat else None,
+                'converted_retreat_cost': retreat,
+                'national_pokedex_numbers': json.dumps([rnd.randint(1, 1025)]) if supertype == 'Pokémon' else None,
+                'standard_legal': set_row['standard_legal'],
+                'expanded_legal': set_row['expanded_legal'],
+                'unlimited_legal': True,
+                'standard_banned': False,
+                'expanded_banned': False,
+                'image_small': None,
+                'image_large': None,
+                'tcgplayer_url': f'https://prices.pokemontcg.io/tcgplayer/{card_id}',
+                'tcgplayer_updated_at': '2025/01/01',
+                'market_price': market_price,
+                'low_price': round(market_price * 0.7, 2),
+                'mid_price': round(market_price * 1.1, 2),
+                'high_price': round(market_price * 3, 2),
+                'cardmarket_url': f'https://prices.pokemontcg.io/cardmarket/{card_id}',
+                'cardmarket_updated_at': '2025/01/01',
+                'cardmarket_avg_price': round(market_price * 0.9, 2),
+                'cardmarket_low_price': round(market_price * 0.5, 2),
+                'cardmarket_trend_price': round(market_price * 0.95, 2),
+                'set_release_date': set_row['release_date'],
+                'number_sort': number_sort_key(number),
+                'rarity_rank': rarity_rank(rarity),
+                'hp_value': hp_value(hp),
+                'created_at': '2025-01-01 00:00:00',
+                'synced_at': '2025-01-01 00:00:00'
+            })
+            tables['card_types'] += [{'card_id': card_id, 'type_name': type_name} for type_name in types]
+            tables['card_subtypes'] += [{'card_id': card_id, 'subtype_name': subtype} for subtype in subtypes]
+
+            if supertype == 'Pokémon':
+                for _ in range(rnd.choice([1, 1, 2, 2, 2, 3])):
+                    cost = rnd.randint(1, 4)
+                    tables['attacks'].append({
+                        'card_id': card_id,
+                        'name': f'{rnd.choice(ATTACK_WORDS)} {rnd.choice(ATTACK_WORDS)}',
+                        'cost': json.dumps([types[0]] + ['Colorless'] * (cost - 1)),
+                        'converted_energy_cost': cost,
+                        'damage': str(cost * rnd.choice([10, 20, 30])) if rnd.random() < 0.85 else None,
+                        'text': rnd.choice(ATTACK_TEXTS)
+                    })
+                if rnd.random() < 0.2:
+                    tables['abilities'].append({
+                        'card_id': card_id,
+                        'name': f'{rnd.choice(ATTACK_WORDS)} Aura',
+                        'text': rnd.choice(ABILITY_TEXTS),
+                        'ability_type': 'Ability'
+                    })
+                tables['weaknesses'].append({'card_id': card_id, 'type': rnd.choice(TYPES), 'value': '×2'})
+                if rnd.random() < 0.3:
+                    tables['resistances'].append({'card_id': card_id, 'type': rnd.choice(TYPES), 'value': '-30'})
+
+            # One to three printings, each with its own TCGplayer product
+            for variant_type in rnd.sample(VARIANT_TYPES[:3], rnd.choice([1, 1, 2, 2, 3])):
+                self.next_product_id += 1
+                price = round(market_price * rnd.uniform(0.8, 2.5), 2)
+                tables['card_variants'].append({
+                    'card_id': card_id,
+                    'variant_type': variant_type,
+                    'tcgplayer_product_id': self.next_product_id,
+                    'tcgplayer_url': f'https://www.tcgplayer.com/product/{self.next_product_id}',
+                    'tcgplayer_sku_id': None,
+                    'market_price': price,
+                    'low_price': round(price * 0.7, 2),
+                    'mid_price': round(price * 1.1, 2),
+                    'high_price': round(price * 3, 2),
+                    'direct_low_price': None,
+                    'cardmarket_url': None,
+                    'cardmarket_avg_price': None,
+                    'cardmarket_low_price': None,
+                    'cardmarket_trend_price': None,
+                    'is_available': True,
+                    'last_price_update': '2025-01-01 00:00:00',
+                    'created_at': '2025-01-01 00:00:00',
+                    'updated_at': '2025-01-01 00:00:00'
+                })
+
+        return tables
+
+
+def set_sizes(rnd, card_count, average=170):
+    """Split card_count into set sizes averaging `average` (small promo sets to big expansions)"""
+    sizes = []
+    remaining = card_count
+    while remaining > 0:
+        size = min(remaining, max(10, int(rnd.gauss(average, average / 2.5))))
+        sizes.append(size)
+        remaining -= size
+    return sizes
+
+
+def generate_catalog(path, card_count, seed=42, documents=True):
+    """Create a fresh synthetic database at path with card_count cards"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        path.unlink()
+
+    engine = create_engine(f'sqlite:///{path.as_posix()}')
+    Base.metadata.create_all(engine)
+    ensure_search_index(engine)
+    engine.dispose()
+
+    generator = CatalogGenerator(seed)
+    sizes = set_sizes(generator.rnd, card_count)
+    started = time.perf_counter()
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    cursor = conn.cursor()
+
+    # Reference tables
+    insert_rows(cursor, 'types', [{'name': name} for name in TYPES])
+    insert_rows(cursor, 'subtypes', [{'name': name} for name in sorted(set(POKEMON_SUBTYPES + TRAINER_SUBTYPES + ENERGY_SUBTYPES))])
+    insert_rows(cursor, 'supertypes', [{'name': name} for name in SUPERTYPES])
+    insert_rows(cursor, 'rarities', [{'name': name} for name, _ in RARITIES if name])
+
+    written = 0
+    for index, size in enumerate(sizes):
+        set_row = generator.make_set(index, len(sizes))
+        set_row['printed_total'] = set_row['total'] = size
+        tables = generator.make_cards(set_row, size, recent=index >= len(sizes) * 0.8)
+        insert_rows(cursor, 'sets', [set_row])
+        for table, rows in tables.items():
+            insert_rows(cursor, table, rows)
+        conn.commit()
+
+        card_ids = [card['id'] for card in tables['cards']]
+        refresh_card_search(conn, card_ids)
+        if documents:
+            refresh_set_documents(conn, [set_row['id']])
+            refresh_card_documents(conn, card_ids)
+
+        written += size
+        if (index + 1) % 100 == 0 or index + 1 == len(sizes):
+            print(f"  {written:,}/{card_count:,} cards in {index + 1} sets ({time.perf_counter() - started:.0f}s)")
+
+    bump_generation(conn)
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.close()
+    return {"path": str(path), "cards": written, "sets": len(sizes), "seconds": round(time.perf_counter() - started, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Pokemon TCG catalog database')
+    parser.add_argument('--cards', type=int, default=20000, help='Number of cards (e.g. 20000, 200000, 2000000)')
+    parser.add_argument('--output', type=str, help='Database path (default benchmarks/data/catalog-<scale>.db)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--no-documents', action='store_true', help='Skip pre-rendered documents (exercises the enrichment fallback)')
+    args = parser.parse_args()
+
+    path = args.output or default_catalog_path(args.cards)
+    print(f"Generating {args.cards:,} cards into {path}")
+    result = generate_catalog(path, args.cards, args.seed, documents=not args.no_documents)
+    print(f"Done: {result['cards']:,} cards in {result['sets']} sets ({result['seconds']}s)")
+
+
+if __name__ == '__main__':
+    main()
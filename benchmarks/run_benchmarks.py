@@ -0,0 +1,342 @@
+"""
+API Latency Benchmarks
+Drives every /cards sort mode and filter combination, search, batch and
+single-card lookups, /sets and the reference lists, and the TCGplayer proxy
+routes through an in-process client against a synthetic catalog, reporting
+p50/p95/p99 latency and SQL statements per request. Results are written as
+JSON so runs can be compared between commits.
+
+Usage:
+    python -m benchmarks.run_benchmarks --cards 20000
+    python -m benchmarks.run_benchmarks --db benchmarks/data/catalog-200k.db --requests 100
+    python -m benchmarks.run_benchmarks --cards 20000 --compare benchmarks/results/<earlier run>.json
+"""
+import os
+import sys
+import json
+import random
+import sqlite3
+import argparse
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks import RESULTS_DIR, default_catalog_path
+
+# Filter values the synthetic catalog is known to contain
+FILTERS = {
+    'name': ['char', 'saur', 'Ultra Ball', 'eon'],
+    'supertype': ['Pokémon', 'Trainer', 'Energy'],
+    'subtype': ['Basic', 'Stage 2', 'VMAX', 'Supporter', 'Item'],
+    'rarity': ['Common', 'Rare Holo', 'Rare Secret', 'Promo'],
+    'type': ['Fire', 'Water', 'Dragon', 'Psychic']
+}
+COMBINATIONS = [
+    ('type', 'rarity'), ('supertype', 'subtype'), ('set_id', 'type'),
+    ('name', 'type'), ('type', 'subtype', 'rarity')
+]
+SEARCH_TERMS = ['flame', 'burned', 'draw cards', 'paralyzed', 'energy', 'dragon pulse']
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def git_commit():
+    """Short commit hash of the working tree, or None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=Path(__file__).parent.parent, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class CatalogSample:
+    """IDs and values read from the benchmark database to build requests from"""
+
+    def __init__(self, db_path, rnd):
+        conn = sqlite3.connect(db_path)
+        self.card_ids = [row[0] for row in conn.execute("SELECT id FROM cards")]
+        self.set_ids = [row[0] for row in conn.execute("SELECT id FROM sets")]
+        self.pokemon = conn.execute(
+            "SELECT set_id, name, number FROM cards WHERE supertype = 'Pokémon' ORDER BY RANDOM() LIMIT 200"
+        ).fetchall()
+        conn.close()
+        self.rnd = rnd
+
+    def card_id(self):
+        return self.rnd.choice(self.card_ids)
+
+    def set_id(self):
+        return self.rnd.choice(self.set_ids)
+
+    def filter_value(self, name):
+        return self.set_id() if name == 'set_id' else self.rnd.choice(FILTERS[name])
+
+
+def seed_tcgplayer_cache(db_path, set_ids):
+    """Fill the TCGplayer proxy cache with TCGCSV-shaped payloads for set_ids.
+
+    The proxy routes are benchmarked against their cache (the TCGCSV upstream
+    is out of scope offline); groups are numbered by their set's position.
+    """
+    from pokemontcg.tcgplayer_proxy import tcgplayer_cache
+
+    now = datetime.now()
+    conn = sqlite3.connect(db_path)
+    groups = []
+    for group_id, set_id in enumerate(set_ids, start=1):
+        groups.append({"groupId": group_id, "name": set_id, "abbreviation": set_id.upper(), "categoryId": 3})
+        rows = conn.execute(
+            """
+            SELECT c.name, c.number, v.tcgplayer_product_id, v.variant_type, v.market_price, v.low_price, v.mid_price, v.high_price
+            FROM card_variants v INNER JOIN cards c ON c.id = v.card_id
+            WHERE c.set_id = ?
+            """,
+            (set_id,)
+        ).fetchall()
+        products = [
+            {
+                "productId": product_id,
+                "name": name,
+                "groupId": group_id,
+                "url": f"https://www.tcgplayer.com/product/{product_id}",
+                "imageUrl": f"https://tcgplayer-cdn.tcgplayer.com/product/{product_id}_200w.jpg",
+                "extendedData": [{"name": "Number", "value": number}]
+            }
+            for name, number, product_id, _, _, _, _, _ in rows
+        ]
+        prices = [
+            {
+                "productId": product_id, "subTypeName": variant_type, "marketPrice": market,
+                "lowPrice": low, "midPrice": mid, "highPrice": high, "directLowPrice": None
+            }
+            for _, _, product_id, variant_type, market, low, mid, high in rows
+        ]
+        tcgplayer_cache[f'products_{group_id}'] = ({"success": True, "results": products}, now)
+        tcgplayer_cache[f'prices_{group_id}'] = ({"success": True, "results": prices}, now)
+    tcgplayer_cache['groups'] = ({"success": True, "results": groups}, now)
+    conn.close()
+    return {set_id: group_id for group_id, set_id in enumerate(set_ids, start=1)}
+
+
+def build_scenarios(sample, card_sorts, group_ids):
+    """{scenario name: function returning (method, url, json body)}"""
+    rnd = sample.rnd
+    scenarios = {}
+
+    def get(url):
+        return ("GET", url, None)
+
+    # Every sort mode, unfiltered, across the first pages
+    for sort in card_sorts:
+        scenarios[f"cards sort={sort}"] = lambda sort=sort: get(f"/cards?sort={sort}&pageSize=50&page={rnd.randint(1, 5)}")
+
+    # Every single filter and a few combinations
+    for name in list(FILTERS) + ['set_id']:
+        scenarios[f"cards {name}"] = lambda name=name: get(
+            f"/cards?{name}={sample.filter_value(name)}&pageSize=50&sort={rnd.choice(card_sorts)}"
+        )
+    for combination in COMBINATIONS:
+        scenarios[f"cards {'+'.join(combination)}"] = lambda combination=combination: get(
+            "/cards?" + "&".join(f"{name}={sample.filter_value(name)}" for name in combination) + "&pageSize=50"
+        )
+
+    # Multi-value, range, legality and regulation mark filters
+    scenarios["cards type multi"] = lambda: get(f"/cards?type={','.join(rnd.sample(FILTERS['type'], 2))}&pageSize=50")
+    scenarios["cards rarity multi"] = lambda: get(f"/cards?rarity={','.join(rnd.sample(FILTERS['rarity'], 2))}&pageSize=50")
+    scenarios["cards hp range"] = lambda: get(f"/cards?hp_min={rnd.randint(3, 20) * 10}&hp_max={rnd.randint(21, 34) * 10}&pageSize=50&sort=hp-desc")
+    scenarios["cards retreat+price range"] = lambda: get(f"/cards?retreat_max={rnd.randint(0, 2)}&price_min={rnd.choice([1, 5, 20])}&pageSize=50")
+    scenarios["cards standard_legal+regulation"] = lambda: get(f"/cards?standard_legal=true&regulation_mark={rnd.choice(['G,H', 'F', 'H'])}&pageSize=50")
+
+    # Deep offset pages, estimated counts, sparse fieldsets and search
+    scenarios["cards deep page"] = lambda: get(f"/cards?pageSize=50&page={rnd.randint(50, 200)}")
+    scenarios["cards count=estimate"] = lambda: get(f"/cards?type={sample.filter_value('type')}&count=estimate&pageSize=50")
+    scenarios["cards fields=id,name,images"] = lambda: get(f"/cards?fields=id,name,images&pageSize=250&page={rnd.randint(1, 20)}")
+    scenarios["cards/search"] = lambda: get(f"/cards/search?q={rnd.choice(SEARCH_TERMS)}&pageSize=50")
+    scenarios["cards/facets"] = lambda: get(
+        "/cards/facets?" + "&".join(f"{name}={sample.filter_value(name)}" for name in rnd.choice(COMBINATIONS)[:rnd.randint(0, 2)])
+    )
+
+    # Single cards and batches
+    scenarios["cards/{id}"] = lambda: get(f"/cards/{sample.card_id()}")
+    scenarios["cards/{id} fields"] = lambda: get(f"/cards/{sample.card_id()}?fields=id,name,attacks,set")
+    scenarios["cards/batch 100"] = lambda: ("POST", "/cards/batch", {"ids": [sample.card_id() for _ in range(100)]})
+
+    # Sets and reference lists
+    scenarios["sets"] = lambda: get(f"/sets?pageSize=100&page={rnd.randint(1, 2)}")
+    scenarios["sets/{id}"] = lambda: get(f"/sets/{sample.set_id()}")
+    scenarios["types"] = lambda: get("/types")
+    scenarios["rarities"] = lambda: get("/rarities")
+
+    # TCGplayer proxy (served from its seeded cache)
+    group_list = list(group_ids.values())
+    scenarios["tcgplayer groups"] = lambda: get("/api/tcgplayer/groups")
+    scenarios["tcgplayer products"] = lambda: get(f"/api/tcgplayer/groups/{rnd.choice(group_list)}/products")
+    scenarios["tcgplayer prices"] = lambda: get(f"/api/tcgplayer/groups/{rnd.choice(group_list)}/prices")
+
+    def card_variants():
+        set_id, name, number = rnd.choice(sample.pokemon)
+        return get(f"/api/tcgplayer/card-variants/{group_ids[set_id]}/{name}?card_number={number}")
+    scenarios["tcgplayer card-variants"] = card_variants
+
+    return scenarios
+
+
+def run_scenario(client, make_request, requests, warmup, statements):
+    """Time `requests` requests (after `warmup` untimed ones)"""
+    latencies = []
+    queries = []
+    statuses = {}
+    for index in range(warmup + requests):
+        method, url, body = make_request()
+        statements[0] = 0
+        started = time.perf_counter()
+        response = client.request(method, url, json=body)
+        elapsed = time.perf_counter() - started
+        if index < warmup:
+            continue
+        latencies.append(elapsed * 1000)
+        queries.append(statements[0])
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "p50Ms": round(percentile(latencies, 0.50), 3),
+        "p95Ms": round(percentile(latencies, 0.95), 3),
+        "p99Ms": round(percentile(latencies, 0.99), 3),
+        "meanMs": round(sum(latencies) / len(latencies), 3),
+        "maxMs": round(latencies[-1], 3),
+        "queriesPerRequest": round(sum(queries) / len(queries), 2),
+        "maxQueries": max(queries),
+        "statuses": statuses
+    }
+
+
+def configure_api(db_path, response_cache=False):
+    """Point the API at db_path; must run before pokemontcg is first imported,
+    as its configuration is read at import time"""
+    if 'pokemontcg' in sys.modules:
+        raise RuntimeError("configure_api() must be called before pokemontcg is imported")
+    os.environ['API_DB_PATH'] = str(Path(db_path).resolve())
+    if not response_cache:
+        os.environ['RESPONSE_CACHE_MB'] = '0'
+
+
+def run_benchmarks(db_path, requests=50, warmup=5, seed=7, response_cache=False, only=None):
+    """Run every scenario against db_path (see configure_api) and return the results document"""
+    from fastapi.testclient import TestClient
+    from pokemontcg.api import app, CARD_SORTS
+    from pokemontcg.db import statement_hooks
+
+    # Count executed statements for the request in flight (requests run one at a time)
+    statements = [0]
+
+    def count_statement(cursor, event, sql, seconds, rows):
+        if event == "execute":
+            statements[0] += 1
+    statement_hooks.append(count_statement)
+
+    rnd = random.Random(seed)
+    sample = CatalogSample(db_path, rnd)
+    group_ids = seed_tcgplayer_cache(db_path, sample.set_ids)
+    scenarios = build_scenarios(sample, list(CARD_SORTS), group_ids)
+    if only:
+        scenarios = {name: make for name, make in scenarios.items() if any(term in name for term in only)}
+
+    results = {}
+    with TestClient(app) as client:
+        for name, make_request in scenarios.items():
+            results[name] = run_scenario(client, make_request, requests, warmup, statements)
+            result = results[name]
+            print(f"  {name:<32} p50 {result['p50Ms']:>8.2f}ms  p95 {result['p95Ms']:>8.2f}ms  "
+                  f"p99 {result['p99Ms']:>8.2f}ms  {result['queriesPerRequest']:>5} queries")
+    statement_hooks.remove(count_statement)
+
+    conn = sqlite3.connect(db_path)
+    cards, sets = conn.execute("SELECT (SELECT COUNT(*) FROM cards), (SELECT COUNT(*) FROM sets)").fetchone()
+    conn.close()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": str(db_path),
+            "cards": cards,
+            "sets": sets,
+            "requestsPerScenario": requests,
+            "warmup": warmup,
+            "seed": seed,
+            "responseCache": response_cache
+        },
+        "results": results
+    }
+
+
+def compare(current, baseline_path):
+    """Print p50/p95 and query count changes against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline['meta'].get('commit')} ({baseline_path}):")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        changes = "  ".join(
+            f"{key} {before[key]:.2f} -> {result[key]:.2f} ({(result[key] - before[key]) / before[key] * 100 if before[key] else 0:+.0f}%)"
+            for key in ["p50Ms", "p95Ms", "queriesPerRequest"]
+        )
+        print(f"  {name:<32} {changes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the API in-process against a synthetic catalog')
+    parser.add_argument('--db', type=str, help='Benchmark database (default: generated for --cards)')
+    parser.add_argument('--cards', type=int, default=20000, help='Catalog size to generate when --db is not given')
+    parser.add_argument('--requests', type=int, default=50, help='Timed requests per scenario')
+    parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per scenario')
+    parser.add_argument('--seed', type=int, default=7, help='Random seed for request parameters')
+    parser.add_argument('--response-cache', action='store_true', help='Keep the response cache enabled (measures cache hits)')
+    parser.add_argument('--only', nargs='+', help='Only run scenarios whose name contains one of these strings')
+    parser.add_argument('--output', type=str, help='Results file (default benchmarks/results/<timestamp>-<commit>.json)')
+    parser.add_argument('--compare', type=str, help='Earlier results file to compare against')
+    args = parser.parse_args()
+
+    db_path = Path(args.db) if args.db else default_catalog_path(args.cards)
+    configure_api(db_path, args.response_cache)
+
+    from benchmarks.generate_catalog import generate_catalog
+    if not db_path.exists():
+        print(f"Generating {args.cards:,} cards into {db_path}")
+        generate_catalog(db_path, args.cards)
+
+    print(f"Benchmarking against {db_path}")
+    results = run_benchmarks(db_path, args.requests, args.warmup, args.seed, args.response_cache, args.only)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / (
+        f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{results['meta']['commit'] or 'nogit'}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,21 +2,250 @@
 Pokemon TCG API - FastAPI application
 Serves Pokemon TCG data from the local SQLite database
 """
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Body, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional, List
-import sqlite3
+from contextlib import asynccontextmanager
 import json
+import re
+import time
+import asyncio
+import logging
+import threading
+import weakref
+from datetime import datetime, timezone
 from pathlib import Path
-from fastapi.responses import RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse, Response, StreamingResponse
+from starlette.background import BackgroundTasks
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
 from .tcgplayer_proxy import router as tcgplayer_router
+from .config import (
+    API_DB_PATH, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_MMAP_SIZE, DB_CACHE_SIZE_KB,
+    DB_THREADS, COUNT_CACHE_SIZE, COUNT_ESTIMATE_LIMIT, FACET_CACHE_SIZE, RESPONSE_CACHE_MB,
+    CACHE_MAX_AGE, GENERATION_CHECK_INTERVAL, COMPRESS_MIN_SIZE, CARD_BATCH_MAX, EXPORT_MAX_STREAMS,
+    SQL_PROFILE, SLOW_QUERY_MS, SLOW_QUERY_LOG
+)
+from .db import ConnectionPool, QueryRunner, statement_hooks
+from .metrics import (
+    registry, CONTENT_TYPE, RequestSql, current_request_sql, record_statement,
+    http_requests, http_request_seconds, http_requests_in_flight,
+    request_sql_queries, request_sql_seconds
+)
+from .profiling import (
+    RequestProfile, current_profile, phase, profile_statement, server_timing,
+    configure_slow_query_log, explain_slow_statements
+)
+from .cache import GenerationCache, request_cache_key, make_etag, etag_matches
+from .compression import negotiate_encoding, compress
+from .generation import read_generation
+from .enrichment import HOSTED_IMAGES_BASE, dict_from_row, fetch_in, render_set, enrich_cards
+from .documents import (
+    dump_json, dump_document, render_envelope, render_list,
+    load_card_documents, load_set_documents
+)
+from .sort_keys import RARITY_RANKS, UNKNOWN_RARITY_RANK
+from .search import fts_query, bm25_sql
+from .fieldsets import CardFieldset, InvalidFieldset, parse_names
+from .filters import CardFilters
+from .catalog import ReferenceCatalog
+from .pagination import (
+    InvalidCursor, encode_cursor, decode_cursor, order_by_sql, select_keys_sql,
+    pop_key_values, keyset_sql
+)
+
+logger = logging.getLogger(__name__)
+
+# Database path
+DB_PATH = Path(API_DB_PATH) if API_DB_PATH else Path(__file__).parent / "pokemontcg.db"
+
+# Long-lived read-only connections shared by all requests
+db_pool = ConnectionPool(
+    DB_PATH,
+    size=DB_POOL_SIZE,
+    timeout=DB_POOL_TIMEOUT,
+    mmap_size=DB_MMAP_SIZE,
+    cache_size_kb=DB_CACHE_SIZE_KB
+)
+
+# Queries run on a bounded thread pool so they never block the event loop
+db_runner = QueryRunner(db_pool, max_workers=DB_THREADS)
+
+# totalCount per filter combination, valid until the next sync
+count_cache = GenerationCache(max_entries=COUNT_CACHE_SIZE)
+
+# /cards/facets histograms per filter combination, valid until the next sync
+facet_cache = GenerationCache(max_entries=FACET_CACHE_SIZE)
+
+# Rendered catalog responses, valid until the next sync
+response_cache = GenerationCache(max_bytes=RESPONSE_CACHE_MB * 1024 * 1024)
+
+# Catalog routes served through the response cache: /cards, /sets and single
+# cards/sets (including /cards/search)
+CACHEABLE_PATHS = re.compile(r"^/(cards|sets)(/[^/]+)?$")
+CACHE_CONTROL = f"public, max-age={CACHE_MAX_AGE}"
+
+# Streamed responses are never buffered into the response cache
+STREAMED_PATHS = {"/cards/export"}
+
+# Cards rendered per chunk of a /cards/export stream
+EXPORT_BATCH_SIZE = 500
+
+# Each export stream reads on a connection of its own; at most
+# EXPORT_MAX_STREAMS run at once, further requests are turned away
+export_slots = threading.BoundedSemaphore(EXPORT_MAX_STREAMS)
+EXPORT_RETRY_AFTER = 5
+
+
+class CatalogJSONResponse(JSONResponse):
+    """JSON response encoded with dump_json (orjson when installed)"""
+
+    def render(self, content):
+        return dump_json(content)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Load the reference catalog on startup; stop the query threads and close
+    pooled connections on shutdown"""
+    try:
+        await reference_catalog()
+    except Exception as e:
+        logger.warning(f"Reference catalog not loaded at startup: {e}")
+    yield
+    db_runner.shutdown()
+    db_pool.close_all()
+
 
 app = FastAPI(
     title="Pokemon TCG API",
     description="API for querying Pokemon Trading Card Game data",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=CatalogJSONResponse
 )
 
+
+async def run_db(fn, *args):
+    """Run fn(conn, *args) with a pooled connection on the query thread pool"""
+    return await db_runner.run(fn, *args)
+
+
+# Last data generation read from the database and when it was read
+_generation_checked = {"generation": None, "at": 0.0}
+
+
+async def current_generation():
+    """Data generation, re-read from the database at most once per GENERATION_CHECK_INTERVAL"""
+    now = time.monotonic()
+    if now - _generation_checked["at"] >= GENERATION_CHECK_INTERVAL:
+        _generation_checked["generation"] = await run_db(lambda conn: read_generation(conn.cursor()))
+        _generation_checked["at"] = now
+    return _generation_checked["generation"]
+
+
+async def encode_body(body, encoding):
+    """Compress body off the event loop, returning (body, content coding or None)"""
+    if encoding is None or len(body) < COMPRESS_MIN_SIZE:
+        return body, None
+    return await run_in_threadpool(compress, body, encoding), encoding
+
+
+def encoded_response(body, content_type, content_encoding, headers):
+    """Response for a (possibly compressed) body"""
+    if content_encoding:
+        headers = dict(headers, **{"Content-Encoding": content_encoding})
+    return Response(content=body, headers=headers, media_type=content_type)
+
+
+async def compress_response(response, encoding):
+    """Compress an uncached catalog response on the fly"""
+    if response.status_code != 200 or encoding is None:
+        return response
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    body, content_encoding = await encode_body(body, encoding)
+    headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    headers["Vary"] = "Accept-Encoding"
+    return encoded_response(body, None, content_encoding, headers)
+
+
+# Reference lists and rendered sets for the current data generation
+_reference = {"catalog": None}
+_reference_lock = asyncio.Lock()
+
+
+async def reference_catalog():
+    """In-memory reference catalog, reloaded after a sync bumps the data generation.
+
+    Databases without a generation counter are loaded once and kept.
+    """
+    generation = await current_generation()
+    catalog = _reference["catalog"]
+    if catalog is None or (generation is not None and catalog.generation != generation):
+        async with _reference_lock:
+            catalog = _reference["catalog"]
+            if catalog is None or (generation is not None and catalog.generation != generation):
+                catalog = await run_db(ReferenceCatalog.load, generation)
+                _reference["catalog"] = catalog
+    return catalog
+
+
+# Registered before CORS so cached responses still get CORS headers
+@app.middleware("http")
+async def response_cache_middleware(request, call_next):
+    """Serve catalog GETs from the response cache, with ETag / If-None-Match support.
+
+    Bodies are compressed per Accept-Encoding (brotli or gzip) once and cached
+    compressed alongside the identity body, so repeat hits do no compression work.
+    """
+    if (
+        request.method not in ("GET", "POST")
+        or not CACHEABLE_PATHS.match(request.url.path)
+        or request.url.path in STREAMED_PATHS
+    ):
+        return await call_next(request)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    
+    # Batch lookups (POST) and other count modes vary between calls, so they
+    # are only compressed
+    if request.method == "POST" or request.query_params.get("count", "exact") != "exact":
+        return await compress_response(await call_next(request), encoding)
+    
+    try:
+        generation = await current_generation()
+    except Exception:
+        generation = None  # Let the endpoint report the database error
+    if generation is None:
+        return await compress_response(await call_next(request), encoding)
+    response_cache.set_generation(generation)
+    
+    # Each encoding is its own representation: separate cache entry and ETag
+    key = request_cache_key(request.url.path, request.query_params.multi_items())
+    variant_key = f"{key}#{encoding}" if encoding else key
+    headers = {"ETag": make_etag(generation, variant_key), "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    cached = response_cache.get(variant_key)
+    if cached is None:
+        identity = response_cache.get(key) if encoding else None
+        if identity is None:
+            response = await call_next(request)
+            if response.status_code != 200:
+                return response
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            identity = (body, response.headers.get("content-type"), None)
+            response_cache.put(key, identity, generation, size=len(body))
+        cached = identity
+        if encoding:
+            body, content_encoding = await encode_body(identity[0], encoding)
+            cached = (body, identity[1], content_encoding)
+            response_cache.put(variant_key, cached, generation, size=len(body))
+    
+    body, content_type, content_encoding = cached
+    return encoded_response(body, content_type, content_encoding, headers)
+
+
 # Enable CORS
 app.add_middleware(
     CORSMiddleware,
@@ -26,103 +255,181 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Register TCGplayer proxy router
-app.include_router(tcgplayer_router)
-
-# Database path
-DB_PATH = Path(__file__).parent / "pokemontcg.db"
 
-# Hosted image base (Hostinger)
-HOSTED_IMAGES_BASE = "https://www.colleqtivetcg.com/tcg-images/pokemon"
+def route_label(request):
+    """Route path template for metric labels (e.g. /cards/{card_id}), so label values stay bounded"""
+    route = request.scope.get("route")
+    if route is None:
+        # Responses served by middleware (cache hits, 304s) never reached the router
+        for candidate in app.routes:
+            match, _ = candidate.matches(request.scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+    return route.path if route is not None else "unmatched"
 
 
-def build_card_images(card_data):
-    """Build images object from card database columns with hosted URLs.
-    
-    Uses card numbers as-is to match file naming on server.
-    Falls back to Pokemon card back placeholder if images don't exist.
-    """
-    set_id = card_data.get('set_id', '')
-    number = card_data.get('number', '')
+if SQL_PROFILE:
+    configure_slow_query_log(SLOW_QUERY_LOG)
+    statement_hooks.append(profile_statement)
     
-    if set_id and number:
-        # Keep card number as-is - no leading zero stripping
-        # Some cards have formats like "123/456" - just use the first part
-        clean_number = number.split('/')[0]
+    @app.middleware("http")
+    async def sql_profile_middleware(request, call_next):
+        """Add a Server-Timing phase breakdown and log slow statements with their query plans"""
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            current_profile.reset(token)
+        response.headers["Server-Timing"] = server_timing(profile, time.perf_counter() - started)
         
-        # Images are now stored directly in set folder without /small/ or /large/ subdirectories
-        # Path structure: /tcg-images/pokemon/en/cards/{setId}/{number}.webp
-        image_url = f"{HOSTED_IMAGES_BASE}/en/cards/{set_id}/{clean_number}.webp"
-        card_data['images'] = {
-            'small': image_url,
-            'large': image_url  # Same file for both since we don't have separate sizes anymore
-        }
-    else:
-        # Fallback to placeholder if no set_id or number
-        card_data['images'] = {
-            'small': f"{HOSTED_IMAGES_BASE}/en/cards/placeholder-card-back.webp",
-            'large': f"{HOSTED_IMAGES_BASE}/en/cards/placeholder-card-back.webp"
-        }
-    
-    # Clean up the old database columns
-    card_data.pop('image_small', None)
-    card_data.pop('image_large', None)
-    
-    return card_data
+        # Plans are explained after the response has been sent, so logging
+        # a slow request does not make it slower still
+        slow = profile.slow_statements(SLOW_QUERY_MS)
+        if slow:
+            source = f"{request.method} {request.url.path}" + (f"?{request.url.query}" if request.url.query else "")
+            tasks = BackgroundTasks()
+            if response.background is not None:
+                tasks.add_task(response.background)
+            tasks.add_task(run_db, explain_slow_statements, source, slow)
+            response.background = tasks
+        return response
 
 
-def build_set_images(set_data):
-    """Build images object from set database columns with hosted URLs"""
-    set_id = set_data.get('id', '')
-    
-    if set_id:
-        # Images are stored in /tcg-images/pokemon/en/sets/{setId}/{type}.webp
-        set_data['images'] = {
-            'symbol': f"{HOSTED_IMAGES_BASE}/en/sets/{set_id}/symbol.webp",
-            'logo': f"{HOSTED_IMAGES_BASE}/en/sets/{set_id}/logo.webp"
-        }
-    
-    # Clean up the old database columns
-    set_data.pop('symbol_url', None)
-    set_data.pop('logo_url', None)
-    
-    return set_data
+# Registered last so it is the outermost middleware and times everything
+@app.middleware("http")
+async def metrics_middleware(request, call_next):
+    """Record per-route latency, in-flight requests and the SQL work of each request"""
+    sql = RequestSql()
+    token = current_request_sql.set(sql)
+    http_requests_in_flight.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        http_requests_in_flight.dec()
+        current_request_sql.reset(token)
+        
+        route = route_label(request)
+        http_requests.inc(method=request.method, route=route, status=str(status))
+        http_request_seconds.observe(elapsed, method=request.method, route=route)
+        request_sql_queries.observe(sql.queries, route=route)
+        request_sql_seconds.observe(sql.seconds, route=route)
 
 
-def get_db():
-    """Get database connection"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Count SQL statements and time against the request that ran them
+statement_hooks.append(record_statement)
 
 
-def dict_from_row(row):
-    """Convert SQLite row to dictionary"""
-    return dict(zip(row.keys(), row))
+def collect_runtime_metrics():
+    """Pool, query thread and cache figures, read at scrape time"""
+    pool = db_pool.stats()
+    threads = db_runner.stats()
+    metrics = [
+        ("api_db_pool_connections", "gauge", "Pooled database connections by state",
+            [({"state": "idle"}, pool["idle"]), ({"state": "in_use"}, pool["inUse"])]),
+        ("api_db_dedicated_connections", "gauge", "Open connections outside the pool (streamed exports)",
+            [({}, pool["dedicated"])]),
+        ("api_db_pool_checkouts_total", "counter", "Connections checked out of the pool",
+            [({}, pool["checkouts"])]),
+        ("api_db_pool_waits_total", "counter", "Checkouts that had to wait for a free connection",
+            [({}, pool["waits"])]),
+        ("api_db_pool_wait_seconds_total", "counter", "Time spent waiting for a free connection",
+            [({}, pool["waitTimeTotalMs"] / 1000)]),
+        ("api_db_pool_timeouts_total", "counter", "Checkouts that timed out waiting for a connection",
+            [({}, pool["timeouts"])]),
+        ("api_db_query_threads", "gauge", "Query thread pool work by state",
+            [({"state": "active"}, threads["active"]), ({"state": "queued"}, threads["queued"])]),
+    ]
+    for cache_name, cache in (("count", count_cache), ("facet", facet_cache), ("response", response_cache)):
+        stats = cache.stats()
+        metrics += [
+            (f"api_{cache_name}_cache_lookups_total", "counter", f"{cache_name.title()} cache lookups",
+                [({"result": "hit"}, stats["hits"]), ({"result": "miss"}, stats["misses"])]),
+            (f"api_{cache_name}_cache_entries", "gauge", f"{cache_name.title()} cache entries",
+                [({}, stats["entries"])]),
+            (f"api_{cache_name}_cache_bytes", "gauge", f"{cache_name.title()} cache size in bytes",
+                [({}, stats["bytes"])]),
+        ]
+    return metrics
 
 
-def to_camel_case(snake_str):
-    """Convert snake_case string to camelCase"""
-    components = snake_str.split('_')
-    return components[0] + ''.join(x.title() for x in components[1:])
+registry.add_collector(collect_runtime_metrics)
 
+# Register TCGplayer proxy router
+app.include_router(tcgplayer_router)
 
-def convert_keys_to_camel_case(data):
-    """Recursively convert dictionary keys from snake_case to camelCase"""
-    if isinstance(data, dict):
-        new_dict = {}
-        for key, value in data.items():
-            # Don't convert keys that should stay as-is
-            if key in ['id', 'name', 'hp', 'level', 'number', 'artist', 'rarity', 'series', 'total', 'types', 'subtypes', 'supertypes']:
-                new_key = key
-            else:
-                new_key = to_camel_case(key)
-            new_dict[new_key] = convert_keys_to_camel_case(value)
-        return new_dict
-    elif isinstance(data, list):
-        return [convert_keys_to_camel_case(item) for item in data]
-    else:
-        return data
+
+# Sort keys for each /cards sort mode, using the sort key columns stored by the
+# sync (each has a matching composite index); every sort ends with the card ID
+# so the order is total and a cursor always identifies one position
+CARD_SORTS = {
+    # Newest sets first, then by card number
+    "newest": [("c.set_release_date", "DESC"), ("c.number_sort", "ASC"), ("c.id", "ASC")],
+    # Oldest sets first, then by card number
+    "oldest": [("c.set_id", "ASC"), ("c.number_sort", "ASC"), ("c.id", "ASC")],
+    # Alphabetical A-Z / Z-A
+    "name-asc": [("c.name", "ASC"), ("c.set_id", "ASC"), ("c.id", "ASC")],
+    "name-desc": [("c.name", "DESC"), ("c.set_id", "ASC"), ("c.id", "ASC")],
+    # HP ascending / descending
+    "hp-asc": [("c.hp_value", "ASC"), ("c.name", "ASC"), ("c.id", "ASC")],
+    "hp-desc": [("c.hp_value", "DESC"), ("c.name", "ASC"), ("c.id", "ASC")],
+    # Rarity ascending (Common first) / descending (Rare first)
+    "rarity-asc": [("c.rarity_rank", "ASC"), ("c.name", "ASC"), ("c.id", "ASC")],
+    "rarity-desc": [("c.rarity_rank", "DESC"), ("c.name", "ASC"), ("c.id", "ASC")],
+    # Card number ascending / descending
+    "number-asc": [("c.number_sort", "ASC"), ("c.id", "ASC")],
+    "number-desc": [("c.number_sort", "DESC"), ("c.id", "DESC")],
+}
+
+# Query-time equivalents for databases the sync hasn't added sort keys to yet
+CARD_NUMBER_SQL = "CAST(CASE WHEN c.number GLOB '[0-9]*' THEN SUBSTR(c.number, 1, INSTR(c.number || '/', '/') - 1) ELSE c.number END AS INTEGER)"
+RARITY_RANK_SQL = "CASE c.rarity " + " ".join(
+    f"WHEN '{rarity}' THEN {rank}" for rarity, rank in RARITY_RANKS.items()
+) + f" ELSE {UNKNOWN_RARITY_RANK} END"
+SET_RELEASE_DATE_SQL = "(SELECT s.release_date FROM sets s WHERE s.id = c.set_id)"
+LEGACY_CARD_SORTS = {
+    "newest": [(SET_RELEASE_DATE_SQL, "DESC"), (CARD_NUMBER_SQL, "ASC"), ("c.number", "ASC"), ("c.id", "ASC")],
+    "oldest": [("c.set_id", "ASC"), (CARD_NUMBER_SQL, "ASC"), ("c.number", "ASC"), ("c.id", "ASC")],
+    "name-asc": CARD_SORTS["name-asc"],
+    "name-desc": CARD_SORTS["name-desc"],
+    "hp-asc": [("CAST(c.hp AS INTEGER)", "ASC"), ("c.name", "ASC"), ("c.id", "ASC")],
+    "hp-desc": [("CAST(c.hp AS INTEGER)", "DESC"), ("c.name", "ASC"), ("c.id", "ASC")],
+    "rarity-asc": [(RARITY_RANK_SQL, "ASC"), ("c.name", "ASC"), ("c.id", "ASC")],
+    "rarity-desc": [(RARITY_RANK_SQL, "DESC"), ("c.name", "ASC"), ("c.id", "ASC")],
+    "number-asc": [(CARD_NUMBER_SQL, "ASC"), ("c.number", "ASC"), ("c.id", "ASC")],
+    "number-desc": [(CARD_NUMBER_SQL, "DESC"), ("c.number", "DESC"), ("c.id", "DESC")],
+}
+
+# Whether the cards table has the stored sort key columns (only ever goes
+# from False to True, when a sync migrates the database)
+_stored_sort_keys = False
+
+
+def card_sorts(cursor):
+    """Sort table to use: stored sort key columns when present, else expressions"""
+    global _stored_sort_keys
+    if not _stored_sort_keys:
+        cursor.execute("PRAGMA table_info(cards)")
+        _stored_sort_keys = 'number_sort' in {row[1] for row in cursor.fetchall()}
+    return CARD_SORTS if _stored_sort_keys else LEGACY_CARD_SORTS
+
+# Sets are listed newest first
+SET_SORT = [("release_date", "DESC"), ("id", "ASC")]
+
+
+def decode_page_cursor(page_cursor, sort, keys):
+    """Decode a cursor query parameter, rejecting bad cursors with a 400"""
+    try:
+        return decode_cursor(page_cursor, sort, len(keys))
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
 
 
 @app.get("/")
@@ -133,6 +440,10 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "cards": "/cards",
+            "card_search": "/cards/search?q=",
+            "card_facets": "/cards/facets",
+            "card_batch": "POST /cards/batch",
+            "card_export": "/cards/export",
             "card_by_id": "/cards/{card_id}",
             "sets": "/sets",
             "set_by_id": "/sets/{set_id}",
@@ -140,555 +451,654 @@ async def root():
             "subtypes": "/subtypes",
             "supertypes": "/supertypes",
             "rarities": "/rarities",
-            "health": "/health"
+            "health": "/health",
+            "metrics": "/metrics"
         }
     }
 
 
+def _fetch_health(conn):
+    """Count cards, sets and variants for /health"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM cards")
+    card_count = cursor.fetchone()[0]
+    cursor.execute("SELECT COUNT(*) FROM sets")
+    set_count = cursor.fetchone()[0]
+    
+    # Check if card_variants table exists and count variants
+    variant_count = 0
+    try:
+        cursor.execute("SELECT COUNT(*) FROM card_variants")
+        variant_count = cursor.fetchone()[0]
+    except:
+        variant_count = "table_not_found"
+    
+    return {
+        "status": "healthy",
+        "database": "connected",
+        "cards": card_count,
+        "sets": set_count,
+        "variants": variant_count,
+        "pool": db_pool.stats(),
+        "queryThreads": db_runner.stats(),
+        "countCache": count_cache.stats(),
+        "facetCache": facet_cache.stats(),
+        "responseCache": response_cache.stats(),
+        "referenceCatalog": _reference["catalog"].stats() if _reference["catalog"] else None
+    }
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM cards")
-        card_count = cursor.fetchone()[0]
-        cursor.execute("SELECT COUNT(*) FROM sets")
-        set_count = cursor.fetchone()[0]
-        
-        # Check if card_variants table exists and count variants
-        variant_count = 0
-        try:
-            cursor.execute("SELECT COUNT(*) FROM card_variants")
-            variant_count = cursor.fetchone()[0]
-        except:
-            variant_count = "table_not_found"
-        
-        conn.close()
-        
-        return {
-            "status": "healthy",
-            "database": "connected",
-            "cards": card_count,
-            "sets": set_count,
-            "variants": variant_count
-        }
+        return await run_db(_fetch_health)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics in the text exposition format"""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+
+def count_matches(cursor, count_mode, key, from_sql, params):
+    """totalCount for a filtered query, as (total, exact).
+
+    Exact counts are cached per filter combination for the current data
+    generation. count_mode 'none' only returns a cached count; 'estimate'
+    counts at most COUNT_ESTIMATE_LIMIT rows, which is exact when fewer match.
+    """
+    generation = read_generation(cursor)
+    count_cache.set_generation(generation)
+    total = count_cache.get(key)
+    if total is not None:
+        return total, True
+    if count_mode == "none":
+        return None, False
+    
+    if count_mode == "estimate":
+        cursor.execute(f"SELECT COUNT(*) FROM (SELECT DISTINCT c.id {from_sql} LIMIT ?)", params + [COUNT_ESTIMATE_LIMIT])
+        total = cursor.fetchone()[0]
+        if total >= COUNT_ESTIMATE_LIMIT:
+            return total, False
+    else:
+        # Use DISTINCT since joins might create duplicates
+        cursor.execute(f"SELECT COUNT(DISTINCT c.id) {from_sql}", params)
+        total = cursor.fetchone()[0]
+    
+    count_cache.put(key, total, generation)
+    return total, True
+
+
+def _fetch_sets(conn, page, pageSize, page_cursor):
+    """Load one page of sets, newest first"""
+    cursor = conn.cursor()
+    
+    # Get total count
+    cursor.execute("SELECT COUNT(*) FROM sets")
+    total_count = cursor.fetchone()[0]
+    
+    # Offset paging, or continue after the cursor's set
+    offset = (page - 1) * pageSize
+    where_sql = "1=1"
+    params = []
+    if page_cursor:
+        where_sql, params = keyset_sql(SET_SORT, decode_page_cursor(page_cursor, "sets", SET_SORT))
+        offset = 0
+    
+    # Get sets (plus one to know whether there is a next page)
+    cursor.execute(f"""
+        SELECT *, {select_keys_sql(SET_SORT)} FROM sets 
+        WHERE {where_sql}
+        {order_by_sql(SET_SORT)}
+        LIMIT ? OFFSET ?
+    """, params + [pageSize + 1, offset])
+    
+    sets = [dict_from_row(row) for row in cursor.fetchall()]
+    key_values = [pop_key_values(s, SET_SORT) for s in sets]
+    next_cursor = encode_cursor("sets", key_values[pageSize - 1]) if len(sets) > pageSize else None
+    sets = sets[:pageSize]
+    
+    # Serve pre-rendered set documents, rendering any that are missing
+    documents = load_set_documents(cursor, [s['id'] for s in sets])
+    for s in sets:
+        if s['id'] not in documents:
+            documents[s['id']] = dump_document(render_set(dict(s)))
+    
+    body = render_envelope(
+        render_list(documents[s['id']] for s in sets),
+        page=page,
+        pageSize=pageSize,
+        count=len(sets),
+        totalCount=total_count,
+        nextCursor=next_cursor
+    )
+    return Response(content=body, media_type="application/json")
+
+
 @app.get("/sets")
 async def get_sets(
     page: int = Query(1, ge=1, description="Page number"),
-    pageSize: int = Query(10, ge=1, le=250, description="Number of sets per page")
+    pageSize: int = Query(10, ge=1, le=250, description="Number of sets per page"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from a previous response's nextCursor (page is ignored)")
 ):
     """Get all Pokemon TCG sets with pagination"""
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # Get total count
-        cursor.execute("SELECT COUNT(*) FROM sets")
-        total_count = cursor.fetchone()[0]
+        catalog = await reference_catalog()
         
-        # Calculate offset
-        offset = (page - 1) * pageSize
+        # Offset paging, or continue after the cursor's set
+        start = (page - 1) * pageSize
+        if cursor:
+            set_id = decode_page_cursor(cursor, "sets", SET_SORT)[1]
+            start = catalog.position_after(set_id)
+            if start is None:
+                # Cursor set is gone from the catalog: seek in the database
+                return await run_db(_fetch_sets, page, pageSize, cursor)
         
-        # Get sets
-        cursor.execute("""
-            SELECT * FROM sets 
-            ORDER BY release_date DESC
-            LIMIT ? OFFSET ?
-        """, (pageSize, offset))
+        set_ids = catalog.set_ids[start:start + pageSize]
+        next_cursor = None
+        if start + pageSize < len(catalog.set_ids):
+            last = catalog.sets[set_ids[-1]]
+            next_cursor = encode_cursor("sets", [last.get('releaseDate'), last['id']])
         
-        sets = [dict_from_row(row) for row in cursor.fetchall()]
-        
-        # Build images object with hosted URLs
-        for s in sets:
-            if s.get('legalities'):
-                s['legalities'] = json.loads(s['legalities'])
-            # Build images from symbol_url and logo_url with hosted URLs
-            build_set_images(s)
-        
-        # Convert to camelCase for frontend compatibility
-        sets = [convert_keys_to_camel_case(s) for s in sets]
-        
-        conn.close()
-        
-        return {
-            "data": sets,
-            "page": page,
-            "pageSize": pageSize,
-            "count": len(sets),
-            "totalCount": total_count
-        }
+        body = render_envelope(
+            render_list(catalog.set_documents[set_id] for set_id in set_ids),
+            page=page,
+            pageSize=pageSize,
+            count=len(set_ids),
+            totalCount=len(catalog.set_ids),
+            nextCursor=next_cursor
+        )
+        return Response(content=body, media_type="application/json")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _fetch_set(conn, set_id):
+    """Load a set by ID"""
+    cursor = conn.cursor()
+    
+    # Pre-rendered document is a single primary key lookup
+    documents = load_set_documents(cursor, [set_id])
+    if set_id in documents:
+        return Response(content=render_envelope(documents[set_id]), media_type="application/json")
+    
+    cursor.execute("SELECT * FROM sets WHERE id = ?", (set_id,))
+    row = cursor.fetchone()
+    
+    if not row:
+        raise HTTPException(status_code=404, detail=f"Set '{set_id}' not found")
+    
+    set_data = render_set(dict_from_row(row))
+    
+    # Returned as a response so FastAPI skips jsonable_encoder
+    return CatalogJSONResponse({"data": set_data})
+
+
 @app.get("/sets/{set_id}")
 async def get_set(set_id: str):
     """Get a specific set by ID"""
     try:
-        conn = get_db()
-        cursor = conn.cursor()
+        catalog = await reference_catalog()
+        if set_id in catalog.set_documents:
+            return Response(content=render_envelope(catalog.set_documents[set_id]), media_type="application/json")
         
-        cursor.execute("SELECT * FROM sets WHERE id = ?", (set_id,))
-        row = cursor.fetchone()
-        
-        if not row:
-            conn.close()
-            raise HTTPException(status_code=404, detail=f"Set '{set_id}' not found")
-        
-        set_data = dict_from_row(row)
-        
-        # Parse JSON fields and build images with hosted URLs
-        if set_data.get('legalities'):
-            set_data['legalities'] = json.loads(set_data['legalities'])
-        # Build images from symbol_url and logo_url with hosted URLs
-        build_set_images(set_data)
-        
-        # Convert to camelCase for frontend compatibility
-        set_data = convert_keys_to_camel_case(set_data)
-        
-        conn.close()
-        
-        return {"data": set_data}
+        # Not in the catalog (synced since it was loaded, or missing)
+        return await run_db(_fetch_set, set_id)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def card_filter_sql(cursor, filters):
+    """JOIN clause, WHERE clauses and params for the card filter parameters"""
+    # HP bounds compare the same numeric HP that the hp sorts order by
+    hp_sql = card_sorts(cursor)["hp-asc"][0][0]
+    return filters.sql(hp_sql)
+
+
+def card_fieldset(cursor, fields, include):
+    """CardFieldset for the fields / include parameters, or None for the full card shape"""
+    fields = parse_names(fields)
+    include = parse_names(include)
+    if fields is None and include is None:
+        return None
+    
+    cursor.execute("PRAGMA table_info(cards)")
+    try:
+        return CardFieldset([row[1] for row in cursor.fetchall()], fields, include)
+    except InvalidFieldset as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def card_select_sql(fieldset):
+    """Card columns to select: all of them, or just the fieldset's"""
+    return fieldset.select_sql() if fieldset else "c.*"
+
+
+def fetch_card_page(cursor, from_sql, where_sql, params, keys, sort, page, pageSize, page_cursor, fieldset=None):
+    """Run a card page query in offset or keyset mode, returning (cards, nextCursor)"""
+    # Keyset mode continues after the cursor's row instead of skipping rows
+    offset = (page - 1) * pageSize
+    if page_cursor:
+        keyset, keyset_params = keyset_sql(keys, decode_page_cursor(page_cursor, sort, keys))
+        where_sql = f"{where_sql} AND {keyset}"
+        params = params + keyset_params
+        offset = 0
+    
+    # Get cards - use DISTINCT to avoid duplicates from joins
+    # (one extra row tells us whether there is a next page)
+    cards_query = f"""
+        SELECT DISTINCT {card_select_sql(fieldset)}, {select_keys_sql(keys)} {from_sql}
+        WHERE {where_sql}
+        {order_by_sql(keys)}
+        LIMIT ? OFFSET ?
+    """
+    cursor.execute(cards_query, params + [pageSize + 1, offset])
+    
+    cards = [dict_from_row(row) for row in cursor.fetchall()]
+    key_values = [pop_key_values(card, keys) for card in cards]
+    next_cursor = encode_cursor(sort, key_values[pageSize - 1]) if len(cards) > pageSize else None
+    return cards[:pageSize], next_cursor
+
+
+def card_documents(cursor, cards, detailed=False, fieldset=None, sets=None):
+    """Rendered JSON for card rows, as {card_id: json text}.
+
+    sets are the rendered sets of the request's reference catalog snapshot,
+    so cards never embed a set older than the one /sets serves.
+    """
+    # Sparse fieldsets are rendered from the projected rows
+    if fieldset:
+        return {card['id']: dump_document(card) for card in fieldset.render(cursor, cards, detailed, known_sets=sets)}
+    
+    # Serve pre-rendered card documents; cards without one yet are
+    # assembled in a single batched enrichment pass
+    documents = load_card_documents(cursor, [card['id'] for card in cards], column='detail' if detailed else 'summary')
+    missing = [card for card in cards if card['id'] not in documents]
+    for card in enrich_cards(cursor, missing, detailed_variants=detailed, known_sets=sets):
+        documents[card['id']] = dump_document(card)
+    return documents
+
+
+def card_list_response(cursor, cards, fieldset=None, sets=None, **meta):
+    """Render a page of card rows as a {"data": [...], **meta} response"""
+    with phase("enrichment"):
+        documents = card_documents(cursor, cards, fieldset=fieldset, sets=sets)
+    with phase("serialization"):
+        body = render_envelope(render_list(documents[card['id']] for card in cards), **meta)
+    return Response(content=body, media_type="application/json")
+
+
+def page_meta(page, pageSize, cards, total_count, count, count_exact, next_cursor):
+    """Pagination fields of a card listing envelope"""
+    meta = {"page": page, "pageSize": pageSize, "count": len(cards), "totalCount": total_count}
+    if count != "exact":
+        meta["totalCountExact"] = count_exact
+    meta["nextCursor"] = next_cursor
+    return meta
+
+
+def _fetch_cards(conn, page, pageSize, filters, sort, page_cursor, count, fields, include, sets):
+    """Load one filtered, sorted page of cards"""
+    cursor = conn.cursor()
+    fieldset = card_fieldset(cursor, fields, include)
+    
+    join_sql, where_clauses, params = card_filter_sql(cursor, filters)
+    from_sql = f"FROM cards c {join_sql}"
+    where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
+    
+    # Get total count (cached per filter combination until the next sync)
+    count_key = ("cards",) + filters.key()
+    with phase("count"):
+        total_count, count_exact = count_matches(cursor, count, count_key, f"{from_sql} WHERE {where_sql}", params)
+    
+    sorts = card_sorts(cursor)
+    keys = sorts.get(sort, sorts["newest"])
+    with phase("page"):
+        cards, next_cursor = fetch_card_page(cursor, from_sql, where_sql, params, keys, sort, page, pageSize, page_cursor, fieldset)
+    
+    return card_list_response(cursor, cards, fieldset, sets, **page_meta(page, pageSize, cards, total_count, count, count_exact, next_cursor))
+
+
 @app.get("/cards")
 async def get_cards(
     page: int = Query(1, ge=1, description="Page number"),
     pageSize: int = Query(10, ge=1, le=250, description="Number of cards per page"),
-    name: Optional[str] = Query(None, description="Filter by card name (partial match)"),
-    supertype: Optional[str] = Query(None, description="Filter by supertype"),
-    subtype: Optional[str] = Query(None, description="Filter by subtype"),
-    set_id: Optional[str] = Query(None, description="Filter by set ID"),
-    rarity: Optional[str] = Query(None, description="Filter by rarity"),
-    type: Optional[str] = Query(None, description="Filter by Pokemon type"),
-    sort: Optional[str] = Query("newest", description="Sort order: newest, oldest, name-asc, name-desc, hp-asc, hp-desc, rarity-asc, rarity-desc, number-asc, number-desc")
+    filters: CardFilters = Depends(),
+    sort: Optional[str] = Query("newest", description="Sort order: newest, oldest, name-asc, name-desc, hp-asc, hp-desc, rarity-asc, rarity-desc, number-asc, number-desc"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from a previous response's nextCursor (page is ignored)"),
+    count: str = Query("exact", pattern="^(none|estimate|exact)$", description="totalCount mode: exact, estimate (counts up to a limit) or none (only if already cached)"),
+    fields: Optional[str] = Query(None, description="Comma-separated card fields to return, e.g. id,name,number,images,rarity (default all)"),
+    include: Optional[str] = Query(None, description="Comma-separated relations to load: types, subtypes, attacks, abilities, weaknesses, resistances, variants, set (default all unless fields is given)")
 ):
     """Get Pokemon TCG cards with filtering and pagination"""
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # Build WHERE clause
-        where_clauses = []
-        params = []
-        
-        # Determine if we need to join with card_types or card_subtypes
-        needs_type_join = type is not None
-        needs_subtype_join = subtype is not None
-        
-        # Base table reference
-        table_ref = "cards c"
-        joins = []
-        
-        if needs_type_join:
-            joins.append("INNER JOIN card_types ct ON c.id = ct.card_id")
-            where_clauses.append("ct.type_name = ?")
-            params.append(type)
-        
-        if needs_subtype_join:
-            joins.append("INNER JOIN card_subtypes cs ON c.id = cs.card_id")
-            where_clauses.append("cs.subtype_name = ?")
-            params.append(subtype)
-        
-        if name:
-            where_clauses.append("c.name LIKE ?")
-            params.append(f"%{name}%")
-        if supertype:
-            where_clauses.append("c.supertype = ?")
-            params.append(supertype)
-        if set_id:
-            where_clauses.append("c.set_id = ?")
-            params.append(set_id)
-        if rarity:
-            where_clauses.append("c.rarity = ?")
-            params.append(rarity)
-        
-        where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
-        join_sql = " ".join(joins) if joins else ""
-        
-        # Get total count - use DISTINCT since joins might create duplicates
-        count_query = f"SELECT COUNT(DISTINCT c.id) FROM {table_ref} {join_sql} WHERE {where_sql}"
-        cursor.execute(count_query, params)
-        total_count = cursor.fetchone()[0]
-        
-        # Calculate offset
-        offset = (page - 1) * pageSize
-        
-        # Determine ORDER BY clause based on sort parameter
-        if sort == "oldest":
-            # Oldest sets first, then by card number
-            order_by = """ORDER BY c.set_id ASC, 
-                         CAST(
-                             CASE 
-                                 WHEN c.number GLOB '[0-9]*' 
-                                 THEN SUBSTR(c.number, 1, INSTR(c.number || '/', '/') - 1)
-                                 ELSE c.number 
-                             END AS INTEGER
-                         ),
-                         c.number"""
-        elif sort == "name-asc":
-            # Alphabetical A-Z
-            order_by = "ORDER BY c.name ASC, c.set_id"
-        elif sort == "name-desc":
-            # Alphabetical Z-A
-            order_by = "ORDER BY c.name DESC, c.set_id"
-        elif sort == "hp-asc":
-            # HP ascending (nulls last)
-            order_by = "ORDER BY CAST(c.hp AS INTEGER) ASC, c.hp IS NULL, c.name ASC"
-        elif sort == "hp-desc":
-            # HP descending (nulls last)
-            order_by = "ORDER BY CAST(c.hp AS INTEGER) DESC, c.hp IS NULL, c.name ASC"
-        elif sort == "rarity-asc":
-            # Rarity ascending (Common first)
-            order_by = """ORDER BY 
-                         CASE c.rarity
-                             WHEN 'Common' THEN 1
-                             WHEN 'Uncommon' THEN 2
-                             WHEN 'Rare' THEN 3
-                             WHEN 'Rare Holo' THEN 4
-                             WHEN 'Rare Holo EX' THEN 5
-                             WHEN 'Rare Holo GX' THEN 6
-                             WHEN 'Rare Holo V' THEN 7
-                             WHEN 'Rare Holo VMAX' THEN 8
-                             WHEN 'Rare Ultra' THEN 9
-                             WHEN 'Rare Secret' THEN 10
-                             WHEN 'Rare Rainbow' THEN 11
-                             WHEN 'Amazing Rare' THEN 12
-                             WHEN 'Hyper Rare' THEN 13
-                             ELSE 999
-                         END ASC,
-                         c.name ASC"""
-        elif sort == "rarity-desc":
-            # Rarity descending (Rare first)
-            order_by = """ORDER BY 
-                         CASE c.rarity
-                             WHEN 'Common' THEN 1
-                             WHEN 'Uncommon' THEN 2
-                             WHEN 'Rare' THEN 3
-                             WHEN 'Rare Holo' THEN 4
-                             WHEN 'Rare Holo EX' THEN 5
-                             WHEN 'Rare Holo GX' THEN 6
-                             WHEN 'Rare Holo V' THEN 7
-                             WHEN 'Rare Holo VMAX' THEN 8
-                             WHEN 'Rare Ultra' THEN 9
-                             WHEN 'Rare Secret' THEN 10
-                             WHEN 'Rare Rainbow' THEN 11
-                             WHEN 'Amazing Rare' THEN 12
-                             WHEN 'Hyper Rare' THEN 13
-                             ELSE 999
-                         END DESC,
-                         c.name ASC"""
-        elif sort == "number-asc":
-            # Card number ascending
-            order_by = """ORDER BY 
-                         CAST(
-                             CASE 
-                                 WHEN c.number GLOB '[0-9]*' 
-                                 THEN SUBSTR(c.number, 1, INSTR(c.number || '/', '/') - 1)
-                                 ELSE c.number 
-                             END AS INTEGER
-                         ) ASC,
-                         c.number ASC"""
-        elif sort == "number-desc":
-            # Card number descending
-            order_by = """ORDER BY 
-                         CAST(
-                             CASE 
-                                 WHEN c.number GLOB '[0-9]*' 
-                                 THEN SUBSTR(c.number, 1, INSTR(c.number || '/', '/') - 1)
-                                 ELSE c.number 
-                             END AS INTEGER
-                         ) DESC,
-                         c.number DESC"""
-        else:  # "newest" is default
-            # Newest sets first, then by card number (need to join with sets to get release_date)
-            order_by = """ORDER BY (SELECT s.release_date FROM sets s WHERE s.id = c.set_id) DESC,
-                         CAST(
-                             CASE 
-                                 WHEN c.number GLOB '[0-9]*' 
-                                 THEN SUBSTR(c.number, 1, INSTR(c.number || '/', '/') - 1)
-                                 ELSE c.number 
-                             END AS INTEGER
-                         ),
-                         c.number"""
-        
-        # Get cards - use DISTINCT to avoid duplicates from joins
-        cards_query = f"""
-            SELECT DISTINCT c.* FROM {table_ref} 
-            {join_sql}
-            WHERE {where_sql}
-            {order_by}
-            LIMIT ? OFFSET ?
-        """
-        cursor.execute(cards_query, params + [pageSize, offset])
-        
-        cards = [dict_from_row(row) for row in cursor.fetchall()]
-        
-        # Parse JSON fields and build images
-        for card in cards:
-            card_id = card['id']
-            
-            # Fetch types from the card_types relationship table
-            cursor.execute("SELECT type_name FROM card_types WHERE card_id = ?", (card_id,))
-            type_rows = cursor.fetchall()
-            if type_rows:
-                card['types'] = [row[0] for row in type_rows]
-            
-            # Fetch subtypes from the card_subtypes relationship table
-            cursor.execute("SELECT subtype_name FROM card_subtypes WHERE card_id = ?", (card_id,))
-            subtype_rows = cursor.fetchall()
-            if subtype_rows:
-                card['subtypes'] = [row[0] for row in subtype_rows]
-            
-            # Fetch attacks from attacks table
-            cursor.execute("SELECT name, cost, converted_energy_cost, damage, text FROM attacks WHERE card_id = ? ORDER BY id", (card_id,))
-            attack_rows = cursor.fetchall()
-            if attack_rows:
-                card['attacks'] = []
-                for attack_row in attack_rows:
-                    attack_dict = {
-                        'name': attack_row[0],
-                        'cost': json.loads(attack_row[1]) if attack_row[1] else [],
-                        'convertedEnergyCost': attack_row[2],
-                        'damage': attack_row[3],
-                        'text': attack_row[4]
-                    }
-                    card['attacks'].append(attack_dict)
-            
-            # Fetch abilities from abilities table
-            cursor.execute("SELECT name, text, ability_type FROM abilities WHERE card_id = ? ORDER BY id", (card_id,))
-            ability_rows = cursor.fetchall()
-            if ability_rows:
-                card['abilities'] = []
-                for ability_row in ability_rows:
-                    ability_dict = {
-                        'name': ability_row[0],
-                        'text': ability_row[1],
-                        'type': ability_row[2]
-                    }
-                    card['abilities'].append(ability_dict)
-            
-            # Fetch weaknesses from weaknesses table
-            cursor.execute("SELECT type, value FROM weaknesses WHERE card_id = ?", (card_id,))
-            weakness_rows = cursor.fetchall()
-            if weakness_rows:
-                card['weaknesses'] = [{'type': row[0], 'value': row[1]} for row in weakness_rows]
-            
-            # Fetch resistances from resistances table
-            cursor.execute("SELECT type, value FROM resistances WHERE card_id = ?", (card_id,))
-            resistance_rows = cursor.fetchall()
-            if resistance_rows:
-                card['resistances'] = [{'type': row[0], 'value': row[1]} for row in resistance_rows]
-            
-            # Fetch card variants from card_variants table (if table exists)
-            try:
-                cursor.execute("""
-                    SELECT variant_type, tcgplayer_product_id,
-                           market_price, low_price, mid_price, high_price, direct_low_price
-                    FROM card_variants 
-                    WHERE card_id = ? 
-                    ORDER BY variant_type
-                """, (card_id,))
-                variant_rows = cursor.fetchall()
-                if variant_rows:
-                    card['variants'] = []
-                    for variant_row in variant_rows:
-                        variant_dict = {
-                            'variantType': variant_row[0],
-                            'tcgplayerProductId': variant_row[1],
-                            'marketPrice': variant_row[2],
-                            'lowPrice': variant_row[3],
-                            'midPrice': variant_row[4],
-                            'highPrice': variant_row[5],
-                            'directLowPrice': variant_row[6]
-                        }
-                        card['variants'].append(variant_dict)
-            except Exception as e:
-                # Log the error for debugging
-                import logging
-                logging.error(f"Failed to fetch variants for card {card_id}: {str(e)}")
-                import traceback
-                logging.error(traceback.format_exc())
-                pass
-            
-            # Parse JSON fields from card table
-            for field in ['rules', 'retreat_cost', 'national_pokedex_numbers', 'evolves_to']:
-                if card.get(field):
-                    try:
-                        card[field] = json.loads(card[field])
-                    except:
-                        pass
-            
-            # Fetch set information
-            set_id = card.get('set_id')
-            if set_id:
-                cursor.execute("SELECT * FROM sets WHERE id = ?", (set_id,))
-                set_row = cursor.fetchone()
-                if set_row:
-                    set_data = dict_from_row(set_row)
-                    build_set_images(set_data)
-                    card['set'] = convert_keys_to_camel_case(set_data)
-            
-            # Build images from image_small and image_large with hosted URLs
-            build_card_images(card)
-        
-        # Convert all cards to camelCase
-        cards = [convert_keys_to_camel_case(card) for card in cards]
-        
-        conn.close()
+        catalog = await reference_catalog()
+        return await run_db(_fetch_cards, page, pageSize, filters, sort, cursor, count, fields, include, catalog.sets)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _search_cards(conn, q, page, pageSize, filters, page_cursor, count, fields, include, sets):
+    """Full-text search over card names, attacks, abilities and rules, best matches first"""
+    cursor = conn.cursor()
+    fieldset = card_fieldset(cursor, fields, include)
+    
+    match = fts_query(q)
+    if not match:
+        raise HTTPException(status_code=400, detail="q must contain at least one word")
+    
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'card_search'")
+    if not cursor.fetchone():
+        raise HTTPException(status_code=503, detail="Search index has not been built yet")
+    
+    join_sql, where_clauses, params = card_filter_sql(cursor, filters)
+    # Entries share their card's rowid; the card_id check skips any left
+    # behind by a card that was since removed
+    from_sql = f"FROM card_search INNER JOIN cards c ON c.rowid = card_search.rowid AND c.id = card_search.card_id {join_sql}"
+    where_sql = " AND ".join(["card_search MATCH ?"] + where_clauses)
+    params = [match] + params
+    
+    count_key = ("search", match) + filters.key()
+    with phase("count"):
+        total_count, count_exact = count_matches(cursor, count, count_key, f"{from_sql} WHERE {where_sql}", params)
+    
+    # BM25 relevance (lower is better), card ID as the tie breaker
+    keys = [(bm25_sql(), "ASC"), ("c.id", "ASC")]
+    with phase("page"):
+        cards, next_cursor = fetch_card_page(cursor, from_sql, where_sql, params, keys, "search", page, pageSize, page_cursor, fieldset)
+    
+    return card_list_response(cursor, cards, fieldset, sets, **page_meta(page, pageSize, cards, total_count, count, count_exact, next_cursor))
+
+
+@app.get("/cards/search")
+async def search_cards(
+    q: str = Query(..., min_length=1, description="Words to find in card names, attacks, abilities, rules and flavor text (prefix match)"),
+    page: int = Query(1, ge=1, description="Page number"),
+    pageSize: int = Query(10, ge=1, le=250, description="Number of cards per page"),
+    filters: CardFilters = Depends(),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from a previous response's nextCursor (page is ignored)"),
+    count: str = Query("exact", pattern="^(none|estimate|exact)$", description="totalCount mode: exact, estimate (counts up to a limit) or none (only if already cached)"),
+    fields: Optional[str] = Query(None, description="Comma-separated card fields to return, e.g. id,name,number,images,rarity (default all)"),
+    include: Optional[str] = Query(None, description="Comma-separated relations to load: types, subtypes, attacks, abilities, weaknesses, resistances, variants, set (default all unless fields is given)")
+):
+    """Search Pokemon TCG cards by text, ranked by relevance"""
+    try:
+        catalog = await reference_catalog()
+        return await run_db(_search_cards, q, page, pageSize, filters, cursor, count, fields, include, catalog.sets)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# /cards/facets histograms: facet name -> SQL grouping the matched cards by
+# one value (card columns come from the matched set, types/subtypes from
+# their junction tables)
+CARD_FACETS = {
+    "supertype": "SELECT m.supertype, COUNT(*) FROM matched m GROUP BY m.supertype",
+    "subtype": "SELECT cs.subtype_name, COUNT(*) FROM matched m INNER JOIN card_subtypes cs ON cs.card_id = m.id GROUP BY cs.subtype_name",
+    "type": "SELECT ct.type_name, COUNT(*) FROM matched m INNER JOIN card_types ct ON ct.card_id = m.id GROUP BY ct.type_name",
+    "rarity": "SELECT m.rarity, COUNT(*) FROM matched m GROUP BY m.rarity",
+    "set": "SELECT m.set_id, COUNT(*) FROM matched m GROUP BY m.set_id",
+}
+
+# Facet tag of the row holding the number of matched cards
+TOTAL_FACET = "__total__"
+
+
+def _fetch_card_facets(conn, filters, catalog):
+    """Card counts per supertype, subtype, type, rarity and set over the filtered cards"""
+    cursor = conn.cursor()
+    key = filters.key()
+    
+    generation = read_generation(cursor)
+    facet_cache.set_generation(generation)
+    facets = facet_cache.get(key)
+    if facets is not None:
+        return facets
+    
+    join_sql, where_clauses, params = card_filter_sql(cursor, filters)
+    where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
+    
+    # One statement: the filtered cards are matched once (SQLite materializes a
+    # CTE referenced more than once) and every facet is grouped from them.
+    # Compound SELECT rows come back in no guaranteed order, so every row is
+    # tagged with its facet, the total included
+    groups = [f"SELECT ?, * FROM ({sql})" for sql in CARD_FACETS.values()]
+    cursor.execute(
+        f"""
+        WITH matched AS (SELECT DISTINCT c.id, c.supertype, c.rarity, c.set_id FROM cards c {join_sql} WHERE {where_sql})
+        SELECT ?, NULL, COUNT(*) FROM matched
+        UNION ALL {" UNION ALL ".join(groups)}
+        """,
+        params + [TOTAL_FACET] + list(CARD_FACETS)
+    )
+    
+    total = 0
+    counts = {facet: [] for facet in CARD_FACETS}
+    for facet, value, count in cursor.fetchall():
+        if facet == TOTAL_FACET:
+            total = count
+        else:
+            counts[facet].append({"value": value, "count": count})
+    
+    # Largest buckets first; sets also carry their name
+    for facet, buckets in counts.items():
+        buckets.sort(key=lambda bucket: (-bucket["count"], bucket["value"] is None, bucket["value"] or ""))
+        if facet == "set":
+            for bucket in buckets:
+                bucket["name"] = catalog.sets.get(bucket["value"], {}).get("name")
+    
+    facets = {"data": counts, "totalCount": total}
+    # Set names from a catalog snapshot older than the data are not cached
+    # under the newer generation
+    if catalog.generation == generation:
+        facet_cache.put(key, facets, generation)
+    count_cache.put(("cards",) + key, total, generation)
+    return facets
+
+
+@app.get("/cards/facets")
+async def get_card_facets(filters: CardFilters = Depends()):
+    """Card counts per supertype, subtype, type, rarity and set for the cards matching the /cards filters"""
+    try:
+        catalog = await reference_catalog()
+        return await run_db(_fetch_card_facets, filters, catalog)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def parse_updated_since(updated_since):
+    """Normalize an ISO 8601 date/time to the stored synced_at format (UTC)"""
+    if not updated_since:
+        return None
+    try:
+        since = datetime.fromisoformat(updated_since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="updated_since must be an ISO 8601 date or date/time")
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def export_cards(set_id, updated_since, detail, fieldset=None, sets=None):
+    """Yield NDJSON chunks of every matching card, ordered by ID.
+
+    Rows are read through one open cursor a batch at a time, so memory stays
+    constant however large the catalog is. The stream reads on a connection
+    of its own rather than a pooled one: a slow or stalled client can take
+    as long as it likes without starving other requests, and the connection
+    (and its read snapshot) is closed when the stream finishes or is dropped.
+    """
+    where_clauses = []
+    params = []
+    if set_id:
+        where_clauses.append("c.set_id = ?")
+        params.append(set_id)
+    if updated_since:
+        where_clauses.append("c.synced_at >= ?")
+        params.append(updated_since)
+    where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
+    
+    with db_pool.dedicated() as conn:
+        rows_cursor = conn.cursor()
+        rows_cursor.execute(f"SELECT {card_select_sql(fieldset)} FROM cards c WHERE {where_sql} ORDER BY c.id", params)
+        documents_cursor = conn.cursor()
         
-        return {
-            "data": cards,
-            "page": page,
-            "pageSize": pageSize,
-            "count": len(cards),
-            "totalCount": total_count
-        }
+        while True:
+            rows = rows_cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            cards = [dict_from_row(row) for row in rows]
+            documents = card_documents(documents_cursor, cards, detailed=detail, fieldset=fieldset, sets=sets)
+            yield "".join(documents[card['id']] + "\n" for card in cards)
+
+
+class ExportStream:
+    """Export chunks holding one of the export_slots until the stream is done.
+
+    The slot is released when the stream is exhausted or fails, and also when
+    it is dropped without being read to the end (e.g. the client disconnected,
+    possibly before the first chunk).
+    """
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._release = weakref.finalize(self, export_slots.release)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._chunks)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        self._chunks.close()
+        self._release()
+
+
+@app.get("/cards/export")
+async def export_cards_ndjson(
+    set_id: Optional[str] = Query(None, description="Only cards from this set"),
+    updated_since: Optional[str] = Query(None, description="Only cards synced at or after this ISO 8601 date/time (UTC unless an offset is given)"),
+    detail: bool = Query(True, description="Full /cards/{card_id} shape (all variant columns); false for the listing shape"),
+    fields: Optional[str] = Query(None, description="Comma-separated card fields to return, e.g. id,name,number,images,rarity (default all)"),
+    include: Optional[str] = Query(None, description="Comma-separated relations to load: types, subtypes, attacks, abilities, weaknesses, resistances, variants, set (default all unless fields is given)")
+):
+    """Stream every card as newline-delimited JSON (one card per line)"""
+    if not export_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Too many exports in progress, retry shortly",
+            headers={"Retry-After": str(EXPORT_RETRY_AFTER)}
+        )
+    try:
+        since = parse_updated_since(updated_since)
+        catalog = await reference_catalog()
+        fieldset = await run_db(lambda conn: card_fieldset(conn.cursor(), fields, include))
+        stream = ExportStream(export_cards(set_id, since, detail, fieldset, catalog.sets))
+    except HTTPException:
+        export_slots.release()
+        raise
+    except Exception as e:
+        export_slots.release()
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(stream, media_type="application/x-ndjson")
+
+
+def _fetch_card_batch(conn, ids, detail, fields, include, sets):
+    """Load many cards by ID in one set-based pass, in request order"""
+    cursor = conn.cursor()
+    fieldset = card_fieldset(cursor, fields, include)
+    
+    # Each ID is returned once, at its first position in the request
+    ids = list(dict.fromkeys(ids))
+    sql = f"SELECT {card_select_sql(fieldset)} FROM cards c WHERE c.id IN ({{ids}})"
+    with phase("page"):
+        rows = {row['id']: dict_from_row(row) for row in fetch_in(cursor, sql, ids)}
+    cards = [rows[card_id] for card_id in ids if card_id in rows]
+    missing = [card_id for card_id in ids if card_id not in rows]
+    
+    with phase("enrichment"):
+        documents = card_documents(cursor, cards, detailed=detail, fieldset=fieldset, sets=sets)
+    with phase("serialization"):
+        body = render_envelope(
+            render_list(documents[card['id']] for card in cards),
+            count=len(cards),
+            missing=missing
+        )
+    return Response(content=body, media_type="application/json")
+
+
+@app.post("/cards/batch")
+async def get_card_batch(
+    ids: List[str] = Body(..., embed=True, min_length=1, max_length=CARD_BATCH_MAX, description=f"Card IDs to fetch (at most {CARD_BATCH_MAX})"),
+    detail: bool = Query(False, description="Return the full /cards/{card_id} shape (all variant columns) instead of the listing shape"),
+    fields: Optional[str] = Query(None, description="Comma-separated card fields to return, e.g. id,name,number,images,rarity (default all)"),
+    include: Optional[str] = Query(None, description="Comma-separated relations to load: types, subtypes, attacks, abilities, weaknesses, resistances, variants, set (default all unless fields is given)")
+):
+    """Get many cards by ID, in request order; IDs that don't exist are listed in missing"""
+    try:
+        catalog = await reference_catalog()
+        return await run_db(_fetch_card_batch, ids, detail, fields, include, catalog.sets)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _fetch_card(conn, card_id, fields, include, sets):
+    """Load a card by ID with full variant detail"""
+    cursor = conn.cursor()
+    fieldset = card_fieldset(cursor, fields, include)
+    
+    # Pre-rendered document is a single primary key lookup
+    if not fieldset:
+        with phase("page"):
+            documents = load_card_documents(cursor, [card_id], column='detail')
+        if card_id in documents:
+            return Response(content=render_envelope(documents[card_id]), media_type="application/json")
+    
+    with phase("page"):
+        cursor.execute(f"SELECT {card_select_sql(fieldset)} FROM cards c WHERE c.id = ?", (card_id,))
+        row = cursor.fetchone()
+    
+    if not row:
+        raise HTTPException(status_code=404, detail=f"Card '{card_id}' not found")
+    
+    # Same rendering path as /cards, with the full variant detail
+    with phase("enrichment"):
+        documents = card_documents(cursor, [dict_from_row(row)], detailed=True, fieldset=fieldset, sets=sets)
+    with phase("serialization"):
+        body = render_envelope(documents[card_id])
+    return Response(content=body, media_type="application/json")
+
+
 @app.get("/cards/{card_id}")
-async def get_card(card_id: str):
+async def get_card(
+    card_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated card fields to return, e.g. id,name,number,images,rarity (default all)"),
+    include: Optional[str] = Query(None, description="Comma-separated relations to load: types, subtypes, attacks, abilities, weaknesses, resistances, variants, set (default all unless fields is given)")
+):
     """Get a specific card by ID"""
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM cards WHERE id = ?", (card_id,))
-        row = cursor.fetchone()
-        
-        if not row:
-            conn.close()
-            raise HTTPException(status_code=404, detail=f"Card '{card_id}' not found")
-        
-        card = dict_from_row(row)
-        
-        # Fetch types from the card_types relationship table
-        cursor.execute("SELECT type_name FROM card_types WHERE card_id = ?", (card_id,))
-        type_rows = cursor.fetchall()
-        if type_rows:
-            card['types'] = [row[0] for row in type_rows]
-        
-        # Fetch subtypes from the card_subtypes relationship table
-        cursor.execute("SELECT subtype_name FROM card_subtypes WHERE card_id = ?", (card_id,))
-        subtype_rows = cursor.fetchall()
-        if subtype_rows:
-            card['subtypes'] = [row[0] for row in subtype_rows]
-        
-        # Fetch attacks from attacks table
-        cursor.execute("SELECT name, cost, converted_energy_cost, damage, text FROM attacks WHERE card_id = ? ORDER BY id", (card_id,))
-        attack_rows = cursor.fetchall()
-        if attack_rows:
-            card['attacks'] = []
-            for attack_row in attack_rows:
-                attack_dict = {
-                    'name': attack_row[0],
-                    'cost': json.loads(attack_row[1]) if attack_row[1] else [],
-                    'convertedEnergyCost': attack_row[2],
-                    'damage': attack_row[3],
-                    'text': attack_row[4]
-                }
-                card['attacks'].append(attack_dict)
-        
-        # Fetch abilities from abilities table
-        cursor.execute("SELECT name, text, ability_type FROM abilities WHERE card_id = ? ORDER BY id", (card_id,))
-        ability_rows = cursor.fetchall()
-        if ability_rows:
-            card['abilities'] = []
-            for ability_row in ability_rows:
-                ability_dict = {
-                    'name': ability_row[0],
-                    'text': ability_row[1],
-                    'type': ability_row[2]
-                }
-                card['abilities'].append(ability_dict)
-        
-        # Fetch weaknesses from weaknesses table
-        cursor.execute("SELECT type, value FROM weaknesses WHERE card_id = ?", (card_id,))
-        weakness_rows = cursor.fetchall()
-        if weakness_rows:
-            card['weaknesses'] = [{'type': row[0], 'value': row[1]} for row in weakness_rows]
-        
-        # Fetch resistances from resistances table
-        cursor.execute("SELECT type, value FROM resistances WHERE card_id = ?", (card_id,))
-        resistance_rows = cursor.fetchall()
-        if resistance_rows:
-            card['resistances'] = [{'type': row[0], 'value': row[1]} for row in resistance_rows]
-        
-        # Fetch card variants from card_variants table (if table exists)
-        try:
-            cursor.execute("""
-                SELECT id, variant_type, tcgplayer_product_id, tcgplayer_url, 
-                       market_price, low_price, mid_price, high_price, direct_low_price,
-                       cardmarket_url, cardmarket_avg_price, cardmarket_low_price, cardmarket_trend_price,
-                       is_available, last_price_update
-                FROM card_variants 
-                WHERE card_id = ? 
-                ORDER BY variant_type
-            """, (card_id,))
-            variant_rows = cursor.fetchall()
-            if variant_rows:
-                card['variants'] = []
-                for variant_row in variant_rows:
-                    variant_dict = {
-                        'id': variant_row[0],
-                        'variantType': variant_row[1],
-                        'tcgplayerProductId': variant_row[2],
-                        'tcgplayerUrl': variant_row[3],
-                        'marketPrice': variant_row[4],
-                        'lowPrice': variant_row[5],
-                        'midPrice': variant_row[6],
-                        'highPrice': variant_row[7],
-                        'directLowPrice': variant_row[8],
-                        'cardmarketUrl': variant_row[9],
-                        'cardmarketAvgPrice': variant_row[10],
-                        'cardmarketLowPrice': variant_row[11],
-                        'cardmarketTrendPrice': variant_row[12],
-                        'isAvailable': variant_row[13],
-                        'lastPriceUpdate': variant_row[14]
-                    }
-                    card['variants'].append(variant_dict)
-        except Exception as e:
-            # Table might not exist yet - skip variants
-            pass
-        
-        # Parse JSON fields (rules, legalities, retreat_cost, etc.)
-        for field in ['rules', 'retreat_cost', 'national_pokedex_numbers', 'evolves_to']:
-            if card.get(field):
-                try:
-                    card[field] = json.loads(card[field])
-                except:
-                    pass
-        
-        # Fetch set information
-        set_id = card.get('set_id')
-        if set_id:
-            cursor.execute("SELECT * FROM sets WHERE id = ?", (set_id,))
-            set_row = cursor.fetchone()
-            if set_row:
-                set_data = dict_from_row(set_row)
-                build_set_images(set_data)
-                card['set'] = convert_keys_to_camel_case(set_data)
-        
-        # Build images from image_small and image_large with hosted URLs
-        build_card_images(card)
-        
-        # Convert snake_case keys to camelCase for frontend compatibility
-        card = convert_keys_to_camel_case(card)
-        
-        conn.close()
-        
-        return {"data": card}
+        catalog = await reference_catalog()
+        return await run_db(_fetch_card, card_id, fields, include, catalog.sets)
     except HTTPException:
         raise
     except Exception as e:
@@ -699,15 +1109,8 @@ async def get_card(card_id: str):
 async def get_types():
     """Get all Pokemon types"""
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT name FROM types ORDER BY name")
-        types = [row[0] for row in cursor.fetchall()]
-        
-        conn.close()
-        
-        return {"data": types}
+        catalog = await reference_catalog()
+        return {"data": catalog.lists["types"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -780,15 +1183,8 @@ async def proxy_image(image_path: str):
 async def get_subtypes():
     """Get all card subtypes"""
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT name FROM subtypes ORDER BY name")
-        subtypes = [row[0] for row in cursor.fetchall()]
-        
-        conn.close()
-        
-        return {"data": subtypes}
+        catalog = await reference_catalog()
+        return {"data": catalog.lists["subtypes"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -797,15 +1193,8 @@ async def get_subtypes():
 async def get_supertypes():
     """Get all card supertypes"""
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT name FROM supertypes ORDER BY name")
-        supertypes = [row[0] for row in cursor.fetchall()]
-        
-        conn.close()
-        
-        return {"data": supertypes}
+        catalog = await reference_catalog()
+        return {"data": catalog.lists["supertypes"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -814,15 +1203,8 @@ async def get_supertypes():
 async def get_rarities():
     """Get all card rarities"""
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT name FROM rarities ORDER BY name")
-        rarities = [row[0] for row in cursor.fetchall()]
-        
-        conn.close()
-        
-        return {"data": rarities}
+        catalog = await reference_catalog()
+        return {"data": catalog.lists["rarities"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,108 @@
+"""
+In-Process Caches for the API
+LRU caches whose entries are only valid for one data generation; observing a
+new generation (after a sync) empties the cache
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+
+class GenerationCache:
+    """Thread-safe LRU cache tied to the database's data generation.
+
+    Bounded by entry count and/or total size in bytes. Caching is disabled
+    while the generation is unknown (None), i.e. on databases created before
+    the generation counter existed.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.generation = None
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def set_generation(self, generation):
+        """Record the current data generation, dropping entries from older ones"""
+        with self._lock:
+            if generation != self.generation:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._bytes = 0
+                self.generation = generation
+
+    def get(self, key):
+        """Cached value for key, or None"""
+        with self._lock:
+            if self.generation is None:
+                return None
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, generation, size=0):
+        """Cache value (of size bytes) if it was computed for the current generation"""
+        with self._lock:
+            if generation is None or generation != self.generation:
+                return
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._entries and (
+                (self.max_entries is not None and len(self._entries) > self.max_entries)
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                self._bytes -= self._entries.popitem(last=False)[1][1]
+                self.evictions += 1
+
+    def stats(self):
+        """Size and hit/miss counters"""
+        with self._lock:
+            return {
+                "generation": self.generation,
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+
+def request_cache_key(path, query_items):
+    """Cache key for a request: path plus its query parameters in sorted order"""
+    return path + "?" + urlencode(sorted(query_items))
+
+
+def make_etag(generation, key):
+    """Strong ETag for the response to key at a data generation"""
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return f'"{generation}-{digest}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header matches etag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
@@ -0,0 +1,358 @@
+"""
+Bulk Card Writer
+Writes a batch of cards in one transaction: one upsert (INSERT ... ON
+CONFLICT DO UPDATE) for the card rows, then the batch's attacks, abilities,
+weaknesses, resistances and type/subtype links are deleted and bulk
+inserted. Used by both syncs, on SQLite and Postgres.
+
+Each card stores a hash of its source JSON (cards.content_hash); cards whose
+hash is unchanged are skipped entirely, so a re-sync only rewrites (and
+re-renders) the cards that actually changed.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import inspect, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .models import (
+    Card, CardDocument, CardVariant, Attack, Ability, Weakness, Resistance, Type, Subtype,
+    card_types_table, card_subtypes_table
+)
+from .sort_keys import sort_key_values
+
+logger = logging.getLogger(__name__)
+
+cards_table = Card.__table__
+
+# Child tables replaced wholesale for every card in a batch
+CHILD_TABLES = [
+    Attack.__table__, Ability.__table__, Weakness.__table__, Resistance.__table__,
+    card_types_table, card_subtypes_table
+]
+
+PRICING_COLUMNS = [
+    'tcgplayer_url', 'tcgplayer_updated_at', 'market_price', 'low_price', 'mid_price', 'high_price',
+    'cardmarket_url', 'cardmarket_updated_at', 'cardmarket_avg_price', 'cardmarket_low_price',
+    'cardmarket_trend_price'
+]
+
+# Card IDs per ... WHERE card_id IN (...) statement
+ID_CHUNK = 500
+
+# Bump when card_row / child_rows change what they store, so every card is
+# rewritten once by the next sync
+CONTENT_HASH_VERSION = 1
+
+
+def ensure_content_hash_column(engine):
+    """Add cards.content_hash to databases created before it existed"""
+    existing = {column['name'] for column in inspect(engine).get_columns('cards')}
+    if 'content_hash' not in existing:
+        logger.info("Adding cards.content_hash column")
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE cards ADD COLUMN content_hash VARCHAR"))
+
+
+def content_hash(card_data, set_id, include_pricing=True):
+    """SHA-256 of a card's canonical source JSON (and the inputs that shape its rows)"""
+    canonical = json.dumps(
+        [CONTENT_HASH_VERSION, set_id, include_pricing, card_data],
+        sort_keys=True, separators=(',', ':'), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _json_list(value):
+    return json.dumps(value) if value else None
+
+
+def card_row(card_data, set_id, set_release_date, include_pricing=True):
+    """cards table values for one card from the pokemontcg.io JSON"""
+    legalities = card_data.get('legalities', {})
+    images = card_data.get('images', {})
+    row = {
+        'id': card_data['id'],
+        'name': card_data.get('name'),
+        'supertype': card_data.get('supertype'),
+        'hp': card_data.get('hp'),
+        'level': card_data.get('level'),
+        'set_id': set_id,
+        'number': card_data.get('number'),
+        'evolves_from': card_data.get('evolvesFrom'),
+        'evolves_to': _json_list(card_data.get('evolvesTo')),
+        'rules': _json_list(card_data.get('rules')),
+        'flavor_text': card_data.get('flavorText'),
+        'artist': card_data.get('artist'),
+        'rarity': card_data.get('rarity'),
+        'regulation_mark': card_data.get('regulationMark'),
+        'retreat_cost': _json_list(card_data.get('retreatCost')),
+        'converted_retreat_cost': card_data.get('convertedRetreatCost'),
+        'national_pokedex_numbers': _json_list(card_data.get('nationalPokedexNumbers')),
+        'standard_legal': legalities.get('standard') == 'Legal',
+        'expanded_legal': legalities.get('expanded') == 'Legal',
+        'unlimited_legal': legalities.get('unlimited') == 'Legal',
+        'standard_banned': legalities.get('standard') == 'Banned',
+        'expanded_banned': legalities.get('expanded') == 'Banned',
+        'image_small': images.get('small'),
+        'image_large': images.get('large'),
+        'synced_at': datetime.now(timezone.utc)
+    }
+    row.update(sort_key_values(row['number'], row['rarity'], row['hp'], set_release_date))
+    if include_pricing:
+        row.update(pricing_values(card_data))
+    return row
+
+
+def pricing_values(card_data):
+    """Pricing columns: TCGplayer's first variant with a market price, and Cardmarket"""
+    values = dict.fromkeys(PRICING_COLUMNS)
+    tcg = card_data.get('tcgplayer')
+    if tcg:
+        values['tcgplayer_url'] = tcg.get('url')
+        values['tcgplayer_updated_at'] = tcg.get('updatedAt')
+        for price_data in tcg.get('prices', {}).values():
+            if 'market' in price_data:
+                values['market_price'] = price_data['market']
+                values['low_price'] = price_data.get('low')
+                values['mid_price'] = price_data.get('mid')
+                values['high_price'] = price_data.get('high')
+                break
+    cm = card_data.get('cardmarket')
+    if cm:
+        prices = cm.get('prices', {})
+        values['cardmarket_url'] = cm.get('url')
+        values['cardmarket_updated_at'] = cm.get('updatedAt')
+        values['cardmarket_avg_price'] = prices.get('averageSellPrice')
+        values['cardmarket_low_price'] = prices.get('lowPrice')
+        values['cardmarket_trend_price'] = prices.get('trendPrice')
+    return values
+
+
+def child_rows(card_data):
+    """Rows for each child table of one card (type links unfiltered)"""
+    card_id = card_data['id']
+    return {
+        Attack.__table__: [
+            {
+                'card_id': card_id,
+                'name': attack.get('name'),
+                'cost': json.dumps(attack.get('cost', [])),
+                'converted_energy_cost': attack.get('convertedEnergyCost'),
+                'damage': attack.get('damage'),
+                'text': attack.get('text')
+            }
+            for attack in card_data.get('attacks') or []
+            if attack.get('name')
+        ],
+        Ability.__table__: [
+            {
+                'card_id': card_id,
+                'name': ability.get('name'),
+                'text': ability.get('text'),
+                'ability_type': ability.get('type')
+            }
+            for ability in card_data.get('abilities') or []
+            if ability.get('name')
+        ],
+        Weakness.__table__: [
+            {'card_id': card_id, 'type': weakness.get('type'), 'value': weakness.get('value')}
+            for weakness in card_data.get('weaknesses') or []
+            if weakness.get('type') and weakness.get('value')
+        ],
+        Resistance.__table__: [
+            {'card_id': card_id, 'type': resistance.get('type'), 'value': resistance.get('value')}
+            for resistance in card_data.get('resistances') or []
+            if resistance.get('type') and resistance.get('value')
+        ],
+        card_types_table: [
+            {'card_id': card_id, 'type_name': name}
+            for name in dict.fromkeys(card_data.get('types') or [])
+        ],
+        card_subtypes_table: [
+            {'card_id': card_id, 'subtype_name': name}
+            for name in dict.fromkeys(card_data.get('subtypes') or [])
+        ]
+    }
+
+
+def _upsert(dialect_name):
+    """The dialect's INSERT construct with on_conflict_do_update"""
+    if dialect_name == 'postgresql':
+        return postgresql.insert(cards_table)
+    if dialect_name == 'sqlite':
+        return sqlite.insert(cards_table)
+    raise ValueError(f"Bulk card writes are not supported on {dialect_name}")
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class CardChanges:
+    """Card IDs a sync inserted, updated, left unchanged or deleted"""
+
+    def __init__(self):
+        self.inserted = []
+        self.updated = []
+        self.unchanged = []
+        self.deleted = []
+
+    def add(self, other):
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.unchanged += other.unchanged
+        self.deleted += other.deleted
+
+    @property
+    def written(self):
+        return self.inserted + self.updated
+
+    def changed_ids(self):
+        """IDs written or deleted: the cards whose documents and search entries need refreshing"""
+        return self.inserted + self.updated + self.deleted
+
+    def summary(self):
+        return (
+            f"{len(self.inserted)} inserted, {len(self.updated)} updated, "
+            f"{len(self.unchanged)} unchanged, {len(self.deleted)} deleted"
+        )
+
+
+class CardWriter:
+    """Writes batches of cards (and their child rows) in one transaction each"""
+
+    def __init__(self, engine, include_pricing=True):
+        self.engine = engine
+        self.include_pricing = include_pricing
+
+    def write(self, cards):
+        """Upsert cards given as (card_data, set_id, set_release_date) tuples.
+
+        Cards whose stored content hash matches are left untouched, and cards
+        that cannot be parsed are logged and left out. Returns the batch's
+        CardChanges; the whole batch is rolled back (and the error raised) if
+        the database rejects it.
+        """
+        changes = CardChanges()
+        batch = {}
+        for card_data, set_id, set_release_date in cards:
+            try:
+                digest = content_hash(card_data, set_id, self.include_pricing)
+            except Exception as e:
+                logger.error(f"Error processing card {card_data.get('id')}: {e}")
+                continue
+            # A card listed twice keeps its last version (one upsert row per ID)
+            batch[card_data['id']] = (card_data, set_id, set_release_date, digest)
+
+        if not batch:
+            return changes
+
+        with self.engine.begin() as conn:
+            stored = {}
+            for chunk in _chunks(list(batch), ID_CHUNK):
+                stored.update(conn.execute(
+                    select(cards_table.c.id, cards_table.c.content_hash).where(cards_table.c.id.in_(chunk))
+                ).all())
+
+            rows = {}
+            children = {table: [] for table in CHILD_TABLES}
+            for card_id, (card_data, set_id, set_release_date, digest) in batch.items():
+                if card_id in stored and stored[card_id] == digest:
+                    changes.unchanged.append(card_id)
+                    continue
+                try:
+                    row = card_row(card_data, set_id, set_release_date, self.include_pricing)
+                    card_children = child_rows(card_data)
+                except Exception as e:
+                    logger.error(f"Error processing card {card_id}: {e}")
+                    continue
+                row['content_hash'] = digest
+                rows[card_id] = row
+                for table, table_rows in card_children.items():
+                    children[table] += table_rows
+                (changes.updated if card_id in stored else changes.inserted).append(card_id)
+
+            if not rows:
+                return changes
+            card_ids = list(rows)
+
+            insert = _upsert(conn.dialect.name)
+            updated_columns = [name for name in next(iter(rows.values())) if name != 'id']
+            conn.execute(
+                insert.on_conflict_do_update(
+                    index_elements=[cards_table.c.id],
+                    set_={name: insert.excluded[name] for name in updated_columns}
+                ),
+                list(rows.values())
+            )
+
+            # Types and subtypes missing from the reference tables are not linked
+            known = {
+                card_types_table: set(conn.execute(select(Type.name)).scalars()),
+                card_subtypes_table: set(conn.execute(select(Subtype.name)).scalars())
+            }
+            link_columns = {card_types_table: 'type_name', card_subtypes_table: 'subtype_name'}
+            unlinked = set()
+
+            for table in CHILD_TABLES:
+                for chunk in _chunks(card_ids, ID_CHUNK):
+                    conn.execute(table.delete().where(table.c.card_id.in_(chunk)))
+                table_rows = children[table]
+                if table in known:
+                    unlinked.update(row['card_id'] for row in table_rows if row[link_columns[table]] not in known[table])
+                    table_rows = [row for row in table_rows if row[link_columns[table]] in known[table]]
+                if table_rows:
+                    conn.execute(table.insert(), table_rows)
+
+            # The hash only covers the upstream data, so a card missing links
+            # keeps no hash: it is rewritten (and linked) by later syncs until
+            # the reference tables have caught up
+            for chunk in _chunks(sorted(unlinked), ID_CHUNK):
+                conn.execute(cards_table.update().where(cards_table.c.id.in_(chunk)).values(content_hash=None))
+
+        return changes
+
+    def clear_hashes(self, card_ids=(), set_ids=()):
+        """Clear the content hash of card_ids and of every card in set_ids.
+
+        Used when a card's documents could not be rendered after its row was
+        committed: the next sync then rewrites and re-renders it.
+        """
+        with self.engine.begin() as conn:
+            for chunk in _chunks(list(card_ids), ID_CHUNK):
+                conn.execute(cards_table.update().where(cards_table.c.id.in_(chunk)).values(content_hash=None))
+            for chunk in _chunks(list(set_ids), ID_CHUNK):
+                conn.execute(cards_table.update().where(cards_table.c.set_id.in_(chunk)).values(content_hash=None))
+
+    def delete_missing(self, seen_ids, set_ids=None):
+        """Delete the cards of set_ids (all cards when None) that are not in seen_ids.
+
+        Only call this after a complete listing: every card the upstream
+        still has must be in seen_ids. Returns CardChanges with the deleted IDs.
+        """
+        changes = CardChanges()
+        seen = set(seen_ids)
+        if not seen:
+            # An empty listing is far more likely an upstream error than a purge
+            return changes
+
+        with self.engine.begin() as conn:
+            query = select(cards_table.c.id)
+            if set_ids is not None:
+                query = query.where(cards_table.c.set_id.in_(list(set_ids)))
+            missing = [card_id for card_id in conn.execute(query).scalars() if card_id not in seen]
+
+            dependents = CHILD_TABLES + [CardDocument.__table__, CardVariant.__table__]
+            for chunk in _chunks(missing, ID_CHUNK):
+                for table in dependents:
+                    conn.execute(table.delete().where(table.c.card_id.in_(chunk)))
+                conn.execute(cards_table.delete().where(cards_table.c.id.in_(chunk)))
+
+        if missing:
+            logger.info(f"Deleted {len(missing)} cards no longer listed upstream")
+        changes.deleted = missing
+        return changes
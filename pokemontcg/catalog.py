@@ -0,0 +1,63 @@
+"""
+In-Memory Reference Catalog
+Holds the reference lists (types, subtypes, supertypes, rarities) and every
+rendered set for one data generation, so the API serves them from memory
+instead of querying the database per request
+"""
+from datetime import datetime, timezone
+
+from .enrichment import render_set
+from .documents import dump_document
+
+# Reference tables served as plain name lists
+REFERENCE_TABLES = ['types', 'subtypes', 'supertypes', 'rarities']
+
+
+class ReferenceCatalog:
+    """Snapshot of the reference data at one data generation.
+
+    Built in one go by load() and never modified afterwards, so a snapshot
+    can be shared by request threads while a newer one is being loaded.
+    """
+
+    def __init__(self, generation, lists, sets):
+        self.generation = generation
+        self.lists = lists
+        self.sets = sets  # set_id -> rendered set dict, newest set first
+        self.set_ids = list(sets)
+        self.set_documents = {set_id: dump_document(set_data) for set_id, set_data in sets.items()}
+        self._positions = {set_id: position for position, set_id in enumerate(self.set_ids)}
+        self.loaded_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+    @classmethod
+    def load(cls, conn, generation):
+        """Read the reference lists and render every set (in /sets order)"""
+        cursor = conn.cursor()
+
+        lists = {}
+        for table in REFERENCE_TABLES:
+            cursor.execute(f"SELECT name FROM {table} ORDER BY name")
+            lists[table] = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute("SELECT * FROM sets ORDER BY release_date DESC, id")
+        columns = [col[0] for col in cursor.description]
+        sets = {}
+        for row in cursor.fetchall():
+            set_data = dict(zip(columns, row))
+            sets[set_data['id']] = render_set(set_data)
+
+        return cls(generation, lists, sets)
+
+    def position_after(self, set_id):
+        """Index of the set following set_id in /sets order, or None if unknown"""
+        position = self._positions.get(set_id)
+        return None if position is None else position + 1
+
+    def stats(self):
+        """Generation and size of the snapshot"""
+        return {
+            "generation": self.generation,
+            "sets": len(self.sets),
+            **{table: len(names) for table, names in self.lists.items()},
+            "loadedAt": self.loaded_at
+        }
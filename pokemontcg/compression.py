@@ -0,0 +1,55 @@
+"""
+Response Compression
+Accept-Encoding negotiation and gzip / brotli encoding for API response bodies
+"""
+import gzip
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip is offered without it
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Supported content codings, most preferred first
+ENCODINGS = (['br'] if brotli is not None else []) + ['gzip']
+
+
+def _accepted_codings(accept_encoding):
+    """Parse an Accept-Encoding header into {coding: q}"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    return accepted
+
+
+def negotiate_encoding(accept_encoding):
+    """Best supported content coding the client accepts, or None for identity"""
+    accepted = _accepted_codings(accept_encoding)
+    best, best_q = None, 0.0
+    for coding in ENCODINGS:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body, encoding):
+    """Encode body (bytes) with a coding returned by negotiate_encoding"""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported content coding: {encoding}")
@@ -14,12 +14,42 @@ DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///pokemontcg/pokemontcg.db')
 # For Railway/Production (PostgreSQL)
 # DATABASE_URL = os.getenv('DATABASE_URL')  # Railway provides this automatically
 
+# API Database Configuration (read-only connection pool)
+API_DB_PATH = os.getenv('API_DB_PATH')  # Defaults to pokemontcg/pokemontcg.db
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))  # Long-lived connections per worker
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))  # Seconds to wait for a free connection
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', str(256 * 1024 * 1024)))  # Bytes of the DB file to memory-map
+DB_CACHE_SIZE_KB = int(os.getenv('DB_CACHE_SIZE_KB', str(64 * 1024)))  # Page cache per connection
+DB_THREADS = int(os.getenv('DB_THREADS', str(DB_POOL_SIZE)))  # Query threads per worker (keep <= pool size)
+
+# API Cache Configuration
+COUNT_CACHE_SIZE = int(os.getenv('COUNT_CACHE_SIZE', '4096'))  # Cached totalCounts (per filter combination)
+COUNT_ESTIMATE_LIMIT = int(os.getenv('COUNT_ESTIMATE_LIMIT', '1000'))  # Rows counted for count=estimate
+FACET_CACHE_SIZE = int(os.getenv('FACET_CACHE_SIZE', '1024'))  # Cached /cards/facets histograms (per filter combination)
+RESPONSE_CACHE_MB = int(os.getenv('RESPONSE_CACHE_MB', '64'))  # Cached catalog response bodies per worker
+CACHE_MAX_AGE = int(os.getenv('CACHE_MAX_AGE', '300'))  # Cache-Control max-age (seconds) for catalog responses
+GENERATION_CHECK_INTERVAL = float(os.getenv('GENERATION_CHECK_INTERVAL', '1'))  # Seconds between data generation checks
+CARD_BATCH_MAX = int(os.getenv('CARD_BATCH_MAX', '500'))  # Most card IDs accepted by POST /cards/batch
+EXPORT_MAX_STREAMS = int(os.getenv('EXPORT_MAX_STREAMS', '4'))  # Concurrent /cards/export streams per worker (each holds its own connection)
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))  # Smallest catalog response body (bytes) worth gzip/brotli
+
+# SQL Profiling (opt-in: Server-Timing headers on API responses and a slow-query log)
+SQL_PROFILE = os.getenv('SQL_PROFILE', '').lower() in ('1', 'true', 'yes')
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '100'))  # Statements at least this slow are logged with their plan
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', 'pokemontcg/logs/slow_queries.log')
+
 # Sync Configuration
 BATCH_SIZE = 50  # Reduced batch size for more reliable requests
+CARD_WRITE_BATCH = 1000  # Cards per bulk write transaction (GitHub sync; the API sync writes per page)
 RATE_LIMIT_DELAY = 0.5  # Small delay to avoid overwhelming API
 MAX_RETRIES = 3  # Fewer retries with shorter timeout
 RETRY_DELAY = 3  # Shorter retry delay
 REQUEST_TIMEOUT = 30  # Shorter timeout (30 seconds instead of 180)
+HTTP_POOL_SIZE = 10  # Keep-alive connections to the API
+MAX_RETRY_AFTER = 120  # Longest Retry-After (seconds) honoured before retrying
+SYNC_CONCURRENCY = 8  # Card pages in flight at once during a card sync
+SYNC_MAX_RATE = 20  # Requests/second the adaptive rate limiter may ramp up to
+SYNC_MIN_RATE = 0.5  # Requests/second it backs off to at most
 
 # Features
 INCLUDE_PRICING = True  # Include TCGPlayer and Cardmarket pricing
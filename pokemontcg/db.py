@@ -0,0 +1,284 @@
+"""
+SQLite Connection Pool for the API
+Keeps long-lived read-only connections (with warm page and statement caches)
+that are checked out per request instead of opening a new connection each time,
+and a bounded thread pool that runs queries off the asyncio event loop
+"""
+import asyncio
+import contextvars
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection became free within the timeout"""
+
+
+# Functions called as hook(cursor, event, sql, seconds, rows) for every
+# statement run on a pooled connection: event is "execute" (rows is None)
+# or "fetch" (rows is the number of rows fetched). The cursor's parameters
+# attribute holds the last statement's bound parameters.
+statement_hooks = []
+
+
+def _notify(cursor, event, sql, seconds, rows=None):
+    for hook in statement_hooks:
+        hook(cursor, event, sql, seconds, rows)
+
+
+class ObservedCursor(sqlite3.Cursor):
+    """Cursor that reports the time spent executing and fetching to statement_hooks"""
+
+    parameters = ()
+
+    def execute(self, sql, parameters=()):
+        self.parameters = parameters
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            if statement_hooks:
+                _notify(self, "execute", sql, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        self.parameters = ()
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            if statement_hooks:
+                _notify(self, "execute", sql, time.perf_counter() - started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        if statement_hooks:
+            _notify(self, "fetch", None, time.perf_counter() - started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        if statement_hooks:
+            _notify(self, "fetch", None, time.perf_counter() - started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        if statement_hooks:
+            _notify(self, "fetch", None, time.perf_counter() - started, len(rows))
+        return rows
+
+
+class ObservedConnection(sqlite3.Connection):
+    """Connection whose cursors are ObservedCursors"""
+
+    def cursor(self, factory=ObservedCursor):
+        return super().cursor(factory)
+
+
+class ConnectionPool:
+    """Fixed-size pool of read-only SQLite connections"""
+
+    def __init__(self, db_path, size=8, timeout=10.0, mmap_size=256 * 1024 * 1024, cache_size_kb=64 * 1024):
+        self.db_path = Path(db_path)
+        self.size = size
+        self.timeout = timeout
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+
+        self._idle = queue.LifoQueue()  # LIFO keeps the warmest connections busy
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._dedicated = 0  # Open connections handed out by dedicated()
+
+        # Pool-wait metrics
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _connect(self):
+        """Open a new read-only connection with tuned pragmas"""
+        conn = sqlite3.connect(
+            f"file:{self.db_path.as_posix()}?mode=ro",
+            uri=True,
+            check_same_thread=False,  # Connections move between request threads
+            factory=ObservedConnection
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    def acquire(self):
+        """Check out a connection, opening one if the pool is not yet full"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._opened < self.size:
+                    self._opened += 1
+                    open_new = True
+                else:
+                    open_new = False
+
+            if open_new:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                # Pool exhausted - wait for a connection to come back
+                started = time.perf_counter()
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self.timeouts += 1
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                finally:
+                    waited = time.perf_counter() - started
+                    with self._lock:
+                        self.waits += 1
+                        self.wait_time_total += waited
+                        self.wait_time_max = max(self.wait_time_max, waited)
+
+        with self._lock:
+            self.checkouts += 1
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool"""
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    def discard(self, conn):
+        """Close a connection that should not be reused"""
+        try:
+            conn.close()
+        finally:
+            with self._lock:
+                self._opened -= 1
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and back in"""
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except sqlite3.Error:
+            # Don't reuse a connection that may be broken (e.g. the file was replaced)
+            broken = True
+            raise
+        finally:
+            if broken:
+                self.discard(conn)
+            else:
+                self.release(conn)
+
+    @contextmanager
+    def dedicated(self):
+        """A connection of its own, outside the pool, closed on exit.
+
+        For long-lived reads such as streamed exports, which would otherwise
+        hold a pooled connection for as long as a slow client keeps reading.
+        """
+        conn = self._connect()
+        with self._lock:
+            self._dedicated += 1
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                self._dedicated -= 1
+            conn.close()
+
+    def close_all(self):
+        """Close every idle connection, e.g. on shutdown"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(conn)
+
+    def stats(self):
+        """Pool size, usage and wait metrics"""
+        with self._lock:
+            return {
+                "size": self.size,
+                "open": self._opened,
+                "idle": self._idle.qsize(),
+                "inUse": self._opened - self._idle.qsize(),
+                "dedicated": self._dedicated,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "waitTimeTotalMs": round(self.wait_time_total * 1000, 3),
+                "waitTimeMaxMs": round(self.wait_time_max * 1000, 3)
+            }
+
+
+class QueryRunner:
+    """Bounded thread pool that runs blocking sqlite3 work off the event loop"""
+
+    def __init__(self, pool, max_workers=8):
+        self.pool = pool
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db-query')
+        self._lock = threading.Lock()
+
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+
+    def _call(self, fn, args):
+        """Worker side: check out a connection and run fn(conn, *args)"""
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+        try:
+            with self.pool.connection() as conn:
+                return fn(conn, *args)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+
+    async def run(self, fn, *args):
+        """Run fn(conn, *args) on a query thread and await its result"""
+        loop = asyncio.get_running_loop()
+        # Carry the request's context variables into the worker thread
+        context = contextvars.copy_context()
+        with self._lock:
+            self.queued += 1
+        return await loop.run_in_executor(self._executor, context.run, self._call, fn, args)
+
+    def shutdown(self):
+        """Stop accepting work and let running queries finish"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        """Thread count and queue depth"""
+        with self._lock:
+            return {
+                "threads": self.max_workers,
+                "active": self.active,
+                "queued": self.queued,
+                "completed": self.completed
+            }
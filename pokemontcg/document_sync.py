@@ -0,0 +1,125 @@
+"""
+Document Refresh for the Syncs
+After a sync commits cards or sets, their materialized documents and search
+entries are re-rendered and the data generation is bumped so API caches drop
+what they served before. Shared by both syncers (they provide engine, Session
+and writer).
+"""
+import logging
+
+from .documents import (
+    placeholder_for, refresh_card_documents, refresh_set_documents,
+    refresh_set_card_documents
+)
+from .generation import bump_generation
+from .models import Card
+from .search import refresh_card_search
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentRefresh:
+    """Mixin re-rendering documents and search entries after sync writes"""
+
+    def rebuild_documents(self):
+        """Render documents and search entries for every set and card already in the database"""
+        logger.info("Rendering all set and card documents...")
+        self._refresh_set_documents(None, rerender_cards=False)
+        card_ids = self._all_card_ids()
+        self._refresh_card_documents(card_ids)
+        logger.info(f"Rendered documents for {len(card_ids)} cards")
+
+    def _all_card_ids(self):
+        """IDs of every card in the database"""
+        session = self.Session()
+        try:
+            return [row[0] for row in session.query(Card.id).all()]
+        finally:
+            session.close()
+
+    def _refresh_card_documents(self, card_ids):
+        """Re-render the API documents of freshly committed cards; False if any failed.
+
+        The cards' rows (and content hashes) are already committed, so cards
+        whose documents or search entries fail lose their hash and are
+        rewritten by the next sync instead of being skipped as unchanged.
+        """
+        if not card_ids:
+            return True
+        rendered = True
+        conn = self.engine.raw_connection()
+        try:
+            refresh_card_documents(conn, card_ids, placeholder_for(self.engine))
+        except Exception as e:
+            logger.error(f"Error rendering card documents: {e}")
+            conn.rollback()
+            rendered = False
+        finally:
+            conn.close()
+        if not self._refresh_card_search(card_ids):
+            rendered = False
+        if not rendered:
+            self._clear_content_hashes(card_ids=card_ids)
+        self._bump_generation()
+        return rendered
+
+    def _refresh_card_search(self, card_ids):
+        """Re-index freshly committed cards for /cards/search; False if it failed"""
+        if not card_ids:
+            return True
+        conn = self.engine.raw_connection()
+        try:
+            refresh_card_search(conn, card_ids, placeholder_for(self.engine))
+            return True
+        except Exception as e:
+            logger.error(f"Error indexing cards for search: {e}")
+            conn.rollback()
+            return False
+        finally:
+            conn.close()
+
+    def _refresh_set_documents(self, set_ids, rerender_cards=True):
+        """Re-render set documents (all when set_ids is None) and, if a set changed, its cards' documents"""
+        changed = []
+        cards_rendered = True
+        conn = self.engine.raw_connection()
+        try:
+            placeholder = placeholder_for(self.engine)
+            changed = refresh_set_documents(conn, set_ids, placeholder)
+            if changed:
+                logger.info(f"Rendered documents for {len(changed)} changed sets")
+            if changed and rerender_cards:
+                cards_rendered = False
+                count = refresh_set_card_documents(conn, changed, placeholder)
+                cards_rendered = True
+                logger.info(f"Re-rendered {count} card documents for changed sets")
+        except Exception as e:
+            logger.error(f"Error rendering set documents: {e}")
+            conn.rollback()
+        finally:
+            conn.close()
+        if not cards_rendered:
+            # The set documents are committed, so the next sync will not see
+            # these sets as changed: make it rewrite their cards instead
+            self._clear_content_hashes(set_ids=changed)
+        self._bump_generation()
+
+    def _clear_content_hashes(self, card_ids=(), set_ids=()):
+        """Forget the content hashes of cards whose documents are stale"""
+        try:
+            self.writer.clear_hashes(card_ids, set_ids)
+            logger.warning("Cards with stale documents will be re-rendered by the next sync")
+        except Exception as e:
+            logger.error(f"Error clearing content hashes: {e}")
+
+    def _bump_generation(self):
+        """Bump the data generation so API caches drop entries from before this commit"""
+        conn = self.engine.raw_connection()
+        try:
+            generation = bump_generation(conn, placeholder_for(self.engine))
+            logger.debug(f"Data generation is now {generation}")
+        except Exception as e:
+            logger.error(f"Error bumping data generation: {e}")
+            conn.rollback()
+        finally:
+            conn.close()
@@ -0,0 +1,230 @@
+"""
+Materialized Card and Set Documents
+Renders the final camelCase JSON for cards and sets at sync time and stores it
+in card_documents / set_documents so the API can serve it without re-assembly
+"""
+import json
+import logging
+from datetime import datetime, date, timezone
+
+try:
+    import orjson
+except ImportError:  # Optional: the standard library encoder is used instead
+    orjson = None
+
+from .enrichment import (
+    chunked, load_card_children, load_sets, render_cards, render_set,
+    summarize_variant
+)
+
+logger = logging.getLogger(__name__)
+
+# Set document keys that change on every sync, not when the set itself does
+SYNC_ONLY_SET_KEYS = ('syncedAt',)
+
+
+def _json_default(value):
+    """Encode values the DB drivers hand back that json can't (Postgres timestamps)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dump_json(data):
+    """Serialize data to compact UTF-8 JSON bytes (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        data,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+        default=_json_default
+    ).encode('utf-8')
+
+
+def dump_document(data):
+    """Serialize data to the compact JSON text stored in documents and responses"""
+    return dump_json(data).decode('utf-8')
+
+
+def render_envelope(data_json, **meta):
+    """Build a {"data": ..., **meta} response body around pre-serialized data"""
+    body = '{"data":' + data_json
+    for key, value in meta.items():
+        body += f',"{key}":{dump_document(value)}'
+    return (body + '}').encode('utf-8')
+
+
+def render_list(items_json):
+    """Join pre-serialized items into a JSON array"""
+    return '[' + ','.join(items_json) + ']'
+
+
+def placeholder_for(engine):
+    """DB-API parameter marker for a SQLAlchemy engine's driver"""
+    return '?' if engine.dialect.paramstyle == 'qmark' else '%s'
+
+
+def _rows_as_dicts(cursor):
+    """Fetch all rows from cursor as column-name dicts"""
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _rendered_at():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def refresh_card_documents(conn, card_ids, placeholder='?'):
+    """Render and store summary/detail documents for card_ids.
+
+    conn is a DB-API connection (sqlite3 or psycopg2); the caller's pending
+    card writes must already be committed. Returns the number of documents written.
+    """
+    card_ids = list(dict.fromkeys(card_ids))
+    if not card_ids:
+        return 0
+
+    cursor = conn.cursor()
+    written = 0
+
+    for chunk in chunked(card_ids):
+        marks = ", ".join([placeholder] * len(chunk))
+        cursor.execute(f"SELECT * FROM cards WHERE id IN ({marks})", chunk)
+        rows = _rows_as_dicts(cursor)
+        if not rows:
+            continue
+
+        children = load_card_children(cursor, [row['id'] for row in rows], True, placeholder)
+        sets = load_sets(cursor, {row['set_id'] for row in rows if row.get('set_id')}, placeholder)
+
+        # Listings only carry the summary variant columns
+        summary_children = dict(children)
+        summary_children['variants'] = {
+            card_id: [summarize_variant(variant) for variant in variants]
+            for card_id, variants in children['variants'].items()
+        }
+
+        details = render_cards(rows, children, sets)
+        summaries = render_cards(rows, summary_children, sets)
+
+        rendered_at = _rendered_at()
+        cursor.execute(f"DELETE FROM card_documents WHERE card_id IN ({marks})", chunk)
+        cursor.executemany(
+            f"INSERT INTO card_documents (card_id, set_id, summary, detail, rendered_at) "
+            f"VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})",
+            [
+                (summary['id'], summary.get('setId'), dump_document(summary), dump_document(detail), rendered_at)
+                for summary, detail in zip(summaries, details)
+            ]
+        )
+        written += len(rows)
+
+    conn.commit()
+    return written
+
+
+def refresh_set_card_documents(conn, set_ids, placeholder='?'):
+    """Re-render the documents of every card belonging to set_ids"""
+    set_ids = list(set_ids)
+    if not set_ids:
+        return 0
+
+    cursor = conn.cursor()
+    card_ids = []
+    for chunk in chunked(set_ids):
+        marks = ", ".join([placeholder] * len(chunk))
+        cursor.execute(f"SELECT id FROM cards WHERE set_id IN ({marks})", chunk)
+        card_ids.extend(row[0] for row in cursor.fetchall())
+
+    return refresh_card_documents(conn, card_ids, placeholder)
+
+
+def _set_content(body):
+    """A set document without the keys every sync rewrites"""
+    content = json.loads(body)
+    for key in SYNC_ONLY_SET_KEYS:
+        content.pop(key, None)
+    return content
+
+
+def refresh_set_documents(conn, set_ids=None, placeholder='?'):
+    """Render and store set documents (all sets when set_ids is None).
+
+    Returns the IDs of sets whose rendered content changed (not just their
+    syncedAt), so callers can re-render the card documents that embed them.
+    """
+    cursor = conn.cursor()
+
+    if set_ids is None:
+        cursor.execute("SELECT * FROM sets")
+        rows = _rows_as_dicts(cursor)
+    else:
+        rows = []
+        for chunk in chunked(list(set_ids)):
+            marks = ", ".join([placeholder] * len(chunk))
+            cursor.execute(f"SELECT * FROM sets WHERE id IN ({marks})", chunk)
+            rows.extend(_rows_as_dicts(cursor))
+
+    if not rows:
+        return []
+
+    existing = load_set_documents(cursor, [row['id'] for row in rows], placeholder)
+    changed = {}
+    content_changed = []
+    for row in rows:
+        body = dump_document(render_set(row))
+        previous = existing.get(row['id'])
+        if previous != body:
+            changed[row['id']] = body
+            if previous is None or _set_content(previous) != _set_content(body):
+                content_changed.append(row['id'])
+
+    rendered_at = _rendered_at()
+    for chunk in chunked(list(changed)):
+        marks = ", ".join([placeholder] * len(chunk))
+        cursor.execute(f"DELETE FROM set_documents WHERE set_id IN ({marks})", chunk)
+        cursor.executemany(
+            f"INSERT INTO set_documents (set_id, body, rendered_at) VALUES ({placeholder}, {placeholder}, {placeholder})",
+            [(set_id, changed[set_id], rendered_at) for set_id in chunk]
+        )
+
+    conn.commit()
+    return content_changed
+
+
+def load_card_documents(cursor, card_ids, column='summary', placeholder='?'):
+    """Return {card_id: json text} for already rendered card documents.
+
+    column is 'summary' (listing shape) or 'detail' (single card shape).
+    Returns an empty dict when the documents table does not exist yet.
+    """
+    if column not in ('summary', 'detail'):
+        raise ValueError("column must be 'summary' or 'detail'")
+
+    documents = {}
+    try:
+        for chunk in chunked(list(card_ids)):
+            marks = ", ".join([placeholder] * len(chunk))
+            cursor.execute(f"SELECT card_id, {column} FROM card_documents WHERE card_id IN ({marks})", chunk)
+            documents.update(cursor.fetchall())
+    except Exception as e:
+        logger.debug(f"Card documents unavailable: {e}")
+        return {}
+    return documents
+
+
+def load_set_documents(cursor, set_ids, placeholder='?'):
+    """Return {set_id: json text} for already rendered set documents"""
+    documents = {}
+    try:
+        for chunk in chunked(list(set_ids)):
+            marks = ", ".join([placeholder] * len(chunk))
+            cursor.execute(f"SELECT set_id, body FROM set_documents WHERE set_id IN ({marks})", chunk)
+            documents.update(cursor.fetchall())
+    except Exception as e:
+        logger.debug(f"Set documents unavailable: {e}")
+        return {}
+    return documents
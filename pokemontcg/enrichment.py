@@ -0,0 +1,328 @@
+"""
+Card Enrichment Layer
+Loads child rows (types, attacks, variants, sets, ...) for a whole page of cards
+with one set-based query per table and stitches them onto the card dicts
+"""
+import json
+import logging
+from functools import lru_cache
+
+from .sort_keys import SORT_KEY_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Hosted image base (Hostinger)
+HOSTED_IMAGES_BASE = "https://www.colleqtivetcg.com/tcg-images/pokemon"
+
+# Keep IN (...) lists comfortably below SQLite's bound parameter limit
+MAX_IN_PARAMS = 500
+
+# JSON array columns stored as text on the cards table
+CARD_JSON_FIELDS = ('rules', 'retreat_cost', 'national_pokedex_numbers', 'evolves_to')
+
+# Child collections attached to each card, in response key order
+CHILD_COLLECTIONS = ['types', 'subtypes', 'attacks', 'abilities', 'weaknesses', 'resistances', 'variants']
+
+# Columns never copied into API responses: sort keys (ordering only), the
+# sync's content hash, and the image URL columns, which are replaced by a
+# built images object
+HIDDEN_COLUMNS = frozenset(SORT_KEY_COLUMNS) | {'content_hash', 'image_small', 'image_large', 'symbol_url', 'logo_url'}
+
+# Variant keys returned in card listings (the detail view returns every column)
+VARIANT_SUMMARY_KEYS = [
+    'variantType', 'tcgplayerProductId', 'marketPrice', 'lowPrice',
+    'midPrice', 'highPrice', 'directLowPrice'
+]
+
+
+def card_images(set_id, number):
+    """Images object for a card with hosted URLs.
+
+    Uses card numbers as-is to match file naming on server.
+    Falls back to Pokemon card back placeholder if images don't exist.
+    """
+    if set_id and number:
+        # Keep card number as-is - no leading zero stripping
+        # Some cards have formats like "123/456" - just use the first part
+        clean_number = number.split('/')[0]
+
+        # Images are now stored directly in set folder without /small/ or /large/ subdirectories
+        # Path structure: /tcg-images/pokemon/en/cards/{setId}/{number}.webp
+        image_url = f"{HOSTED_IMAGES_BASE}/en/cards/{set_id}/{clean_number}.webp"
+        return {
+            'small': image_url,
+            'large': image_url  # Same file for both since we don't have separate sizes anymore
+        }
+
+    # Fallback to placeholder if no set_id or number
+    return {
+        'small': f"{HOSTED_IMAGES_BASE}/en/cards/placeholder-card-back.webp",
+        'large': f"{HOSTED_IMAGES_BASE}/en/cards/placeholder-card-back.webp"
+    }
+
+
+def set_images(set_id):
+    """Images object for a set with hosted URLs"""
+    # Images are stored in /tcg-images/pokemon/en/sets/{setId}/{type}.webp
+    return {
+        'symbol': f"{HOSTED_IMAGES_BASE}/en/sets/{set_id}/symbol.webp",
+        'logo': f"{HOSTED_IMAGES_BASE}/en/sets/{set_id}/logo.webp"
+    }
+
+
+def dict_from_row(row):
+    """Convert SQLite row to dictionary"""
+    return dict(zip(row.keys(), row))
+
+
+def to_camel_case(snake_str):
+    """Convert snake_case string to camelCase"""
+    components = snake_str.split('_')
+    return components[0] + ''.join(x.title() for x in components[1:])
+
+
+@lru_cache(maxsize=None)
+def api_keys(columns):
+    """Compiled (column, camelCase key) pairs for a row layout.
+
+    Computed once per distinct column tuple (in practice once per table
+    schema); hidden columns are left out.
+    """
+    return tuple((column, to_camel_case(column)) for column in columns if column not in HIDDEN_COLUMNS)
+
+
+def api_dict(row):
+    """Copy a snake_case row dict into a new dict with its final API keys"""
+    return {key: row[column] for column, key in api_keys(tuple(row))}
+
+
+def chunked(values, size=MAX_IN_PARAMS):
+    """Yield successive slices of values no longer than size"""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def fetch_in(cursor, sql, values, placeholder='?'):
+    """Run sql once per chunk of values, expanding {ids} into an IN list"""
+    rows = []
+    for chunk in chunked(values):
+        marks = ", ".join([placeholder] * len(chunk))
+        cursor.execute(sql.format(ids=marks), chunk)
+        rows.extend(cursor.fetchall())
+    return rows
+
+
+def _group_by_card(rows, build):
+    """Group (card_id, *columns) rows into {card_id: [build(columns), ...]}"""
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row[0], []).append(build(row[1:]))
+    return grouped
+
+
+def _build_attack(row):
+    return {
+        'name': row[0],
+        'cost': json.loads(row[1]) if row[1] else [],
+        'convertedEnergyCost': row[2],
+        'damage': row[3],
+        'text': row[4]
+    }
+
+
+def _build_ability(row):
+    return {
+        'name': row[0],
+        'text': row[1],
+        'type': row[2]
+    }
+
+
+def _build_type_value(row):
+    return {'type': row[0], 'value': row[1]}
+
+
+def _build_variant_summary(row):
+    return dict(zip(VARIANT_SUMMARY_KEYS, row))
+
+
+def summarize_variant(variant):
+    """Reduce a detailed variant dict to the listing columns"""
+    return {key: variant[key] for key in VARIANT_SUMMARY_KEYS}
+
+
+def _build_variant_detail(row):
+    return {
+        'id': row[0],
+        'variantType': row[1],
+        'tcgplayerProductId': row[2],
+        'tcgplayerUrl': row[3],
+        'marketPrice': row[4],
+        'lowPrice': row[5],
+        'midPrice': row[6],
+        'highPrice': row[7],
+        'directLowPrice': row[8],
+        'cardmarketUrl': row[9],
+        'cardmarketAvgPrice': row[10],
+        'cardmarketLowPrice': row[11],
+        'cardmarketTrendPrice': row[12],
+        'isAvailable': row[13],
+        'lastPriceUpdate': row[14]
+    }
+
+
+VARIANT_SUMMARY_SQL = """
+    SELECT card_id, variant_type, tcgplayer_product_id,
+           market_price, low_price, mid_price, high_price, direct_low_price
+    FROM card_variants
+    WHERE card_id IN ({ids})
+    ORDER BY card_id, variant_type
+"""
+
+VARIANT_DETAIL_SQL = """
+    SELECT card_id, id, variant_type, tcgplayer_product_id, tcgplayer_url,
+           market_price, low_price, mid_price, high_price, direct_low_price,
+           cardmarket_url, cardmarket_avg_price, cardmarket_low_price, cardmarket_trend_price,
+           is_available, last_price_update
+    FROM card_variants
+    WHERE card_id IN ({ids})
+    ORDER BY card_id, variant_type
+"""
+
+
+def load_card_children(cursor, card_ids, detailed_variants=False, placeholder='?', collections=None):
+    """Load child collections for card_ids with one query per table.
+
+    Returns a dict of {collection_name: {card_id: [items]}} holding every
+    collection, or only those named in collections. Variants are skipped
+    (empty) when the card_variants table does not exist yet.
+    """
+    card_ids = list(card_ids)
+    children = {}
+    wanted = set(CHILD_COLLECTIONS if collections is None else collections)
+
+    if 'types' in wanted:
+        children['types'] = _group_by_card(
+            fetch_in(cursor, "SELECT card_id, type_name FROM card_types WHERE card_id IN ({ids}) ORDER BY card_id, type_name", card_ids, placeholder),
+            lambda row: row[0]
+        )
+    if 'subtypes' in wanted:
+        children['subtypes'] = _group_by_card(
+            fetch_in(cursor, "SELECT card_id, subtype_name FROM card_subtypes WHERE card_id IN ({ids}) ORDER BY card_id, subtype_name", card_ids, placeholder),
+            lambda row: row[0]
+        )
+    if 'attacks' in wanted:
+        children['attacks'] = _group_by_card(
+            fetch_in(cursor, "SELECT card_id, name, cost, converted_energy_cost, damage, text FROM attacks WHERE card_id IN ({ids}) ORDER BY id", card_ids, placeholder),
+            _build_attack
+        )
+    if 'abilities' in wanted:
+        children['abilities'] = _group_by_card(
+            fetch_in(cursor, "SELECT card_id, name, text, ability_type FROM abilities WHERE card_id IN ({ids}) ORDER BY id", card_ids, placeholder),
+            _build_ability
+        )
+    if 'weaknesses' in wanted:
+        children['weaknesses'] = _group_by_card(
+            fetch_in(cursor, "SELECT card_id, type, value FROM weaknesses WHERE card_id IN ({ids}) ORDER BY id", card_ids, placeholder),
+            _build_type_value
+        )
+    if 'resistances' in wanted:
+        children['resistances'] = _group_by_card(
+            fetch_in(cursor, "SELECT card_id, type, value FROM resistances WHERE card_id IN ({ids}) ORDER BY id", card_ids, placeholder),
+            _build_type_value
+        )
+
+    # Card variants table might not exist yet on older databases
+    if 'variants' in wanted:
+        try:
+            if detailed_variants:
+                variant_rows = fetch_in(cursor, VARIANT_DETAIL_SQL, card_ids, placeholder)
+                children['variants'] = _group_by_card(variant_rows, _build_variant_detail)
+            else:
+                variant_rows = fetch_in(cursor, VARIANT_SUMMARY_SQL, card_ids, placeholder)
+                children['variants'] = _group_by_card(variant_rows, _build_variant_summary)
+        except Exception as e:
+            logger.error(f"Failed to fetch variants for {len(card_ids)} cards: {str(e)}")
+            children['variants'] = {}
+
+    return children
+
+
+def render_set(set_data):
+    """Render a snake_case sets row into its camelCase API shape"""
+    rendered = api_dict(set_data)
+
+    # Parse JSON fields and build images with hosted URLs
+    if rendered.get('legalities'):
+        rendered['legalities'] = json.loads(rendered['legalities'])
+    if set_data.get('id'):
+        rendered['images'] = set_images(set_data['id'])
+
+    return rendered
+
+
+def load_sets(cursor, set_ids, placeholder='?', known=None):
+    """Load and render sets by ID, returning {set_id: camelCase set dict}.
+
+    Sets already rendered in known (e.g. the API's in-memory catalog) are
+    taken from there instead of being queried.
+    """
+    known = known or {}
+    sets = {set_id: known[set_id] for set_id in set_ids if set_id in known}
+    set_ids = [set_id for set_id in set_ids if set_id not in sets]
+    for chunk in chunked(set_ids):
+        marks = ", ".join([placeholder] * len(chunk))
+        cursor.execute(f"SELECT * FROM sets WHERE id IN ({marks})", chunk)
+        columns = [col[0] for col in cursor.description]
+        for row in cursor.fetchall():
+            set_data = dict(zip(columns, row))
+            sets[set_data['id']] = render_set(set_data)
+    return sets
+
+
+def render_cards(cards, children, sets):
+    """Render card rows with their loaded children, parsed JSON fields, set and images.
+
+    cards is a list of snake_case dicts straight from the cards table; the
+    camelCase renderings are returned in the same order.
+    """
+    rendered_cards = []
+    for card in cards:
+        card_id = card['id']
+        rendered = api_dict(card)
+
+        # Parse JSON fields from card table
+        for field, key in api_keys(CARD_JSON_FIELDS):
+            if card.get(field):
+                try:
+                    rendered[key] = json.loads(card[field])
+                except:
+                    pass
+
+        # Attach child collections (only when loaded and the card has any)
+        for collection in CHILD_COLLECTIONS:
+            items = children.get(collection, {}).get(card_id)
+            if items:
+                rendered[collection] = items
+
+        # Attach set information
+        set_data = sets.get(card.get('set_id'))
+        if set_data:
+            rendered['set'] = set_data
+
+        # Build images from the set and number with hosted URLs
+        rendered['images'] = card_images(card.get('set_id', ''), card.get('number', ''))
+
+        rendered_cards.append(rendered)
+
+    return rendered_cards
+
+
+def enrich_cards(cursor, cards, detailed_variants=False, placeholder='?', known_sets=None):
+    """Load children and sets for a page of card rows and render them"""
+    if not cards:
+        return []
+
+    children = load_card_children(cursor, [card['id'] for card in cards], detailed_variants, placeholder)
+    sets = load_sets(cursor, {card['set_id'] for card in cards if card.get('set_id')}, placeholder, known_sets)
+    return render_cards(cards, children, sets)
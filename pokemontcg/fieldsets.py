@@ -0,0 +1,90 @@
+"""
+Sparse Fieldsets for Card Responses
+Resolves the fields= / include= query parameters into the card columns to
+select and the child collections to load, and renders cards from just those
+"""
+from .enrichment import CHILD_COLLECTIONS, api_keys, load_card_children, load_sets, render_cards
+
+# Related data that include= can ask for, in response key order
+INCLUDABLE = CHILD_COLLECTIONS + ['set']
+
+# Built keys and the card columns they are built from
+DERIVED_FIELDS = {'images': ['set_id', 'number']}
+
+
+class InvalidFieldset(ValueError):
+    """Raised for unknown names in fields= or include="""
+
+
+def parse_names(value):
+    """Split a comma-separated query parameter; None means not given"""
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class CardFieldset:
+    """The card keys, columns and child collections a request asked for.
+
+    fields lists response keys (card fields, images, or anything includable;
+    all card fields when omitted); include lists child collections and/or
+    set. Relations are loaded when named by either, or all of them when
+    neither parameter is given.
+    """
+
+    def __init__(self, card_columns, fields=None, include=None):
+        column_for_key = {key: column for column, key in api_keys(tuple(card_columns))}
+        valid_fields = list(column_for_key) + list(DERIVED_FIELDS) + INCLUDABLE
+
+        unknown = [name for name in fields or [] if name not in valid_fields]
+        if unknown:
+            raise InvalidFieldset(f"Unknown field(s): {', '.join(unknown)}. Valid fields: {', '.join(valid_fields)}")
+        unknown = [name for name in include or [] if name not in INCLUDABLE]
+        if unknown:
+            raise InvalidFieldset(f"Cannot include: {', '.join(unknown)}. Includable: {', '.join(INCLUDABLE)}")
+
+        if fields is None and include is None:
+            related = list(INCLUDABLE)
+        else:
+            named = set(fields or []) | set(include or [])
+            related = [name for name in INCLUDABLE if name in named]
+
+        if fields is None:
+            keys = list(column_for_key) + list(DERIVED_FIELDS)
+        else:
+            keys = [name for name in fields if name not in INCLUDABLE]
+        self.keys = set(keys) | set(related) | {'id'}
+
+        self.collections = [name for name in related if name in CHILD_COLLECTIONS]
+        self.include_set = 'set' in related
+
+        # id for children and ordering; set_id to look up the set
+        columns = {'id'}
+        for key in keys:
+            columns.update(DERIVED_FIELDS.get(key) or [column_for_key[key]])
+        if self.include_set:
+            columns.add('set_id')
+        self.columns = [column for column in card_columns if column in columns]
+
+    def select_sql(self, alias='c'):
+        """Column list for the card SELECT"""
+        return ", ".join(f"{alias}.{column}" for column in self.columns)
+
+    def render(self, cursor, cards, detailed_variants=False, placeholder='?', known_sets=None):
+        """Render projected card rows, loading only the requested relations"""
+        if not cards:
+            return []
+
+        children = {}
+        if self.collections:
+            children = load_card_children(
+                cursor, [card['id'] for card in cards], detailed_variants, placeholder, self.collections
+            )
+        sets = {}
+        if self.include_set:
+            sets = load_sets(cursor, {card['set_id'] for card in cards if card.get('set_id')}, placeholder, known_sets)
+
+        return [
+            {key: value for key, value in card.items() if key in self.keys}
+            for card in render_cards(cards, children, sets)
+        ]
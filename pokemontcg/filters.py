@@ -0,0 +1,121 @@
+"""
+Card Filters
+The filter query parameters shared by /cards, /cards/search and
+/cards/facets, and the JOIN / WHERE SQL they translate to. Equality filters
+take comma-separated lists (type=Fire,Water matches either); numeric
+filters take inclusive min/max bounds.
+"""
+from typing import Optional
+
+from fastapi import Query
+
+
+def parse_values(value):
+    """Split a comma-separated filter into its distinct values, in order"""
+    if not value:
+        return []
+    return list(dict.fromkeys(item.strip() for item in value.split(',') if item.strip()))
+
+
+def _in_sql(column, values):
+    """column = ? for one value, column IN (?, ...) for several"""
+    if len(values) == 1:
+        return f"{column} = ?"
+    return f"{column} IN ({', '.join('?' * len(values))})"
+
+
+class CardFilters:
+    """Card filter query parameters, used as a FastAPI dependency"""
+
+    def __init__(
+        self,
+        name: Optional[str] = Query(None, description="Filter by card name (partial match)"),
+        supertype: Optional[str] = Query(None, description="Filter by supertype (comma-separated for any of several)"),
+        subtype: Optional[str] = Query(None, description="Filter by subtype (comma-separated for any of several)"),
+        set_id: Optional[str] = Query(None, description="Filter by set ID (comma-separated for any of several)"),
+        rarity: Optional[str] = Query(None, description="Filter by rarity (comma-separated for any of several)"),
+        type: Optional[str] = Query(None, description="Filter by Pokemon type (comma-separated for any of several, e.g. Fire,Water)"),
+        regulation_mark: Optional[str] = Query(None, description="Filter by regulation mark (comma-separated for any of several, e.g. F,G,H)"),
+        hp_min: Optional[int] = Query(None, ge=0, description="Minimum HP"),
+        hp_max: Optional[int] = Query(None, ge=0, description="Maximum HP"),
+        retreat_min: Optional[int] = Query(None, ge=0, description="Minimum converted retreat cost"),
+        retreat_max: Optional[int] = Query(None, ge=0, description="Maximum converted retreat cost"),
+        price_min: Optional[float] = Query(None, ge=0, description="Minimum TCGplayer market price (USD)"),
+        price_max: Optional[float] = Query(None, ge=0, description="Maximum TCGplayer market price (USD)"),
+        standard_legal: Optional[bool] = Query(None, description="Only cards that are (true) or are not (false) Standard legal"),
+        expanded_legal: Optional[bool] = Query(None, description="Only cards that are (true) or are not (false) Expanded legal")
+    ):
+        self.name = name or None
+        self.supertypes = parse_values(supertype)
+        self.subtypes = parse_values(subtype)
+        self.set_ids = parse_values(set_id)
+        self.rarities = parse_values(rarity)
+        self.types = parse_values(type)
+        self.regulation_marks = parse_values(regulation_mark)
+        self.ranges = {
+            'hp': (hp_min, hp_max),
+            'retreat': (retreat_min, retreat_max),
+            'price': (price_min, price_max)
+        }
+        self.standard_legal = standard_legal
+        self.expanded_legal = expanded_legal
+
+    def key(self):
+        """Normalized filter combination for cache keys (value order does not matter)"""
+        return (
+            tuple(sorted(self.types)), tuple(sorted(self.subtypes)), self.name,
+            tuple(sorted(self.supertypes)), tuple(sorted(self.set_ids)), tuple(sorted(self.rarities)),
+            tuple(sorted(self.regulation_marks)), tuple(sorted(self.ranges.items())),
+            self.standard_legal, self.expanded_legal
+        )
+
+    def sql(self, hp_sql="c.hp_value"):
+        """JOIN clause, WHERE clauses and params for the cards table aliased as c.
+
+        hp_sql is the numeric HP expression (the stored hp_value sort key, or
+        a cast of hp on databases without it).
+        """
+        joins = []
+        where_clauses = []
+        params = []
+
+        # Junction tables are joined once; an IN list over them can match a
+        # card more than once, so callers select DISTINCT cards
+        if self.types:
+            joins.append("INNER JOIN card_types ct ON c.id = ct.card_id")
+            where_clauses.append(_in_sql("ct.type_name", self.types))
+            params.extend(self.types)
+        if self.subtypes:
+            joins.append("INNER JOIN card_subtypes cs ON c.id = cs.card_id")
+            where_clauses.append(_in_sql("cs.subtype_name", self.subtypes))
+            params.extend(self.subtypes)
+
+        if self.name:
+            where_clauses.append("c.name LIKE ?")
+            params.append(f"%{self.name}%")
+
+        for column, values in [
+            ("c.supertype", self.supertypes),
+            ("c.set_id", self.set_ids),
+            ("c.rarity", self.rarities),
+            ("c.regulation_mark", self.regulation_marks)
+        ]:
+            if values:
+                where_clauses.append(_in_sql(column, values))
+                params.extend(values)
+
+        columns = {'hp': hp_sql, 'retreat': "c.converted_retreat_cost", 'price': "c.market_price"}
+        for name, (low, high) in self.ranges.items():
+            if low is not None:
+                where_clauses.append(f"{columns[name]} >= ?")
+                params.append(low)
+            if high is not None:
+                where_clauses.append(f"{columns[name]} <= ?")
+                params.append(high)
+
+        for column, legal in [("c.standard_legal", self.standard_legal), ("c.expanded_legal", self.expanded_legal)]:
+            if legal is not None:
+                where_clauses.append(f"{column} = ?")
+                params.append(1 if legal else 0)
+
+        return " ".join(joins), where_clauses, params
@@ -0,0 +1,42 @@
+"""
+Data Generation Counter
+The sync bumps a single-row counter after committing changes; the API keys its
+caches by the current generation so they drop stale entries after every sync
+"""
+import logging
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+
+def bump_generation(conn, placeholder='?'):
+    """Increment the data generation and commit, returning the new value.
+
+    conn is a DB-API connection (sqlite3 or psycopg2) to the writable database.
+    """
+    bumped_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    cursor = conn.cursor()
+    cursor.execute(
+        f"UPDATE data_generation SET generation = generation + 1, bumped_at = {placeholder} WHERE id = 1",
+        (bumped_at,)
+    )
+    if cursor.rowcount == 0:
+        cursor.execute(
+            f"INSERT INTO data_generation (id, generation, bumped_at) VALUES (1, 1, {placeholder})",
+            (bumped_at,)
+        )
+    conn.commit()
+
+    cursor.execute("SELECT generation FROM data_generation WHERE id = 1")
+    return cursor.fetchone()[0]
+
+
+def read_generation(cursor):
+    """Current data generation, or None when the database has no counter yet"""
+    try:
+        cursor.execute("SELECT generation FROM data_generation WHERE id = 1")
+        row = cursor.fetchone()
+    except Exception as e:
+        logger.debug(f"Data generation unavailable: {e}")
+        return None
+    return row[0] if row else 0
@@ -0,0 +1,384 @@
+"""
+Pokemon TCG API Client
+Pooled keep-alive HTTP client for the sync: retries 429/5xx responses and
+transport errors with exponential backoff (honouring Retry-After), and
+records how long every request took. The transport is pluggable so tests can
+point the client at a local stand-in instead of the real API.
+
+Card syncs fetch pages concurrently (fetch_pages): an event loop in a
+background thread keeps SYNC_CONCURRENCY pages in flight, paced by an
+adaptive (AIMD) rate limiter, and hands pages back to the single writer in
+page order.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode, quote
+
+import httpx
+
+from .config import (
+    API_KEY, BASE_URL, MAX_RETRIES, RETRY_DELAY, RATE_LIMIT_DELAY,
+    REQUEST_TIMEOUT, HTTP_POOL_SIZE, MAX_RETRY_AFTER,
+    SYNC_CONCURRENCY, SYNC_MAX_RATE, SYNC_MIN_RATE
+)
+
+logger = logging.getLogger(__name__)
+
+# Per-request timing is logged here (at DEBUG); httpx's own INFO line per request is noise
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# Responses worth another attempt; any other error status fails straight away
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+def retry_after_seconds(response, now=None):
+    """Seconds a response asks us to wait (Retry-After as seconds or an HTTP-date), or None"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - (now or datetime.now(timezone.utc))).total_seconds())
+
+
+def query_url(endpoint, params=None):
+    """endpoint with its query string"""
+    if not params:
+        return endpoint
+    # Percent-encode spaces (not '+') so q= searches reach the API unchanged
+    return endpoint + "?" + urlencode(params, quote_via=quote)
+
+
+def backoff_seconds(attempt, response=None, retry_delay=RETRY_DELAY):
+    """Wait before the next attempt: Retry-After when given, else exponential backoff"""
+    if response is not None:
+        requested = retry_after_seconds(response)
+        if requested is not None:
+            return min(requested, MAX_RETRY_AFTER)
+        if response.status_code == 429:
+            # Rate limited without a hint: back off harder than for other errors
+            return retry_delay * (3 ** attempt)
+    return retry_delay * (2 ** attempt)
+
+
+class RequestStats:
+    """Request counts and timings for one client"""
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.seconds = 0.0
+        self.slowest = 0.0
+        self.statuses = {}  # status code -> responses
+
+    def record(self, status, seconds):
+        self.requests += 1
+        self.seconds += seconds
+        self.slowest = max(self.slowest, seconds)
+        if status is not None:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def summary(self):
+        average = self.seconds / self.requests if self.requests else 0.0
+        return (
+            f"{self.requests} requests in {self.seconds:.2f}s "
+            f"(avg {average * 1000:.0f}ms, slowest {self.slowest * 1000:.0f}ms), "
+            f"{self.retries} retries, {self.failures} failures"
+        )
+
+
+def _pool_limits(size):
+    return httpx.Limits(max_connections=size, max_keepalive_connections=size)
+
+
+class APIClient:
+    """Keep-alive client for the Pokemon TCG API"""
+
+    def __init__(self, base_url=BASE_URL, api_key=API_KEY, timeout=REQUEST_TIMEOUT,
+                 max_retries=MAX_RETRIES, retry_delay=RETRY_DELAY,
+                 rate_limit_delay=RATE_LIMIT_DELAY, transport=None, sleep=time.sleep):
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.rate_limit_delay = rate_limit_delay
+        self.sleep = sleep
+        self.stats = RequestStats()
+        headers = {'X-Api-Key': api_key} if api_key else {}
+        self.client = httpx.Client(
+            base_url=base_url.rstrip('/') + '/',
+            headers=headers,
+            timeout=timeout,
+            limits=_pool_limits(HTTP_POOL_SIZE),
+            transport=transport
+        )
+
+    def close(self):
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get_json(self, endpoint, params=None, timeout=None):
+        """GET endpoint and return its decoded JSON, or None once retries are exhausted"""
+        url = query_url(endpoint, params)
+        for attempt in range(self.max_retries):
+            last_attempt = attempt == self.max_retries - 1
+            response = None
+            started = time.perf_counter()
+            try:
+                response = self.client.get(
+                    url,
+                    timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+                )
+                elapsed = time.perf_counter() - started
+                self.stats.record(response.status_code, elapsed)
+                logger.debug(
+                    f"GET {endpoint} -> {response.status_code} in {elapsed * 1000:.0f}ms "
+                    f"(attempt {attempt + 1}/{self.max_retries})"
+                )
+
+                if response.status_code == 200:
+                    data = response.json()
+                    if self.rate_limit_delay > 0:
+                        self.sleep(self.rate_limit_delay)
+                    return data
+
+                if response.status_code not in RETRY_STATUSES:
+                    logger.error(f"Request to {endpoint} failed: HTTP {response.status_code} {response.text[:200]}")
+                    self.stats.failures += 1
+                    return None
+                if response.status_code == 429:
+                    logger.warning(f"Rate limited on {endpoint} (attempt {attempt + 1}/{self.max_retries})")
+                else:
+                    logger.warning(f"HTTP {response.status_code} from {endpoint} (attempt {attempt + 1}/{self.max_retries})")
+
+            except httpx.TransportError as e:
+                self.stats.record(None, time.perf_counter() - started)
+                logger.warning(f"Request error on {endpoint} (attempt {attempt + 1}/{self.max_retries}): {type(e).__name__}")
+
+            except ValueError as e:
+                # A 200 whose body is not JSON (truncated or an error page)
+                logger.error(f"JSON parse error from {endpoint}: {e}")
+
+            if last_attempt:
+                break
+            wait_time = backoff_seconds(attempt, response, self.retry_delay)
+            logger.info(f"Retrying {endpoint} in {wait_time:.1f}s...")
+            self.stats.retries += 1
+            self.sleep(wait_time)
+
+        logger.error(f"Request to {endpoint} failed after {self.max_retries} attempts")
+        self.stats.failures += 1
+        return None
+
+
+class AdaptiveRateLimiter:
+    """Paces requests at an adaptive rate: additive increase on success,
+    multiplicative decrease on 429/5xx (AIMD), plus a shared pause for Retry-After.
+    """
+
+    def __init__(self, rate=None, min_rate=SYNC_MIN_RATE, max_rate=SYNC_MAX_RATE,
+                 increase=0.25, decrease=0.5, clock=time.monotonic):
+        if rate is None:
+            rate = 1 / RATE_LIMIT_DELAY if RATE_LIMIT_DELAY > 0 else max_rate
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.clock = clock
+        self.next_slot = 0.0
+        self.paused_until = 0.0
+        self.last_decrease = float('-inf')
+
+    async def acquire(self):
+        """Wait for this request's slot (slots are handed out 1/rate apart)"""
+        now = self.clock()
+        slot = max(now, self.next_slot, self.paused_until)
+        self.next_slot = slot + 1 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, pause=None):
+        """Upstream pushed back: halve the rate and honour any Retry-After for everyone"""
+        now = self.clock()
+        if pause:
+            self.paused_until = max(self.paused_until, now + pause)
+        # Requests already in flight fail together; count them as one signal
+        if now - self.last_decrease >= 1 / self.rate:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.last_decrease = now
+            logger.info(f"API pushed back, request rate lowered to {self.rate:.2f}/s")
+
+
+class AsyncAPIClient:
+    """Async keep-alive client whose requests are paced by an AdaptiveRateLimiter"""
+
+    def __init__(self, limiter=None, base_url=BASE_URL, api_key=API_KEY, timeout=REQUEST_TIMEOUT,
+                 max_retries=MAX_RETRIES, retry_delay=RETRY_DELAY, pool_size=SYNC_CONCURRENCY,
+                 transport=None):
+        self.limiter = limiter or AdaptiveRateLimiter()
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.stats = RequestStats()
+        headers = {'X-Api-Key': api_key} if api_key else {}
+        self.client = httpx.AsyncClient(
+            base_url=base_url.rstrip('/') + '/',
+            headers=headers,
+            timeout=timeout,
+            limits=_pool_limits(pool_size),
+            transport=transport
+        )
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def get_json(self, endpoint, params=None):
+        """GET endpoint and return its decoded JSON, or None once retries are exhausted"""
+        url = query_url(endpoint, params)
+        for attempt in range(self.max_retries):
+            response = None
+            await self.limiter.acquire()
+            started = time.perf_counter()
+            try:
+                response = await self.client.get(url)
+                elapsed = time.perf_counter() - started
+                self.stats.record(response.status_code, elapsed)
+                logger.debug(f"GET {url} -> {response.status_code} in {elapsed * 1000:.0f}ms")
+
+                if response.status_code == 200:
+                    data = response.json()
+                    self.limiter.on_success()
+                    return data
+
+                if response.status_code not in RETRY_STATUSES:
+                    logger.error(f"Request to {url} failed: HTTP {response.status_code} {response.text[:200]}")
+                    self.stats.failures += 1
+                    return None
+                logger.warning(f"HTTP {response.status_code} from {url} (attempt {attempt + 1}/{self.max_retries})")
+                self.limiter.on_throttle(retry_after_seconds(response))
+
+            except httpx.TransportError as e:
+                self.stats.record(None, time.perf_counter() - started)
+                logger.warning(f"Request error on {url} (attempt {attempt + 1}/{self.max_retries}): {type(e).__name__}")
+
+            except ValueError as e:
+                logger.error(f"JSON parse error from {url}: {e}")
+
+            if attempt < self.max_retries - 1:
+                self.stats.retries += 1
+                await asyncio.sleep(backoff_seconds(attempt, response, self.retry_delay))
+
+        logger.error(f"Request to {url} failed after {self.max_retries} attempts")
+        self.stats.failures += 1
+        return None
+
+
+_DONE = object()
+
+
+def _call_in_loop(loop, callback):
+    """Schedule callback on a fetch loop that may already have finished"""
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        pass  # Loop closed: every page has been fetched
+
+
+def fetch_pages(endpoint, params, pages, concurrency=SYNC_CONCURRENCY, transport=None, client_options=None):
+    """Fetch numbered pages concurrently, yielding (page, data) in page order.
+
+    data is None for a page whose retries were exhausted. At most
+    2 * concurrency pages are fetched ahead of the consumer, so a slow
+    writer holds back the fetching instead of buffering the whole catalog.
+    transport must support async requests (e.g. httpx.MockTransport).
+    """
+    pages = list(pages)
+    results = queue.Queue()
+    loop = asyncio.new_event_loop()
+    state = {}
+
+    async def produce():
+        window = state['window'] = asyncio.Semaphore(concurrency * 2)
+        in_flight = asyncio.Semaphore(concurrency)
+        fetched = asyncio.Queue()
+
+        async with AsyncAPIClient(transport=transport, pool_size=concurrency, **(client_options or {})) as client:
+            state['client'] = client
+
+            async def fetch(page):
+                async with in_flight:
+                    return await client.get_json(endpoint, {**params, 'page': page})
+
+            tasks = []
+
+            async def schedule():
+                for page in pages:
+                    await window.acquire()
+                    tasks.append(asyncio.create_task(fetch(page)))
+                    await fetched.put((page, tasks[-1]))
+
+            scheduler = asyncio.create_task(schedule())
+            try:
+                # Hand pages over in order, whichever finishes first
+                for _ in pages:
+                    page, task = await fetched.get()
+                    results.put((page, await task))
+            finally:
+                # Stopped early (consumer gone): drop whatever is still in flight
+                for task in [scheduler, *tasks]:
+                    task.cancel()
+                await asyncio.gather(scheduler, *tasks, return_exceptions=True)
+
+    def run():
+        try:
+            state['task'] = loop.create_task(produce())
+            loop.run_until_complete(state['task'])
+            results.put(_DONE)
+        except BaseException as e:
+            results.put(e)
+        finally:
+            loop.close()
+
+    thread = threading.Thread(target=run, name=f"fetch-{endpoint}", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+            # The page has been written; let the next one be fetched
+            _call_in_loop(loop, state['window'].release)
+    finally:
+        if thread.is_alive() and 'task' in state:
+            _call_in_loop(loop, state['task'].cancel)
+        thread.join()
+        if 'client' in state:
+            logger.info(f"Concurrent {endpoint} requests: {state['client'].stats.summary()}")
@@ -0,0 +1,48 @@
+"""
+Incremental Sync Helpers
+The sets endpoint reports each set's updatedAt. An incremental sync refetches
+cards only for sets that are new or whose updatedAt differs from the stored
+Set.updated_at, and records a watermark (the newest updatedAt it is in sync
+with) on its SyncStatus row.
+"""
+import logging
+from sqlalchemy import func, inspect, text
+
+from .models import Set, SyncStatus
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_watermark_column(engine):
+    """Add sync_status.watermark to databases created before it existed"""
+    existing = {column['name'] for column in inspect(engine).get_columns('sync_status')}
+    if 'watermark' not in existing:
+        logger.info("Adding sync_status.watermark column")
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE sync_status ADD COLUMN watermark VARCHAR"))
+
+
+def set_changed(stored_updated_at, set_data):
+    """Whether a set's cards need refetching (new set, or updatedAt moved)"""
+    upstream = set_data.get('updatedAt')
+    return stored_updated_at is None or upstream is None or stored_updated_at != upstream
+
+
+def last_watermark(session):
+    """Watermark of the most recent completed sync that recorded one"""
+    return (
+        session.query(SyncStatus.watermark)
+        .filter(SyncStatus.status == 'completed', SyncStatus.watermark.isnot(None))
+        .order_by(SyncStatus.started_at.desc())
+        .limit(1)
+        .scalar()
+    )
+
+
+def current_watermark(session):
+    """Newest stored set updatedAt (pokemontcg.io's "YYYY/MM/DD HH:MM:SS" orders as text).
+
+    Sets whose cards failed to sync keep their previous updatedAt, so this is
+    the newest change the database is fully in sync with.
+    """
+    return session.query(func.max(Set.updated_at)).scalar()
@@ -0,0 +1,211 @@
+"""
+Prometheus Metrics
+Dependency-free counters, gauges and histograms rendered in the Prometheus
+text exposition format for GET /metrics, plus per-request SQL accounting fed
+by the database layer's statement hooks
+"""
+import threading
+from contextvars import ContextVar
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base for labelled metrics; children are keyed by label values"""
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def samples(self):
+        """(suffix, labels, value) tuples for exposition"""
+        with self._lock:
+            return [("", list(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    """Monotonically increasing count, exposed as <name>_total (HELP and TYPE included)"""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        if not name.endswith("_total"):
+            name = f"{name}_total"
+        super().__init__(name, documentation, labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Value that goes up and down"""
+
+    type = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """Cumulative bucket counts, sum and count of observations"""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                labels = list(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append(("_bucket", labels + [("le", _format_value(float(bound)))], cumulative))
+                samples.append(("_sum", labels, total))
+                samples.append(("_count", labels, count))
+        return samples
+
+
+class Registry:
+    """Metrics plus collectors that report values read at scrape time"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """collect() returns [(name, type, help, [(labels dict, value), ...]), ...]"""
+        self._collectors.append(collect)
+
+    def render(self):
+        """All metrics in the Prometheus text format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        for collect in self._collectors:
+            for name, metric_type, documentation, samples in collect():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# HTTP requests
+http_requests = registry.register(Counter(
+    "api_http_requests", "HTTP requests handled", ["method", "route", "status"]
+))
+http_request_seconds = registry.register(Histogram(
+    "api_http_request_duration_seconds", "HTTP request latency", ["method", "route"]
+))
+http_requests_in_flight = registry.register(Gauge(
+    "api_http_requests_in_flight", "HTTP requests currently being handled"
+))
+
+# SQL work per request
+request_sql_queries = registry.register(Histogram(
+    "api_request_sql_queries", "SQL statements executed per request", ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+))
+request_sql_seconds = registry.register(Histogram(
+    "api_request_sql_duration_seconds", "Time spent in SQL per request", ["route"]
+))
+
+# TCGCSV upstream
+tcgcsv_request_seconds = registry.register(Histogram(
+    "tcgcsv_request_duration_seconds", "TCGCSV upstream request latency", ["outcome"]
+))
+tcgplayer_cache_lookups = registry.register(Counter(
+    "tcgplayer_cache_lookups", "TCGplayer proxy cache lookups", ["result"]
+))
+
+
+class RequestSql:
+    """SQL statements and time accumulated for one request"""
+
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+# Set by the metrics middleware; copied into query threads with the request context
+current_request_sql = ContextVar("current_request_sql", default=None)
+
+
+def record_statement(cursor, event, sql, seconds, rows):
+    """Statement hook for the database layer (see db.statement_hooks)"""
+    stats = current_request_sql.get()
+    if stats is None:
+        return
+    if event == "execute":
+        stats.queries += 1
+    stats.seconds += seconds
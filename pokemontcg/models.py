@@ -2,7 +2,7 @@
 SQLAlchemy ORM Models for Pokemon TCG Database
 """
 from sqlalchemy import (
-    Column, String, Integer, Float, Text, Boolean, DateTime, ForeignKey, Table
+    Column, String, Integer, Float, Text, Boolean, DateTime, ForeignKey, Table, Index
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -15,14 +15,17 @@ card_types_table = Table(
     'card_types',
     Base.metadata,
     Column('card_id', String, ForeignKey('cards.id', ondelete='CASCADE'), primary_key=True),
-    Column('type_name', String, ForeignKey('types.name', ondelete='CASCADE'), primary_key=True)
+    Column('type_name', String, ForeignKey('types.name', ondelete='CASCADE'), primary_key=True),
+    # Type filters look up cards by type (the primary key leads with card_id)
+    Index('idx_card_types_type_name', 'type_name', 'card_id')
 )
 
 card_subtypes_table = Table(
     'card_subtypes',
     Base.metadata,
     Column('card_id', String, ForeignKey('cards.id', ondelete='CASCADE'), primary_key=True),
-    Column('subtype_name', String, ForeignKey('subtypes.name', ondelete='CASCADE'), primary_key=True)
+    Column('subtype_name', String, ForeignKey('subtypes.name', ondelete='CASCADE'), primary_key=True),
+    Index('idx_card_subtypes_subtype_name', 'subtype_name', 'card_id')
 )
 
 
@@ -117,6 +120,15 @@ class Card(Base):
     cardmarket_low_price = Column(Float)
     cardmarket_trend_price = Column(Float)
     
+    # Stored sort keys (computed by the sync, see sort_keys.py)
+    set_release_date = Column(String)
+    number_sort = Column(String)  # Natural-sort card number
+    rarity_rank = Column(Integer)
+    hp_value = Column(Integer)
+    
+    # SHA-256 of the card's source JSON; unchanged cards are skipped by the sync (see card_writer.py)
+    content_hash = Column(String)
+    
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
     synced_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -131,6 +143,25 @@ class Card(Base):
     resistances = relationship('Resistance', back_populates='card', cascade='all, delete-orphan')
     variants = relationship('CardVariant', back_populates='card', cascade='all, delete-orphan')
     
+    # One composite index per /cards sort mode, matching its ORDER BY
+    __table_args__ = (
+        Index('idx_cards_sort_newest', set_release_date.desc(), number_sort, id),
+        Index('idx_cards_sort_oldest', set_id, number_sort, id),
+        Index('idx_cards_sort_name_asc', name, set_id, id),
+        Index('idx_cards_sort_name_desc', name.desc(), set_id, id),
+        Index('idx_cards_sort_hp_asc', hp_value, name, id),
+        Index('idx_cards_sort_hp_desc', hp_value.desc(), name, id),
+        Index('idx_cards_sort_rarity_asc', rarity_rank, name, id),
+        Index('idx_cards_sort_rarity_desc', rarity_rank.desc(), name, id),
+        Index('idx_cards_sort_number', number_sort, id),
+        # /cards range, legality and regulation mark filters
+        Index('idx_cards_retreat_cost', converted_retreat_cost),
+        Index('idx_cards_market_price', market_price),
+        Index('idx_cards_regulation_mark', regulation_mark),
+        Index('idx_cards_standard_legal', standard_legal),
+        Index('idx_cards_expanded_legal', expanded_legal),
+    )
+    
     def __repr__(self):
         return f"<Card(id='{self.id}', name='{self.name}')>"
 
@@ -188,6 +219,9 @@ class Attack(Base):
     
     card = relationship('Card', back_populates='attacks')
     
+    # Child rows are loaded, and replaced by the sync, by card_id
+    __table_args__ = (Index('idx_attacks_card_id', 'card_id'),)
+    
     def __repr__(self):
         return f"<Attack(name='{self.name}', damage='{self.damage}')>"
 
@@ -204,6 +238,8 @@ class Ability(Base):
     
     card = relationship('Card', back_populates='abilities')
     
+    __table_args__ = (Index('idx_abilities_card_id', 'card_id'),)
+    
     def __repr__(self):
         return f"<Ability(name='{self.name}', type='{self.ability_type}')>"
 
@@ -218,6 +254,8 @@ class Weakness(Base):
     value = Column(String, nullable=False)
     
     card = relationship('Card', back_populates='weaknesses')
+    
+    __table_args__ = (Index('idx_weaknesses_card_id', 'card_id'),)
 
 
 class Resistance(Base):
@@ -230,6 +268,8 @@ class Resistance(Base):
     value = Column(String, nullable=False)
     
     card = relationship('Card', back_populates='resistances')
+    
+    __table_args__ = (Index('idx_resistances_card_id', 'card_id'),)
 
 
 # Reference tables
@@ -273,12 +313,53 @@ class Rarity(Base):
         return f"<Rarity(name='{self.name}')>"
 
 
+class CardDocument(Base):
+    """Pre-rendered camelCase JSON for a card, served directly by the API"""
+    __tablename__ = 'card_documents'
+    
+    card_id = Column(String, ForeignKey('cards.id', ondelete='CASCADE'), primary_key=True)
+    set_id = Column(String, index=True)
+    
+    summary = Column(Text, nullable=False)  # /cards listing rendering
+    detail = Column(Text, nullable=False)  # /cards/{card_id} rendering
+    
+    rendered_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<CardDocument(card_id='{self.card_id}')>"
+
+
+class SetDocument(Base):
+    """Pre-rendered camelCase JSON for a set, served directly by the API"""
+    __tablename__ = 'set_documents'
+    
+    set_id = Column(String, ForeignKey('sets.id', ondelete='CASCADE'), primary_key=True)
+    body = Column(Text, nullable=False)
+    
+    rendered_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<SetDocument(set_id='{self.set_id}')>"
+
+
+class DataGeneration(Base):
+    """Single-row counter bumped whenever a sync commits data changes"""
+    __tablename__ = 'data_generation'
+    
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+    bumped_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<DataGeneration(generation={self.generation})>"
+
+
 class SyncStatus(Base):
     """Track sync progress and status"""
     __tablename__ = 'sync_status'
     
     id = Column(Integer, primary_key=True)
-    sync_type = Column(String, nullable=False)  # 'full', 'update', 'prices'
+    sync_type = Column(String, nullable=False)  # 'full', 'incremental', 'update', 'prices'
     started_at = Column(DateTime, nullable=False)
     completed_at = Column(DateTime)
     status = Column(String, nullable=False)  # 'running', 'completed', 'failed'
@@ -290,5 +371,8 @@ class SyncStatus(Base):
     last_processed_id = Column(String)  # For resuming
     error_message = Column(Text)
     
+    # Newest set updatedAt whose cards are in sync (see incremental.py)
+    watermark = Column(String)
+    
     def __repr__(self):
         return f"<SyncStatus(type='{self.sync_type}', status='{self.status}')>"
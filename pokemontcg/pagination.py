@@ -0,0 +1,105 @@
+"""
+Keyset (cursor) pagination helpers
+A sort is a list of (sql_expression, 'ASC' | 'DESC') keys ending in a unique
+column; the cursor is the opaque, encoded key tuple of the last row returned
+"""
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor can't be decoded or belongs to a different sort"""
+
+
+def encode_cursor(sort, values):
+    """Encode the sort name and last row's key values as an opaque token"""
+    raw = json.dumps([sort, list(values)], separators=(",", ":")).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(token, sort, key_count):
+    """Decode a cursor token back into key values for the given sort"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cursor_sort, values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+
+    if cursor_sort != sort:
+        raise InvalidCursor(f"Cursor was issued for sort '{cursor_sort}', not '{sort}'")
+    if not isinstance(values, list) or len(values) != key_count:
+        raise InvalidCursor("Cursor does not match the sort keys")
+    return values
+
+
+def order_by_sql(keys):
+    """ORDER BY clause for a list of (expression, direction) keys"""
+    return "ORDER BY " + ", ".join(f"{expr} {direction}" for expr, direction in keys)
+
+
+def select_keys_sql(keys):
+    """Extra select-list columns exposing each key value as sort_key_N"""
+    return ", ".join(f"{expr} AS sort_key_{i}" for i, (expr, _) in enumerate(keys))
+
+
+def pop_key_values(row, keys):
+    """Remove the sort_key_N columns from a row dict and return their values"""
+    return [row.pop(f"sort_key_{i}") for i in range(len(keys))]
+
+
+def _equals(expr, value):
+    # Parenthesize so keys like "c.hp IS NULL" keep their meaning
+    expr = f"({expr})"
+    if value is None:
+        return f"{expr} IS NULL", []
+    return f"{expr} = ?", [value]
+
+
+def _after(expr, direction, value):
+    expr = f"({expr})"
+    # SQLite sorts NULLs first ascending and last descending
+    if direction == 'ASC':
+        if value is None:
+            return f"{expr} IS NOT NULL", []
+        return f"{expr} > ?", [value]
+    if value is None:
+        return "0", []
+    return f"({expr} < ? OR {expr} IS NULL)", [value]
+
+
+def _bound(expr, direction, value):
+    # Redundant range on the leading key so an index on it can seek to the cursor
+    expr = f"({expr})"
+    if direction == 'ASC':
+        if value is None:
+            return None, []
+        return f"{expr} >= ?", [value]
+    if value is None:
+        return f"{expr} IS NULL", []
+    return f"({expr} <= ? OR {expr} IS NULL)", [value]
+
+
+def keyset_sql(keys, values):
+    """WHERE fragment selecting rows that sort strictly after values.
+
+    Expands the row-value comparison into (k1 after v1) OR (k1 = v1 AND k2
+    after v2) OR ... so mixed directions and NULL keys are handled.
+    """
+    alternatives = []
+    params = []
+    for i, (expr, direction) in enumerate(keys):
+        terms = []
+        for j, (prev_expr, _) in enumerate(keys[:i]):
+            sql, term_params = _equals(prev_expr, values[j])
+            terms.append(sql)
+            params.extend(term_params)
+        sql, term_params = _after(expr, direction, values[i])
+        terms.append(sql)
+        params.extend(term_params)
+        alternatives.append("(" + " AND ".join(terms) + ")")
+
+    sql = "(" + " OR ".join(alternatives) + ")"
+    bound, bound_params = _bound(keys[0][0], keys[0][1], values[0])
+    if bound:
+        return f"{bound} AND {sql}", bound_params + params
+    return sql, params
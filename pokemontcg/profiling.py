@@ -0,0 +1,198 @@
+"""
+SQL Profiling
+Opt-in (SQL_PROFILE) per-request statement timing with a Server-Timing
+breakdown by phase, and a slow-query log that records each statement over
+SLOW_QUERY_MS with its query plan. The API's pooled SQLite connections report
+through the database layer's statement hooks; the sync engines (SQLite or
+Postgres) are profiled through SQLAlchemy cursor events.
+"""
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+# Server-Timing phases of a card request, in the order they run
+PHASES = ['count', 'page', 'enrichment', 'serialization']
+
+slow_query_logger = logging.getLogger("pokemontcg.slow_queries")
+
+
+def configure_slow_query_log(path):
+    """Append slow-query entries to path (once per process)"""
+    if slow_query_logger.handlers:
+        return
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+    slow_query_logger.addHandler(handler)
+    slow_query_logger.setLevel(logging.INFO)
+
+
+class RequestProfile:
+    """Statements and phase timings recorded for one request"""
+
+    def __init__(self):
+        self.statements = []  # {"sql", "parameters", "seconds", "rows", "phase"}
+        self.phases = {}  # phase -> seconds
+        self.phase = None
+        self._open = {}  # id(cursor) -> statement its fetches belong to
+
+    def sql_seconds(self, phase=None):
+        return sum(s["seconds"] for s in self.statements if phase is None or s["phase"] == phase)
+
+    def slow_statements(self, threshold_ms):
+        return [s for s in self.statements if s["seconds"] * 1000 >= threshold_ms]
+
+
+# Set by the profiling middleware; copied into query threads with the request context
+current_profile = ContextVar("current_profile", default=None)
+
+
+@contextmanager
+def phase(name):
+    """Attribute the enclosed work (and its statements) to a Server-Timing phase"""
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    previous, profile.phase = profile.phase, name
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.phases[name] = profile.phases.get(name, 0.0) + time.perf_counter() - started
+        profile.phase = previous
+
+
+def profile_statement(cursor, event, sql, seconds, rows):
+    """Statement hook for the database layer (see db.statement_hooks)"""
+    profile = current_profile.get()
+    if profile is None:
+        return
+    if event == "execute":
+        statement = {
+            "sql": sql,
+            "parameters": getattr(cursor, "parameters", ()),
+            "seconds": seconds,
+            "rows": 0,
+            "phase": profile.phase
+        }
+        profile.statements.append(statement)
+        profile._open[id(cursor)] = statement
+        return
+    # Fetch time and rows belong to the cursor's last statement
+    statement = profile._open.get(id(cursor))
+    if statement is not None:
+        statement["seconds"] += seconds
+        statement["rows"] += rows or 0
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.2f}"
+
+
+def server_timing(profile, total_seconds):
+    """Server-Timing header value: each phase (with its SQL share), all SQL, and the total"""
+    entries = []
+    for name in PHASES:
+        if name in profile.phases:
+            statements = [s for s in profile.statements if s["phase"] == name]
+            entries.append(
+                f'{name};dur={_ms(profile.phases[name])};desc="{len(statements)} sql, {_ms(profile.sql_seconds(name))}ms"'
+            )
+    rows = sum(s["rows"] for s in profile.statements)
+    entries.append(
+        f'sql;dur={_ms(profile.sql_seconds())};desc="{len(profile.statements)} statements, {rows} rows"'
+    )
+    entries.append(f"total;dur={_ms(total_seconds)}")
+    return ", ".join(entries)
+
+
+def _squash(sql):
+    return " ".join(sql.split())
+
+
+def sqlite_query_plan(conn, sql, parameters=()):
+    """EXPLAIN QUERY PLAN lines for a statement, indented by plan depth"""
+    # A plain cursor, so the EXPLAIN itself is not reported to the statement hooks
+    cursor = sqlite3.Cursor(conn)
+    cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in cursor.fetchall():
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def log_slow_statement(source, statement, plan):
+    """Write one slow statement and its plan to the slow-query log"""
+    lines = [
+        f"{source} [{statement.get('phase') or '-'}] {_ms(statement['seconds'])}ms "
+        f"{statement['rows']} rows: {_squash(statement['sql'])}",
+        f"    params: {list(statement['parameters'] or [])}"
+    ]
+    lines += [f"    plan: {line}" for line in plan]
+    slow_query_logger.warning("\n".join(lines))
+
+
+def explain_slow_statements(conn, source, statements):
+    """Log SQLite statements with their query plans (run on a pooled connection)"""
+    for statement in statements:
+        try:
+            plan = sqlite_query_plan(conn, statement["sql"], statement["parameters"] or ())
+        except sqlite3.Error as e:
+            plan = [f"unavailable ({e})"]
+        log_slow_statement(source, statement, plan)
+
+
+def install_engine_profiler(engine, threshold_ms):
+    """Log an engine's statements over threshold_ms with EXPLAIN output.
+
+    Works for the sync's SQLite and Postgres engines: SQLite plans come from
+    EXPLAIN QUERY PLAN, Postgres plans from EXPLAIN (which does not run the
+    statement).
+    """
+    from sqlalchemy import event
+
+    dialect = engine.dialect.name
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _started(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finished(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["profile_started"].pop()
+        if seconds * 1000 < threshold_ms:
+            return
+        record = {
+            "sql": statement,
+            "parameters": [] if executemany else parameters,
+            "seconds": seconds,
+            "rows": max(cursor.rowcount, 0),
+            "phase": "executemany" if executemany else None
+        }
+        plan = []
+        if not executemany:
+            explain_cursor = conn.connection.cursor()
+            try:
+                if dialect == "sqlite":
+                    explain_cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                    plan = [row[3] for row in explain_cursor.fetchall()]
+                else:
+                    # A failed EXPLAIN must not abort the sync's transaction
+                    explain_cursor.execute("SAVEPOINT profile_explain")
+                    try:
+                        explain_cursor.execute(f"EXPLAIN {statement}", parameters)
+                        plan = [row[0] for row in explain_cursor.fetchall()]
+                    finally:
+                        explain_cursor.execute("ROLLBACK TO SAVEPOINT profile_explain")
+                        explain_cursor.execute("RELEASE SAVEPOINT profile_explain")
+            except Exception as e:
+                plan = [f"unavailable ({e})"]
+            finally:
+                explain_cursor.close()
+        log_slow_statement(f"sync:{dialect}", record, plan)
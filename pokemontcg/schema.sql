@@ -61,6 +61,11 @@ CREATE TABLE cards (
     cardmarket_avg_price FLOAT,
     cardmarket_low_price FLOAT,
     cardmarket_trend_price FLOAT,
+    set_release_date VARCHAR,
+    number_sort VARCHAR,
+    rarity_rank INTEGER,
+    hp_value INTEGER,
+    content_hash VARCHAR,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -72,6 +77,23 @@ CREATE INDEX idx_cards_rarity ON cards(rarity);
 CREATE INDEX idx_cards_set_id ON cards(set_id);
 CREATE INDEX idx_cards_market_price ON cards(market_price);
 
+-- /cards range, legality and regulation mark filters
+CREATE INDEX idx_cards_retreat_cost ON cards(converted_retreat_cost);
+CREATE INDEX idx_cards_regulation_mark ON cards(regulation_mark);
+CREATE INDEX idx_cards_standard_legal ON cards(standard_legal);
+CREATE INDEX idx_cards_expanded_legal ON cards(expanded_legal);
+
+-- One composite index per /cards sort mode
+CREATE INDEX idx_cards_sort_newest ON cards(set_release_date DESC, number_sort, id);
+CREATE INDEX idx_cards_sort_oldest ON cards(set_id, number_sort, id);
+CREATE INDEX idx_cards_sort_name_asc ON cards(name, set_id, id);
+CREATE INDEX idx_cards_sort_name_desc ON cards(name DESC, set_id, id);
+CREATE INDEX idx_cards_sort_hp_asc ON cards(hp_value, name, id);
+CREATE INDEX idx_cards_sort_hp_desc ON cards(hp_value DESC, name, id);
+CREATE INDEX idx_cards_sort_rarity_asc ON cards(rarity_rank, name, id);
+CREATE INDEX idx_cards_sort_rarity_desc ON cards(rarity_rank DESC, name, id);
+CREATE INDEX idx_cards_sort_number ON cards(number_sort, id);
+
 -- Types reference table
 CREATE TABLE types (
     name VARCHAR PRIMARY KEY
@@ -194,6 +216,49 @@ CREATE INDEX idx_card_variants_type ON card_variants(variant_type);
 CREATE INDEX idx_card_variants_tcgplayer_product_id ON card_variants(tcgplayer_product_id);
 CREATE INDEX idx_card_variants_market_price ON card_variants(market_price);
 
+-- Pre-rendered card documents (camelCase JSON served as-is by the API)
+CREATE TABLE card_documents (
+    card_id VARCHAR PRIMARY KEY REFERENCES cards(id) ON DELETE CASCADE,
+    set_id VARCHAR,
+    summary TEXT NOT NULL,
+    detail TEXT NOT NULL,
+    rendered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_card_documents_set_id ON card_documents(set_id);
+
+-- Pre-rendered set documents
+CREATE TABLE set_documents (
+    set_id VARCHAR PRIMARY KEY REFERENCES sets(id) ON DELETE CASCADE,
+    body TEXT NOT NULL,
+    rendered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Full-text card search (SQLite uses an FTS5 virtual table instead, see search.py)
+CREATE TABLE card_search (
+    card_id VARCHAR PRIMARY KEY REFERENCES cards(id) ON DELETE CASCADE,
+    name TEXT,
+    attacks TEXT,
+    abilities TEXT,
+    rules TEXT,
+    flavor_text TEXT,
+    document tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(attacks, '') || ' ' || coalesce(abilities, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(rules, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(flavor_text, '')), 'D')
+    ) STORED
+);
+
+CREATE INDEX idx_card_search_document ON card_search USING GIN (document);
+
+-- Data generation counter (bumped by every sync that commits changes)
+CREATE TABLE data_generation (
+    id INTEGER PRIMARY KEY,
+    generation INTEGER NOT NULL DEFAULT 0,
+    bumped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Sync status table
 CREATE TABLE sync_status (
     id SERIAL PRIMARY KEY,
@@ -205,7 +270,8 @@ CREATE TABLE sync_status (
     processed_items INTEGER,
     failed_items INTEGER,
     last_processed_id VARCHAR,
-    error_message TEXT
+    error_message TEXT,
+    watermark VARCHAR
 );
 
 CREATE INDEX idx_sync_status_type ON sync_status(sync_type);
@@ -0,0 +1,174 @@
+"""
+Full-Text Card Search
+Maintains the card_search index (an FTS5 virtual table on SQLite, a tsvector
+column with a GIN index on Postgres) over card names, attacks, abilities,
+rules and flavor text, and turns user input into safe FTS5 queries.
+
+On SQLite every entry has its card's rowid, so entries are replaced by rowid
+lookups: FTS5 cannot index card_id, and matching on it scans the whole index.
+"""
+import json
+import re
+import logging
+from sqlalchemy import inspect, text
+
+from .enrichment import chunked, fetch_in
+
+logger = logging.getLogger(__name__)
+
+# Indexed columns in FTS5 column order (after the unindexed card_id)
+SEARCH_COLUMNS = ['name', 'attacks', 'abilities', 'rules', 'flavor_text']
+
+# BM25 weight per column: card_id (unindexed), then SEARCH_COLUMNS
+SEARCH_WEIGHTS = [0.0, 10.0, 4.0, 4.0, 2.0, 1.0]
+
+SQLITE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS card_search USING fts5(
+        card_id UNINDEXED, name, attacks, abilities, rules, flavor_text,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """
+]
+
+POSTGRES_SEARCH_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS card_search (
+        card_id VARCHAR PRIMARY KEY REFERENCES cards(id) ON DELETE CASCADE,
+        name TEXT,
+        attacks TEXT,
+        abilities TEXT,
+        rules TEXT,
+        flavor_text TEXT,
+        document tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(attacks, '') || ' ' || coalesce(abilities, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(rules, '')), 'C') ||
+            setweight(to_tsvector('simple', coalesce(flavor_text, '')), 'D')
+        ) STORED
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_card_search_document ON card_search USING GIN (document)"
+]
+
+# Words in a user query ("thunder sho" -> thunder, sho)
+QUERY_TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def ensure_search_index(engine):
+    """Create the card_search index if missing.
+
+    Returns True when it was just created, i.e. existing cards still need to
+    be indexed.
+    """
+    if inspect(engine).has_table('card_search'):
+        if engine.dialect.name == 'postgresql' or _keyed_by_rowid(engine):
+            return False
+        # Indexes from before entries shared their card's rowid
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM card_search"))
+        logger.info("Cleared card_search entries not keyed by card rowid")
+        return True
+
+    ddl = POSTGRES_SEARCH_DDL if engine.dialect.name == 'postgresql' else SQLITE_SEARCH_DDL
+    with engine.begin() as conn:
+        for statement in ddl:
+            conn.execute(text(statement))
+    logger.info("Created card_search index")
+    return True
+
+
+def _keyed_by_rowid(engine):
+    """Whether every SQLite search entry has the rowid of the card it indexes"""
+    with engine.connect() as conn:
+        mismatch = conn.execute(text(
+            "SELECT 1 FROM card_search s LEFT JOIN cards c ON c.rowid = s.rowid "
+            "WHERE c.id IS NULL OR c.id != s.card_id LIMIT 1"
+        )).first()
+    return mismatch is None
+
+
+def _join_lines(rows):
+    """Group (card_id, name, text) rows into {card_id: "name: text\\n..."}"""
+    grouped = {}
+    for card_id, name, body in rows:
+        line = f"{name}: {body}" if body else (name or '')
+        grouped.setdefault(card_id, []).append(line)
+    return {card_id: "\n".join(lines) for card_id, lines in grouped.items()}
+
+
+def _rules_text(rules):
+    """Rules are stored as a JSON array of strings"""
+    if not rules:
+        return None
+    try:
+        return "\n".join(json.loads(rules))
+    except (TypeError, ValueError):
+        return rules
+
+
+def refresh_card_search(conn, card_ids, placeholder='?'):
+    """Rebuild the search entries of card_ids from the committed card rows.
+
+    conn is a DB-API connection (sqlite3 or psycopg2). Returns the number of
+    entries written.
+    """
+    card_ids = list(dict.fromkeys(card_ids))
+    if not card_ids:
+        return 0
+
+    cursor = conn.cursor()
+    written = 0
+    # SQLite entries are keyed by the card's rowid, Postgres ones by card_id
+    by_rowid = placeholder == '?'
+    key_columns = ['rowid', 'card_id'] if by_rowid else ['card_id']
+
+    for chunk in chunked(card_ids):
+        marks = ", ".join([placeholder] * len(chunk))
+        cursor.execute(f"SELECT {'rowid, ' if by_rowid else ''}id, name, rules, flavor_text FROM cards WHERE id IN ({marks})", chunk)
+        cards = cursor.fetchall()
+
+        attacks = _join_lines(fetch_in(cursor, "SELECT card_id, name, text FROM attacks WHERE card_id IN ({ids}) ORDER BY id", chunk, placeholder))
+        abilities = _join_lines(fetch_in(cursor, "SELECT card_id, name, text FROM abilities WHERE card_id IN ({ids}) ORDER BY id", chunk, placeholder))
+
+        if by_rowid:
+            if cards:
+                cursor.execute(f"DELETE FROM card_search WHERE rowid IN ({', '.join('?' * len(cards))})", [row[0] for row in cards])
+            # Deleted cards have no rowid left to go by: their entries are
+            # matched by card_id, a scan paid only when cards were removed
+            deleted = set(chunk) - {row[1] for row in cards}
+            if deleted:
+                cursor.execute(f"DELETE FROM card_search WHERE card_id IN ({', '.join('?' * len(deleted))})", list(deleted))
+        else:
+            cursor.execute(f"DELETE FROM card_search WHERE card_id IN ({marks})", chunk)
+
+        cursor.executemany(
+            f"INSERT INTO card_search ({', '.join(key_columns + SEARCH_COLUMNS)}) "
+            f"VALUES ({', '.join([placeholder] * (len(key_columns) + len(SEARCH_COLUMNS)))})",
+            [
+                (*key, name, attacks.get(key[-1]), abilities.get(key[-1]), _rules_text(rules), flavor_text)
+                for *key, name, rules, flavor_text in cards
+            ]
+        )
+        written += len(cards)
+
+    conn.commit()
+    return written
+
+
+def fts_query(q):
+    """Turn free text into an FTS5 query: every word must match, as a prefix.
+
+    Words are quoted so FTS5 syntax in user input (AND, NEAR, column filters,
+    stray quotes) is treated as plain text. Returns None if q has no words.
+    """
+    terms = QUERY_TERM_PATTERN.findall(q or '')
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def bm25_sql(table='card_search'):
+    """BM25 rank expression (lower is better) with the column weights"""
+    return f"bm25({table}, {', '.join(str(weight) for weight in SEARCH_WEIGHTS)})"
@@ -0,0 +1,144 @@
+"""
+Stored Sort Keys for Cards
+Computes the /cards sort keys (set release date, natural card number, rarity
+rank, numeric HP) at sync time so the API can order by indexed columns
+"""
+import re
+import logging
+from sqlalchemy import inspect, text
+
+from .models import (
+    Card, Attack, Ability, Weakness, Resistance, card_types_table, card_subtypes_table
+)
+
+logger = logging.getLogger(__name__)
+
+# Rarities in ascending order; anything else ranks last
+RARITY_ORDER = [
+    'Common', 'Uncommon', 'Rare', 'Rare Holo', 'Rare Holo EX', 'Rare Holo GX',
+    'Rare Holo V', 'Rare Holo VMAX', 'Rare Ultra', 'Rare Secret', 'Rare Rainbow',
+    'Amazing Rare', 'Hyper Rare'
+]
+RARITY_RANKS = {rarity: rank for rank, rarity in enumerate(RARITY_ORDER, start=1)}
+UNKNOWN_RARITY_RANK = 999
+
+# Card number split into prefix, digits and suffix ("TG01" -> "TG", "01", "")
+NUMBER_PATTERN = re.compile(r'^(\D*)(\d*)(.*)$')
+
+# Sort key columns added to existing databases by ensure_sort_key_columns
+SORT_KEY_COLUMNS = {
+    'set_release_date': 'VARCHAR',
+    'number_sort': 'VARCHAR',
+    'rarity_rank': 'INTEGER',
+    'hp_value': 'INTEGER'
+}
+
+
+def number_sort_key(number):
+    """Natural-sort key for a card number.
+
+    Digits are zero padded so "2" < "10", plain numbers sort before prefixed
+    ones, and prefixed numbers (TG01, SV001, H1) sort numerically within
+    their prefix. "123/456" sorts as 123.
+    """
+    if not number:
+        return None
+    number = number.split('/')[0]
+    prefix, digits, suffix = NUMBER_PATTERN.match(number).groups()
+    if not digits:
+        return number
+    return f"{prefix}{int(digits):08d}{suffix}"
+
+
+def rarity_rank(rarity):
+    """Rank of a rarity (Common first, unknown rarities last)"""
+    return RARITY_RANKS.get(rarity, UNKNOWN_RARITY_RANK)
+
+
+def hp_value(hp):
+    """HP as an integer, or None when missing or non-numeric"""
+    try:
+        return int(hp)
+    except (TypeError, ValueError):
+        return None
+
+
+def sort_key_values(number, rarity, hp, set_release_date):
+    """Stored sort key columns for a card's fields"""
+    return {
+        'set_release_date': set_release_date,
+        'number_sort': number_sort_key(number),
+        'rarity_rank': rarity_rank(rarity),
+        'hp_value': hp_value(hp)
+    }
+
+
+def apply_sort_keys(card, set_release_date):
+    """Set the stored sort keys on a Card from its current fields"""
+    for name, value in sort_key_values(card.number, card.rarity, card.hp, set_release_date).items():
+        setattr(card, name, value)
+
+
+def ensure_sort_key_columns(engine):
+    """Add the sort key columns and indexes to an existing cards table.
+
+    create_all only creates missing tables, so databases created before the
+    columns existed are migrated here and their rows backfilled once. Indexes
+    added to the cards, junction and child tables since are created here too.
+    """
+    existing = {column['name'] for column in inspect(engine).get_columns('cards')}
+    missing = [name for name in SORT_KEY_COLUMNS if name not in existing]
+
+    with engine.begin() as conn:
+        for name in missing:
+            logger.info(f"Adding cards.{name} sort key column")
+            conn.execute(text(f"ALTER TABLE cards ADD COLUMN {name} {SORT_KEY_COLUMNS[name]}"))
+
+    for table in (Card.__table__, card_types_table, card_subtypes_table,
+                  Attack.__table__, Ability.__table__, Weakness.__table__, Resistance.__table__):
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+    if missing:
+        backfill_sort_keys(engine)
+
+
+def backfill_sort_keys(engine):
+    """Recompute the stored sort keys of every card"""
+    with engine.begin() as conn:
+        rows = conn.execute(
+            text("""
+                SELECT c.id, c.number, c.rarity, c.hp, s.release_date
+                FROM cards c LEFT JOIN sets s ON s.id = c.set_id
+            """)
+        ).fetchall()
+
+        if rows:
+            conn.execute(
+                text("""
+                    UPDATE cards
+                    SET set_release_date = :set_release_date, number_sort = :number_sort,
+                        rarity_rank = :rarity_rank, hp_value = :hp_value
+                    WHERE id = :id
+                """),
+                [
+                    {
+                        'id': card_id,
+                        'set_release_date': release_date,
+                        'number_sort': number_sort_key(number),
+                        'rarity_rank': rarity_rank(rarity),
+                        'hp_value': hp_value(hp)
+                    }
+                    for card_id, number, rarity, hp, release_date in rows
+                ]
+            )
+
+    logger.info(f"Backfilled sort keys for {len(rows)} cards")
+
+
+def update_set_release_date(session, set_id, release_date):
+    """Copy a set's release date onto its cards' stored sort key"""
+    session.query(Card).filter_by(set_id=set_id).update(
+        {Card.set_release_date: release_date},
+        synchronize_session=False
+    )
@@ -2,26 +2,30 @@
 Main Database Sync Script for Pokemon TCG API
 Fetches all data from the API and stores in local database
 """
-import subprocess
-import time
-import json
+import itertools
+import math
 import logging
 import argparse
 from datetime import datetime, timezone
-from urllib.parse import urlencode, quote
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import IntegrityError
 
 from .config import (
-    API_KEY, BASE_URL, DATABASE_URL, BATCH_SIZE, 
-    RATE_LIMIT_DELAY, MAX_RETRIES, RETRY_DELAY,
-    INCLUDE_PRICING, LOG_LEVEL, LOG_FILE, REQUEST_TIMEOUT
+    DATABASE_URL, BATCH_SIZE,
+    INCLUDE_PRICING, LOG_LEVEL, LOG_FILE,
+    SQL_PROFILE, SLOW_QUERY_MS, SLOW_QUERY_LOG
 )
 from .models import (
-    Base, Set, Card, Attack, Ability, Weakness, Resistance,
-    Type, Subtype, Supertype, Rarity, SyncStatus
+    Base, Set, Type, Subtype, Supertype, Rarity, SyncStatus
 )
+from .sort_keys import ensure_sort_key_columns, update_set_release_date
+from .card_writer import CardChanges, CardWriter, ensure_content_hash_column
+from .incremental import current_watermark, ensure_watermark_column, last_watermark, set_changed
+from .http_client import APIClient, fetch_pages
+from .profiling import configure_slow_query_log, install_engine_profiler
+from .search import ensure_search_index
+from .document_sync import DocumentRefresh
 
 # Setup logging
 logging.basicConfig(
@@ -35,114 +39,43 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class PokemonTCGSync:
+class PokemonTCGSync(DocumentRefresh):
     """Sync Pokemon TCG API data to local database"""
     
-    def __init__(self, database_url=None):
+    def __init__(self, database_url=None, transport=None):
         self.database_url = database_url or DATABASE_URL
         self.engine = create_engine(self.database_url, echo=False)
+        if SQL_PROFILE:
+            configure_slow_query_log(SLOW_QUERY_LOG)
+            install_engine_profiler(self.engine, SLOW_QUERY_MS)
         self.Session = sessionmaker(bind=self.engine)
-        self.headers = {'X-Api-Key': API_KEY}
+        # transport lets tests serve the API from a local stand-in (it must
+        # support sync and async requests, e.g. httpx.MockTransport)
+        self.transport = transport
+        self.client = APIClient(transport=transport)
+        self.writer = CardWriter(self.engine, include_pricing=INCLUDE_PRICING)
+        # Cards inserted/updated/unchanged/deleted by this syncer's card syncs
+        self.card_changes = CardChanges()
         
     def init_database(self):
         """Create all database tables"""
         logger.info("Creating database tables...")
         Base.metadata.create_all(self.engine)
+        ensure_sort_key_columns(self.engine)
+        ensure_watermark_column(self.engine)
+        ensure_content_hash_column(self.engine)
+        if ensure_search_index(self.engine):
+            self._refresh_card_search(self._all_card_ids())
         logger.info("Database tables created successfully")
         
     def make_request(self, endpoint, params=None):
-        """Make API request using PowerShell (more reliable on Windows)"""
-        url = f"{BASE_URL}/{endpoint}"
-        
-        # Build query string if params provided (properly URL encoded)
-        if params:
-            url += "?" + urlencode(params, quote_via=quote)
-        
-        for attempt in range(MAX_RETRIES):
-            try:
-                # Build PowerShell command with proper escaping
-                ps_cmd = f'$response = Invoke-WebRequest -Uri "{url}"'
-                
-                # Add API key header
-                ps_cmd += f" -Headers @{{'X-Api-Key'='{API_KEY}'}}"
-                ps_cmd += f" -TimeoutSec {REQUEST_TIMEOUT}"
-                ps_cmd += " -UseBasicParsing"
-                ps_cmd += "; $response.Content"
-                
-                logger.debug(f"Requesting: {endpoint} (attempt {attempt + 1}/{MAX_RETRIES})")
-                
-                # Execute PowerShell command
-                result = subprocess.run(
-                    ['powershell', '-Command', ps_cmd],
-                    capture_output=True,
-                    text=True,
-                    timeout=REQUEST_TIMEOUT + 10
-                )
-                
-                if result.returncode == 0 and result.stdout.strip():
-                    try:
-                        data = json.loads(result.stdout)
-                        if RATE_LIMIT_DELAY > 0:
-                            time.sleep(RATE_LIMIT_DELAY)
-                        return data
-                    except json.JSONDecodeError as e:
-                        logger.error(f"JSON parse error: {e}")
-                        logger.debug(f"Response: {result.stdout[:500]}")
-                        if attempt < MAX_RETRIES - 1:
-                            wait_time = RETRY_DELAY * (2 ** attempt)
-                            logger.info(f"Retrying in {wait_time}s...")
-                            time.sleep(wait_time)
-                        else:
-                            return None
-                else:
-                    # Check for rate limiting or server errors in stderr
-                    stderr_lower = result.stderr.lower()
-                    if '429' in stderr_lower or 'rate limit' in stderr_lower:
-                        wait_time = RETRY_DELAY * (3 ** attempt)
-                        logger.warning(f"Rate limited! Waiting {wait_time}s...")
-                        time.sleep(wait_time)
-                    elif '50' in result.stderr[:10]:  # 500-level errors
-                        logger.warning(f"Server error detected")
-                        if attempt < MAX_RETRIES - 1:
-                            wait_time = RETRY_DELAY * (2 ** attempt)
-                            logger.info(f"Retrying in {wait_time}s...")
-                            time.sleep(wait_time)
-                        else:
-                            return None
-                    else:
-                        if attempt < MAX_RETRIES - 1:
-                            wait_time = RETRY_DELAY * (2 ** attempt)
-                            logger.warning(f"Request failed, retrying in {wait_time}s...")
-                            time.sleep(wait_time)
-                        else:
-                            logger.error(f"Request failed: {result.stderr[:200]}")
-                            return None
-                    
-            except subprocess.TimeoutExpired:
-                logger.warning(f"Request timeout on attempt {attempt + 1}/{MAX_RETRIES}")
-                if attempt < MAX_RETRIES - 1:
-                    wait_time = RETRY_DELAY * (2 ** attempt)
-                    logger.info(f"Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                else:
-                    logger.error(f"Failed after {MAX_RETRIES} timeout attempts")
-                    return None
-            
-            except KeyboardInterrupt:
-                logger.warning("Request interrupted by user")
-                raise
-                    
-            except Exception as e:
-                logger.warning(f"Request error on attempt {attempt + 1}/{MAX_RETRIES}: {type(e).__name__}")
-                if attempt < MAX_RETRIES - 1:
-                    wait_time = RETRY_DELAY * (2 ** attempt)
-                    logger.info(f"Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                else:
-                    logger.error(f"Failed after {MAX_RETRIES} attempts: {e}")
-                    return None
-        
-        return None
+        """GET an API endpoint over the pooled client; None if every attempt failed"""
+        return self.client.get_json(endpoint, params)
+    
+    def close(self):
+        """Close the API client's pooled connections"""
+        logger.info(f"API requests: {self.client.stats.summary()}")
+        self.client.close()
     
     def sync_reference_data(self):
         """Sync types, subtypes, supertypes, and rarities"""
@@ -220,6 +153,7 @@ class PokemonTCGSync:
             
             session.commit()
             logger.info("Reference data synced successfully")
+            self._bump_generation()
             
         except KeyboardInterrupt:
             logger.warning("Reference data sync interrupted by user")
@@ -231,8 +165,20 @@ class PokemonTCGSync:
         finally:
             session.close()
     
-    def sync_sets(self):
-        """Sync all sets from API"""
+    def sync_sets(self, rerender_cards=True):
+        """Sync all sets from API
+        
+        Card documents embed their set, so cards of sets whose rendering changed
+        are re-rendered too unless rerender_cards is False (a card sync follows).
+        
+        New sets and sets whose updatedAt changed keep their previously stored
+        updatedAt (None for new sets) until their cards have synced, see
+        mark_set_synced(): an interrupted or failed card sync leaves them
+        marked as changed, so the next incremental sync refetches them.
+        
+        Returns {set_id: upstream updatedAt} for those sets, or None if the
+        sets could not be synced.
+        """
         logger.info("Syncing sets...")
         session = self.Session()
         
@@ -245,14 +191,24 @@ class PokemonTCGSync:
             
             sets_data = data['data']
             logger.info(f"Found {len(sets_data)} sets")
+            changed = {}
             
             for set_data in sets_data:
                 try:
                     # Check if set exists
                     set_obj = session.query(Set).filter_by(id=set_data['id']).first()
                     
+                    updated_at = set_obj.updated_at if set_obj else None
+                    if set_changed(updated_at, set_data):
+                        changed[set_data['id']] = set_data.get('updatedAt')
+                    else:
+                        updated_at = set_data.get('updatedAt')
+                    
                     if set_obj:
                         logger.debug(f"Updating set: {set_data['name']}")
+                        # Cards store their set's release date as a sort key
+                        if set_obj.release_date != set_data.get('releaseDate'):
+                            update_set_release_date(session, set_obj.id, set_data.get('releaseDate'))
                     else:
                         logger.info(f"Adding new set: {set_data['name']}")
                         set_obj = Set(id=set_data['id'])
@@ -264,7 +220,7 @@ class PokemonTCGSync:
                     set_obj.total = set_data.get('total')
                     set_obj.ptcgo_code = set_data.get('ptcgoCode')
                     set_obj.release_date = set_data.get('releaseDate')
-                    set_obj.updated_at = set_data.get('updatedAt')
+                    set_obj.updated_at = updated_at
                     
                     # Legalities
                     legalities = set_data.get('legalities', {})
@@ -288,16 +244,22 @@ class PokemonTCGSync:
             session.commit()
             logger.info(f"Successfully synced {len(sets_data)} sets")
             
+            self._refresh_set_documents([s['id'] for s in sets_data], rerender_cards)
+            return changed
+            
         except Exception as e:
             logger.error(f"Error syncing sets: {e}")
             session.rollback()
         finally:
             session.close()
     
+    def mark_set_synced(self, session, set_id, updated_at):
+        """Store a changed set's upstream updatedAt once its cards have synced"""
+        session.query(Set).filter_by(id=set_id).update({'updated_at': updated_at})
+        session.commit()
+    
     def sync_cards(self, set_id=None, resume_from=None):
-        """Sync all cards from API"""
-        session = self.Session()
-        
+        """Sync all cards from API (or one set's); True if every page was written and rendered"""
         try:
             # Build query
             query = ''
@@ -307,242 +269,80 @@ class PokemonTCGSync:
             else:
                 logger.info("Syncing all cards...")
             
-            page = 1
-            total_cards = 0
-            processed = 0
+            params = {'pageSize': BATCH_SIZE}
+            if query:
+                params['q'] = query
             
-            while True:
-                params = {
-                    'page': page,
-                    'pageSize': BATCH_SIZE
-                }
-                
-                if query:
-                    params['q'] = query
-                
-                logger.info(f"Fetching page {page}...")
-                data = self.make_request('cards', params)
-                
+            # Page 1 gives the total; the remaining pages are fetched concurrently
+            logger.info("Fetching page 1...")
+            first_page = self.make_request('cards', {**params, 'page': 1})
+            if not first_page or 'data' not in first_page:
+                logger.error("Failed to fetch page 1")
+                return False
+            
+            total_cards = first_page.get('totalCount', 0)
+            total_pages = max(1, math.ceil(total_cards / BATCH_SIZE))
+            logger.info(f"Total cards to sync: {total_cards} ({total_pages} pages)")
+            
+            pages = itertools.chain(
+                [(1, first_page)],
+                fetch_pages('cards', params, range(2, total_pages + 1), transport=self.transport)
+            )
+            changes = CardChanges()
+            seen_ids = set()
+            failed_pages = []
+            render_failed = False
+            
+            # Pages arrive in order; this loop is the only writer
+            for page, data in pages:
                 if not data or 'data' not in data:
                     logger.error(f"Failed to fetch page {page}")
-                    break
-                
-                cards_data = data['data']
-                
-                if page == 1:
-                    total_cards = data.get('totalCount', 0)
-                    logger.info(f"Total cards to sync: {total_cards}")
-                
-                if not cards_data:
-                    logger.info("No more cards to fetch")
-                    break
-                
-                # Process cards
-                for card_data in cards_data:
-                    try:
-                        if resume_from and card_data['id'] <= resume_from:
-                            continue
-                        
-                        self._process_card(session, card_data)
-                        processed += 1
-                        
-                        if processed % 250 == 0:
-                            logger.info(f"Processed {processed}/{total_cards} cards ({(processed/total_cards*100):.1f}%)")
-                            session.commit()
-                        
-                    except Exception as e:
-                        logger.error(f"Error processing card {card_data.get('id')}: {e}")
-                        continue
+                    failed_pages.append(page)
+                    continue
                 
-                session.commit()
+                seen_ids.update(card_data['id'] for card_data in data['data'])
+                cards_data = [
+                    card_data for card_data in data['data']
+                    if not (resume_from and card_data['id'] <= resume_from)
+                ]
                 
-                # Check if we're done
-                if len(cards_data) < BATCH_SIZE:
-                    break
+                # One transaction per page
+                try:
+                    page_changes = self.writer.write(
+                        (card_data, card_data['set']['id'], card_data['set'].get('releaseDate'))
+                        for card_data in cards_data
+                    )
+                except Exception as e:
+                    logger.error(f"Error writing page {page}: {e}")
+                    failed_pages.append(page)
+                    continue
                 
-                page += 1
+                # Unchanged cards keep their documents (and the data generation)
+                changes.add(page_changes)
+                if not self._refresh_card_documents(page_changes.changed_ids()):
+                    render_failed = True
+                if page % 5 == 0 or page == total_pages:
+                    processed = len(changes.written) + len(changes.unchanged)
+                    logger.info(f"Processed {processed}/{total_cards} cards ({(processed/max(total_cards, 1)*100):.1f}%)")
             
-            logger.info(f"Successfully synced {processed} cards")
+            if failed_pages:
+                logger.error(f"{len(failed_pages)} pages could not be synced: {failed_pages}")
+            elif not resume_from:
+                # A complete listing: cards it no longer has were removed upstream
+                deleted = self.writer.delete_missing(seen_ids, [set_id] if set_id else None)
+                changes.add(deleted)
+                if not self._refresh_card_documents(deleted.changed_ids()):
+                    render_failed = True
+            
+            self.card_changes.add(changes)
+            logger.info(f"Synced cards: {changes.summary()}")
+            if render_failed:
+                logger.error("Some card documents could not be rendered; they will be retried")
+            return not failed_pages and not render_failed
             
         except Exception as e:
             logger.error(f"Error syncing cards: {e}")
-            session.rollback()
-        finally:
-            session.close()
-    
-    def _process_card(self, session, card_data):
-        """Process and save a single card"""
-        card_id = card_data['id']
-        
-        # Check if card exists
-        card = session.query(Card).filter_by(id=card_id).first()
-        
-        if card:
-            # Update existing
-            logger.debug(f"Updating card: {card_data['name']}")
-        else:
-            # Create new
-            logger.debug(f"Adding new card: {card_data['name']}")
-            card = Card(id=card_id)
-        
-        # Basic fields
-        card.name = card_data.get('name')
-        card.supertype = card_data.get('supertype')
-        card.hp = card_data.get('hp')
-        card.level = card_data.get('level')
-        card.set_id = card_data['set']['id']
-        card.number = card_data.get('number')
-        
-        # Evolution
-        card.evolves_from = card_data.get('evolvesFrom')
-        if card_data.get('evolvesTo'):
-            card.evolves_to = json.dumps(card_data['evolvesTo'])
-        
-        # Text
-        if card_data.get('rules'):
-            card.rules = json.dumps(card_data['rules'])
-        card.flavor_text = card_data.get('flavorText')
-        
-        # Details
-        card.artist = card_data.get('artist')
-        card.rarity = card_data.get('rarity')
-        card.regulation_mark = card_data.get('regulationMark')
-        
-        # Costs
-        if card_data.get('retreatCost'):
-            card.retreat_cost = json.dumps(card_data['retreatCost'])
-        card.converted_retreat_cost = card_data.get('convertedRetreatCost')
-        
-        # Pokedex
-        if card_data.get('nationalPokedexNumbers'):
-            card.national_pokedex_numbers = json.dumps(card_data['nationalPokedexNumbers'])
-        
-        # Legalities
-        legalities = card_data.get('legalities', {})
-        card.standard_legal = legalities.get('standard') == 'Legal'
-        card.expanded_legal = legalities.get('expanded') == 'Legal'
-        card.unlimited_legal = legalities.get('unlimited') == 'Legal'
-        card.standard_banned = legalities.get('standard') == 'Banned'
-        card.expanded_banned = legalities.get('expanded') == 'Banned'
-        
-        # Images
-        images = card_data.get('images', {})
-        card.image_small = images.get('small')
-        card.image_large = images.get('large')
-        
-        # Pricing
-        if INCLUDE_PRICING:
-            self._process_pricing(card, card_data)
-        
-        card.synced_at = datetime.now(timezone.utc)
-        
-        session.add(card)
-        session.flush()  # Get card ID for relationships
-        
-        # Process types
-        if card_data.get('types'):
-            card.types.clear()
-            for type_name in card_data['types']:
-                type_obj = session.query(Type).filter_by(name=type_name).first()
-                if type_obj:
-                    card.types.append(type_obj)
-        
-        # Process subtypes
-        if card_data.get('subtypes'):
-            card.subtypes.clear()
-            for subtype_name in card_data['subtypes']:
-                subtype_obj = session.query(Subtype).filter_by(name=subtype_name).first()
-                if subtype_obj:
-                    card.subtypes.append(subtype_obj)
-        
-        # Process attacks
-        if card_data.get('attacks'):
-            # Clear existing
-            for attack in card.attacks:
-                session.delete(attack)
-            
-            for attack_data in card_data['attacks']:
-                attack = Attack(
-                    card_id=card_id,
-                    name=attack_data.get('name'),
-                    cost=json.dumps(attack_data.get('cost', [])),
-                    converted_energy_cost=attack_data.get('convertedEnergyCost'),
-                    damage=attack_data.get('damage'),
-                    text=attack_data.get('text')
-                )
-                session.add(attack)
-        
-        # Process abilities
-        if card_data.get('abilities'):
-            # Clear existing
-            for ability in card.abilities:
-                session.delete(ability)
-            
-            for ability_data in card_data['abilities']:
-                ability = Ability(
-                    card_id=card_id,
-                    name=ability_data.get('name'),
-                    text=ability_data.get('text'),
-                    ability_type=ability_data.get('type')
-                )
-                session.add(ability)
-        
-        # Process weaknesses
-        if card_data.get('weaknesses'):
-            # Clear existing
-            for weakness in card.weaknesses:
-                session.delete(weakness)
-            
-            for weakness_data in card_data['weaknesses']:
-                weakness = Weakness(
-                    card_id=card_id,
-                    type=weakness_data.get('type'),
-                    value=weakness_data.get('value')
-                )
-                session.add(weakness)
-        
-        # Process resistances
-        if card_data.get('resistances'):
-            # Clear existing
-            for resistance in card.resistances:
-                session.delete(resistance)
-            
-            for resistance_data in card_data['resistances']:
-                resistance = Resistance(
-                    card_id=card_id,
-                    type=resistance_data.get('type'),
-                    value=resistance_data.get('value')
-                )
-                session.add(resistance)
-    
-    def _process_pricing(self, card, card_data):
-        """Process pricing data"""
-        # TCGPlayer
-        if 'tcgplayer' in card_data:
-            tcg = card_data['tcgplayer']
-            card.tcgplayer_url = tcg.get('url')
-            card.tcgplayer_updated_at = tcg.get('updatedAt')
-            
-            # Get market price from first available variant
-            prices = tcg.get('prices', {})
-            for variant, price_data in prices.items():
-                if 'market' in price_data:
-                    card.market_price = price_data['market']
-                    card.low_price = price_data.get('low')
-                    card.mid_price = price_data.get('mid')
-                    card.high_price = price_data.get('high')
-                    break
-        
-        # Cardmarket
-        if 'cardmarket' in card_data:
-            cm = card_data['cardmarket']
-            card.cardmarket_url = cm.get('url')
-            card.cardmarket_updated_at = cm.get('updatedAt')
-            
-            prices = cm.get('prices', {})
-            card.cardmarket_avg_price = prices.get('averageSellPrice')
-            card.cardmarket_low_price = prices.get('lowPrice')
-            card.cardmarket_trend_price = prices.get('trendPrice')
+            return False
     
     def full_sync(self):
         """Perform full database sync"""
@@ -575,29 +375,39 @@ class PokemonTCGSync:
             except Exception as e:
                 logger.error(f"Reference data sync failed: {e}, continuing anyway...")
             
-            # Sync sets
+            # Sync sets (card documents are rendered by the card sync below)
+            changed = None
             try:
-                self.sync_sets()
+                changed = self.sync_sets(rerender_cards=False)
             except KeyboardInterrupt:
                 raise
             except Exception as e:
                 logger.error(f"Sets sync failed: {e}, continuing anyway...")
             
             # Sync all cards
+            cards_synced = False
             try:
-                self.sync_cards()
+                cards_synced = self.sync_cards()
             except KeyboardInterrupt:
                 raise
             except Exception as e:
                 logger.error(f"Cards sync failed: {e}")
             
+            # Changed sets whose cards may be incomplete keep their old
+            # updatedAt and are retried by the next incremental sync
+            if changed and cards_synced:
+                for set_id, updated_at in changed.items():
+                    self.mark_set_synced(session, set_id, updated_at)
+            
             # Mark as completed
+            sync_status.watermark = current_watermark(session)
             sync_status.status = 'completed'
             sync_status.completed_at = datetime.now(timezone.utc)
             
             duration = (datetime.now(timezone.utc) - start_time).total_seconds()
             logger.info("=" * 60)
             logger.info(f"FULL SYNC COMPLETED in {duration:.2f} seconds")
+            logger.info(f"Cards: {self.card_changes.summary()}")
             logger.info("=" * 60)
             
         except KeyboardInterrupt:
@@ -613,17 +423,92 @@ class PokemonTCGSync:
         finally:
             session.commit()
             session.close()
+    
+    def incremental_sync(self):
+        """Sync sets, then refetch cards only for new sets and sets whose updatedAt changed"""
+        logger.info("=" * 60)
+        logger.info("Starting INCREMENTAL SYNC")
+        logger.info("=" * 60)
+        
+        start_time = datetime.now(timezone.utc)
+        self.init_database()
+        
+        session = self.Session()
+        previous_watermark = last_watermark(session)
+        sync_status = SyncStatus(
+            sync_type='incremental',
+            started_at=start_time,
+            status='running'
+        )
+        session.add(sync_status)
+        session.commit()
+        
+        try:
+            if previous_watermark:
+                logger.info(f"Last synced set change: {previous_watermark}")
+            
+            # Set documents of sets whose cards are not refetched still need
+            # their cards re-rendered, so rerender_cards stays on
+            changed = self.sync_sets()
+            if changed is None:
+                raise RuntimeError("Sets could not be fetched")
+            
+            logger.info(f"{len(changed)} new or changed sets: {sorted(changed)}")
+            sync_status.total_items = len(changed)
+            sync_status.processed_items = 0
+            sync_status.failed_items = 0
+            session.commit()
+            
+            for set_id, updated_at in changed.items():
+                if self.sync_cards(set_id=set_id):
+                    self.mark_set_synced(session, set_id, updated_at)
+                    sync_status.processed_items += 1
+                else:
+                    # The old updatedAt stays, so the next run retries this set
+                    logger.error(f"Cards of set {set_id} did not sync completely; it will be retried")
+                    sync_status.failed_items += 1
+                sync_status.last_processed_id = set_id
+                session.commit()
+            
+            sync_status.watermark = current_watermark(session)
+            sync_status.status = 'completed'
+            sync_status.completed_at = datetime.now(timezone.utc)
+            
+            duration = (datetime.now(timezone.utc) - start_time).total_seconds()
+            logger.info("=" * 60)
+            logger.info(
+                f"INCREMENTAL SYNC COMPLETED in {duration:.2f} seconds: "
+                f"{sync_status.processed_items} sets refetched, {sync_status.failed_items} failed, "
+                f"watermark {sync_status.watermark}"
+            )
+            logger.info(f"Cards: {self.card_changes.summary()}")
+            logger.info("=" * 60)
+            
+        except KeyboardInterrupt:
+            logger.warning("\n" + "=" * 60)
+            logger.warning("SYNC INTERRUPTED BY USER")
+            logger.warning("=" * 60)
+            sync_status.status = 'interrupted'
+            sync_status.error_message = 'User interrupted the sync'
+        except Exception as e:
+            logger.error(f"Incremental sync failed: {e}")
+            sync_status.status = 'failed'
+            sync_status.error_message = str(e)
+        finally:
+            session.commit()
+            session.close()
 
 
 def main():
     parser = argparse.ArgumentParser(description='Pokemon TCG Database Sync')
     parser.add_argument('--full', action='store_true', help='Perform full sync')
-    parser.add_argument('--update', action='store_true', help='Update with new data')
+    parser.add_argument('--update', action='store_true', help='Incremental update: refetch cards of new or changed sets only')
     parser.add_argument('--reference', action='store_true', help='Sync reference data only')
     parser.add_argument('--sets', action='store_true', help='Sync sets only')
     parser.add_argument('--set', type=str, help='Sync specific set by ID')
     parser.add_argument('--resume', type=str, help='Resume from card ID')
     parser.add_argument('--reset', action='store_true', help='Drop and recreate database')
+    parser.add_argument('--documents', action='store_true', help='Re-render all API card/set documents and the search index')
     
     args = parser.parse_args()
     
@@ -634,26 +519,30 @@ def main():
         Base.metadata.drop_all(syncer.engine)
         logger.info("Database reset complete")
     
-    if args.full:
-        syncer.full_sync()
-    elif args.reference:
-        syncer.init_database()
-        syncer.sync_reference_data()
-    elif args.sets:
-        syncer.init_database()
-        syncer.sync_sets()
-    elif args.set:
-        syncer.init_database()
-        syncer.sync_cards(set_id=args.set)
-    elif args.update:
-        syncer.init_database()
-        syncer.sync_sets()
-        syncer.sync_cards()
-    elif args.resume:
-        syncer.init_database()
-        syncer.sync_cards(resume_from=args.resume)
-    else:
-        parser.print_help()
+    try:
+        if args.full:
+            syncer.full_sync()
+        elif args.reference:
+            syncer.init_database()
+            syncer.sync_reference_data()
+        elif args.sets:
+            syncer.init_database()
+            syncer.sync_sets()
+        elif args.set:
+            syncer.init_database()
+            syncer.sync_cards(set_id=args.set)
+        elif args.update:
+            syncer.incremental_sync()
+        elif args.resume:
+            syncer.init_database()
+            syncer.sync_cards(resume_from=args.resume)
+        elif args.documents:
+            syncer.init_database()
+            syncer.rebuild_documents()
+        else:
+            parser.print_help()
+    finally:
+        syncer.close()
 
 
 if __name__ == '__main__':
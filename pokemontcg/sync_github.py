@@ -12,11 +12,16 @@ from pathlib import Path
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-from .config import DATABASE_URL, LOG_LEVEL, LOG_FILE
+from .config import DATABASE_URL, CARD_WRITE_BATCH, LOG_LEVEL, LOG_FILE, SQL_PROFILE, SLOW_QUERY_MS, SLOW_QUERY_LOG
 from .models import (
-    Base, Set, Card, Attack, Ability, Weakness, Resistance,
-    Type, Subtype, Supertype, Rarity, SyncStatus
+    Base, Set, Type, Subtype, Supertype, Rarity, SyncStatus
 )
+from .sort_keys import ensure_sort_key_columns, update_set_release_date
+from .card_writer import CardChanges, CardWriter, ensure_content_hash_column
+from .incremental import ensure_watermark_column
+from .profiling import configure_slow_query_log, install_engine_profiler
+from .search import ensure_search_index
+from .document_sync import DocumentRefresh
 
 # Setup logging
 logging.basicConfig(
@@ -34,7 +39,7 @@ GITHUB_REPO = "https://github.com/PokemonTCG/pokemon-tcg-data.git"
 DATA_DIR = "pokemon-tcg-data"
 
 
-class GitHubTCGSync:
+class GitHubTCGSync(DocumentRefresh):
     """Sync Pokemon TCG data from GitHub repository"""
     
     def __init__(self, database_url=None):
@@ -44,13 +49,22 @@ class GitHubTCGSync:
         if 'sqlite' in self.database_url:
             connect_args = {'check_same_thread': False}
         self.engine = create_engine(self.database_url, echo=False, connect_args=connect_args)
+        if SQL_PROFILE:
+            configure_slow_query_log(SLOW_QUERY_LOG)
+            install_engine_profiler(self.engine, SLOW_QUERY_MS)
         self.Session = sessionmaker(bind=self.engine, autocommit=False, autoflush=False)
         self.data_dir = Path(DATA_DIR)
+        self.writer = CardWriter(self.engine)
         
     def init_database(self):
         """Create all database tables"""
         logger.info("Creating database tables...")
         Base.metadata.create_all(self.engine)
+        ensure_sort_key_columns(self.engine)
+        ensure_watermark_column(self.engine)
+        ensure_content_hash_column(self.engine)
+        if ensure_search_index(self.engine):
+            self._refresh_card_search(self._all_card_ids())
         logger.info("Database tables created successfully")
     
     def clone_or_update_repo(self):
@@ -171,6 +185,7 @@ class GitHubTCGSync:
             
             session.commit()
             logger.info("Reference data synced successfully")
+            self._bump_generation()
             
         except Exception as e:
             logger.error(f"Error syncing reference data: {e}")
@@ -179,7 +194,11 @@ class GitHubTCGSync:
             session.close()
     
     def sync_sets(self):
-        """Sync all sets from JSON files"""
+        """Sync all sets from JSON files
+        
+        Card documents embed their set, so cards of sets whose rendering changed
+        are re-rendered too (the card sync skips them: their JSON is unchanged).
+        """
         logger.info("Syncing sets from GitHub data...")
         session = self.Session()
         
@@ -206,6 +225,9 @@ class GitHubTCGSync:
                     
                     if set_obj:
                         logger.debug(f"Updating set: {set_data['name']}")
+                        # Cards store their set's release date as a sort key
+                        if set_obj.release_date != set_data.get('releaseDate'):
+                            update_set_release_date(session, set_obj.id, set_data.get('releaseDate'))
                     else:
                         logger.info(f"Adding new set: {set_data['name']}")
                         set_obj = Set(id=set_data['id'])
@@ -241,6 +263,8 @@ class GitHubTCGSync:
             session.commit()
             logger.info(f"Successfully synced {len(sets_data)} sets")
             
+            self._refresh_set_documents([s['id'] for s in sets_data])
+            
         except Exception as e:
             logger.error(f"Error syncing sets: {e}")
             session.rollback()
@@ -258,8 +282,11 @@ class GitHubTCGSync:
                 logger.error(f"Cards directory not found: {cards_dir}")
                 return
             
+            # Cards store their set's release date as a sort key
+            release_dates = dict(session.query(Set.id, Set.release_date).all())
+            
             total_cards = 0
-            processed = 0
+            changes = CardChanges()
             
             # Process each JSON file in the directory
             for set_file in sorted(cards_dir.glob("*.json")):
@@ -269,195 +296,36 @@ class GitHubTCGSync:
                     
                     # Extract set_id from filename (e.g., "base1.json" -> "base1")
                     set_id = set_file.stem
+                    release_date = release_dates.get(set_id)
                     
                     total_cards += len(cards_data)
                     logger.info(f"Processing {set_file.name}: {len(cards_data)} cards (set_id: {set_id})")
                     
-                    for card_data in cards_data:
-                        try:
-                            self._process_card(session, card_data, set_id)
-                            processed += 1
-                            
-                            if processed % 100 == 0:
-                                logger.info(f"Processed {processed} cards...")
-                                session.commit()
-                        
-                        except Exception as e:
-                            logger.error(f"Error processing card {card_data.get('id')}: {e}")
-                            continue
+                    # One transaction per batch of cards; unchanged cards are skipped
+                    for start in range(0, len(cards_data), CARD_WRITE_BATCH):
+                        batch = cards_data[start:start + CARD_WRITE_BATCH]
+                        batch_changes = self.writer.write((card_data, set_id, release_date) for card_data in batch)
+                        changes.add(batch_changes)
+                        self._refresh_card_documents(batch_changes.changed_ids())
+                    
+                    # The file lists the whole set: cards missing from it were removed
+                    deleted = self.writer.delete_missing([card_data['id'] for card_data in cards_data], [set_id])
+                    changes.add(deleted)
+                    self._refresh_card_documents(deleted.changed_ids())
                     
-                    session.commit()
                     logger.info(f"Completed {set_file.name}")
                 
                 except Exception as e:
-                    logger.error(f"Error reading set file {set_file}: {e}")
+                    logger.error(f"Error syncing set file {set_file}: {e}")
                     continue
             
-            logger.info(f"Successfully synced {processed}/{total_cards} cards")
+            logger.info(f"Synced {total_cards} cards: {changes.summary()}")
             
         except Exception as e:
             logger.error(f"Error syncing cards: {e}")
-            session.rollback()
         finally:
             session.close()
     
-    def _process_card(self, session, card_data, set_id):
-        """Process and save a single card"""
-        card_id = card_data['id']
-        
-        # Check if card exists
-        card = session.query(Card).filter_by(id=card_id).first()
-        
-        if not card:
-            card = Card(id=card_id)
-        
-        # Basic fields
-        card.name = card_data.get('name')
-        card.supertype = card_data.get('supertype')
-        card.hp = card_data.get('hp')
-        card.level = card_data.get('level')
-        card.set_id = set_id  # Use the set_id passed from the filename
-        card.number = card_data.get('number')
-        
-        # Evolution
-        card.evolves_from = card_data.get('evolvesFrom')
-        if card_data.get('evolvesTo'):
-            card.evolves_to = json.dumps(card_data['evolvesTo'])
-        
-        # Text
-        if card_data.get('rules'):
-            card.rules = json.dumps(card_data['rules'])
-        card.flavor_text = card_data.get('flavorText')
-        
-        # Details
-        card.artist = card_data.get('artist')
-        card.rarity = card_data.get('rarity')
-        card.regulation_mark = card_data.get('regulationMark')
-        
-        # Costs
-        if card_data.get('retreatCost'):
-            card.retreat_cost = json.dumps(card_data['retreatCost'])
-        card.converted_retreat_cost = card_data.get('convertedRetreatCost')
-        
-        # Pokedex
-        if card_data.get('nationalPokedexNumbers'):
-            card.national_pokedex_numbers = json.dumps(card_data['nationalPokedexNumbers'])
-        
-        # Legalities
-        legalities = card_data.get('legalities', {})
-        card.standard_legal = legalities.get('standard') == 'Legal'
-        card.expanded_legal = legalities.get('expanded') == 'Legal'
-        card.unlimited_legal = legalities.get('unlimited') == 'Legal'
-        card.standard_banned = legalities.get('standard') == 'Banned'
-        card.expanded_banned = legalities.get('expanded') == 'Banned'
-        
-        # Images
-        images = card_data.get('images', {})
-        card.image_small = images.get('small')
-        card.image_large = images.get('large')
-        
-        # Pricing (if available)
-        if 'tcgplayer' in card_data:
-            tcg = card_data['tcgplayer']
-            card.tcgplayer_url = tcg.get('url')
-            card.tcgplayer_updated_at = tcg.get('updatedAt')
-            
-            prices = tcg.get('prices', {})
-            for variant, price_data in prices.items():
-                if 'market' in price_data:
-                    card.market_price = price_data['market']
-                    card.low_price = price_data.get('low')
-                    card.mid_price = price_data.get('mid')
-                    card.high_price = price_data.get('high')
-                    break
-        
-        if 'cardmarket' in card_data:
-            cm = card_data['cardmarket']
-            card.cardmarket_url = cm.get('url')
-            card.cardmarket_updated_at = cm.get('updatedAt')
-            
-            prices = cm.get('prices', {})
-            card.cardmarket_avg_price = prices.get('averageSellPrice')
-            card.cardmarket_low_price = prices.get('lowPrice')
-            card.cardmarket_trend_price = prices.get('trendPrice')
-        
-        card.synced_at = datetime.now(timezone.utc)
-        
-        session.add(card)
-        session.flush()
-        
-        # Process types
-        if card_data.get('types'):
-            card.types.clear()
-            for type_name in card_data['types']:
-                type_obj = session.query(Type).filter_by(name=type_name).first()
-                if type_obj:
-                    card.types.append(type_obj)
-        
-        # Process subtypes
-        if card_data.get('subtypes'):
-            card.subtypes.clear()
-            for subtype_name in card_data['subtypes']:
-                subtype_obj = session.query(Subtype).filter_by(name=subtype_name).first()
-                if subtype_obj:
-                    card.subtypes.append(subtype_obj)
-        
-        # Process attacks
-        if card_data.get('attacks'):
-            for attack in card.attacks:
-                session.delete(attack)
-            
-            for attack_data in card_data['attacks']:
-                attack = Attack(
-                    card_id=card_id,
-                    name=attack_data.get('name'),
-                    cost=json.dumps(attack_data.get('cost', [])),
-                    converted_energy_cost=attack_data.get('convertedEnergyCost'),
-                    damage=attack_data.get('damage'),
-                    text=attack_data.get('text')
-                )
-                session.add(attack)
-        
-        # Process abilities
-        if card_data.get('abilities'):
-            for ability in card.abilities:
-                session.delete(ability)
-            
-            for ability_data in card_data['abilities']:
-                ability = Ability(
-                    card_id=card_id,
-                    name=ability_data.get('name'),
-                    text=ability_data.get('text'),
-                    ability_type=ability_data.get('type')
-                )
-                session.add(ability)
-        
-        # Process weaknesses
-        if card_data.get('weaknesses'):
-            for weakness in card.weaknesses:
-                session.delete(weakness)
-            
-            for weakness_data in card_data['weaknesses']:
-                weakness = Weakness(
-                    card_id=card_id,
-                    type=weakness_data.get('type'),
-                    value=weakness_data.get('value')
-                )
-                session.add(weakness)
-        
-        # Process resistances
-        if card_data.get('resistances'):
-            for resistance in card.resistances:
-                session.delete(resistance)
-            
-            for resistance_data in card_data['resistances']:
-                resistance = Resistance(
-                    card_id=card_id,
-                    type=resistance_data.get('type'),
-                    value=resistance_data.get('value')
-                )
-                session.add(resistance)
-    
     def full_sync(self):
         """Perform full sync from GitHub repository"""
         logger.info("=" * 60)
@@ -487,7 +355,8 @@ class GitHubTCGSync:
             # Sync reference data
             self.sync_reference_data()
             
-            # Sync sets
+            # Sync sets; card JSON here carries no set block, so the content
+            # hash cannot see set changes and changed sets re-render their cards
             self.sync_sets()
             
             # Sync cards
@@ -524,6 +393,7 @@ def main():
     parser.add_argument('--sets', action='store_true', help='Sync sets only')
     parser.add_argument('--cards', action='store_true', help='Sync cards only')
     parser.add_argument('--reference', action='store_true', help='Sync reference data only')
+    parser.add_argument('--documents', action='store_true', help='Re-render all API card/set documents and the search index')
     
     args = parser.parse_args()
     
@@ -549,6 +419,9 @@ def main():
         syncer.init_database()
         if syncer.clone_or_update_repo():
             syncer.sync_reference_data()
+    elif args.documents:
+        syncer.init_database()
+        syncer.rebuild_documents()
     else:
         parser.print_help()
 
@@ -4,9 +4,12 @@ Proxies requests to TCGCSV.com to avoid CORS issues in the browser
 """
 from fastapi import APIRouter, HTTPException
 import httpx
+import time
 from datetime import datetime, timedelta
 from typing import Dict, Tuple, Any, Optional
 
+from .metrics import tcgcsv_request_seconds, tcgplayer_cache_lookups
+
 # Create router for TCGplayer endpoints
 router = APIRouter(prefix="/api/tcgplayer", tags=["tcgplayer"])
 
@@ -17,12 +20,17 @@ CACHE_DURATION = timedelta(hours=24)
 def is_cache_valid(cache_key: str) -> bool:
     """Check if cached data is still valid"""
     if cache_key not in tcgplayer_cache:
+        tcgplayer_cache_lookups.inc(result="miss")
         return False
     _, timestamp = tcgplayer_cache[cache_key]
-    return datetime.now() - timestamp < CACHE_DURATION
+    valid = datetime.now() - timestamp < CACHE_DURATION
+    tcgplayer_cache_lookups.inc(result="hit" if valid else "expired")
+    return valid
 
 async def fetch_from_tcgcsv(url: str) -> dict:
     """Fetch data from TCGCSV with proper headers"""
+    started = time.perf_counter()
+    outcome = "error"
     async with httpx.AsyncClient() as client:
         try:
             response = await client.get(
@@ -30,6 +38,7 @@ async def fetch_from_tcgcsv(url: str) -> dict:
                 headers={'User-Agent': 'ColleqtiveTCG/1.0'},
                 timeout=30.0
             )
+            outcome = str(response.status_code)
             response.raise_for_status()
             return response.json()
         except httpx.HTTPStatusError as e:
@@ -39,6 +48,8 @@ async def fetch_from_tcgcsv(url: str) -> dict:
         except Exception as e:
             print(f"❌ Error fetching from TCGCSV: {str(e)}")
             raise
+        finally:
+            tcgcsv_request_seconds.observe(time.perf_counter() - started, outcome=outcome)
 
 @router.get("/groups")
 async def get_tcgplayer_groups():
@@ -5,7 +5,6 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import subprocess
 import json
 import time
 import logging
@@ -14,14 +13,18 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from core.config import (
-    API_KEY, BASE_URL, DATABASE_URL,
-    RATE_LIMIT_DELAY, MAX_RETRIES, RETRY_DELAY,
+    DATABASE_URL,
     INCLUDE_PRICING, LOG_LEVEL, LOG_FILE
 )
 from core.models import (
     Base, Set, Card, Attack, Ability, Weakness, Resistance,
     Type, Subtype, Supertype, Rarity, SyncStatus
 )
+from core.http_client import APIClient
+from core.sort_keys import apply_sort_keys, ensure_sort_key_columns
+from core.card_writer import CardWriter, ensure_content_hash_column
+from core.document_sync import DocumentRefresh
+from core.search import ensure_search_index
 
 # Setup logging
 logging.basicConfig(
@@ -35,14 +38,15 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class ImprovedPokemonTCGSync:
+class ImprovedPokemonTCGSync(DocumentRefresh):
     """Improved Pokemon TCG API sync with better error handling"""
     
-    def __init__(self, database_url=None):
+    def __init__(self, database_url=None, transport=None):
         self.database_url = database_url or DATABASE_URL
         self.engine = create_engine(self.database_url, echo=False)
         self.Session = sessionmaker(bind=self.engine)
-        self.headers = {'X-Api-Key': API_KEY}
+        self.client = APIClient(transport=transport)
+        self.writer = CardWriter(self.engine, include_pricing=INCLUDE_PRICING)
         # Use smaller batch size for better reliability
         self.batch_size = 25
         
@@ -50,118 +54,15 @@ class ImprovedPokemonTCGSync:
         """Create all database tables"""
         logger.info("Creating database tables...")
         Base.metadata.create_all(self.engine)
+        ensure_sort_key_columns(self.engine)
+        ensure_content_hash_column(self.engine)
+        if ensure_search_index(self.engine):
+            self._refresh_card_search(self._all_card_ids())
         logger.info("Database tables created successfully")
         
-    def make_request_powershell(self, endpoint, params=None, timeout=30):
-        """Make API request using PowerShell with improved error handling"""
-        url = f"{BASE_URL}/{endpoint}"
-        
-        # Add query parameters
-        if params:
-            query_parts = []
-            for key, value in params.items():
-                query_parts.append(f"{key}={value}")
-            if query_parts:
-                url += "?" + "&".join(query_parts)
-        
-        for attempt in range(MAX_RETRIES):
-            try:
-                # Build PowerShell command
-                ps_cmd = f"$response = Invoke-WebRequest -Uri '{url}'"
-                
-                # Add headers
-                for key, value in self.headers.items():
-                    ps_cmd += f" -Headers @{{'{key}'='{value}'}}"
-                
-                ps_cmd += f" -TimeoutSec {timeout}"
-                ps_cmd += "; $response.Content"
-                
-                logger.debug(f"Attempting request to: {url} (attempt {attempt + 1}/{MAX_RETRIES})")
-                
-                # Execute PowerShell command
-                start_time = time.time()
-                result = subprocess.run(
-                    ['powershell', '-Command', ps_cmd],
-                    capture_output=True,
-                    text=True,
-                    timeout=timeout + 10  # Slightly longer than PowerShell timeout
-                )
-                elapsed = time.time() - start_time
-                
-                if result.returncode == 0:
-                    # Check if we got actual content
-                    if len(result.stdout.strip()) == 0:
-                        logger.warning(f"Empty response from API (took {elapsed:.2f}s)")
-                        if attempt < MAX_RETRIES - 1:
-                            wait_time = RETRY_DELAY * (2 ** attempt)
-                            logger.info(f"Retrying in {wait_time}s...")
-                            time.sleep(wait_time)
-                            continue
-                        else:
-                            return None
-                    
-                    # Parse JSON response
-                    try:
-                        data = json.loads(result.stdout)
-                        logger.debug(f"Successful request (took {elapsed:.2f}s)")
-                        if RATE_LIMIT_DELAY > 0:
-                            time.sleep(RATE_LIMIT_DELAY)
-                        return data
-                    except json.JSONDecodeError as e:
-                        logger.error(f"JSON parse error: {e}")
-                        logger.debug(f"Response (first 500 chars): {result.stdout[:500]}")
-                        if attempt < MAX_RETRIES - 1:
-                            wait_time = RETRY_DELAY * (2 ** attempt)
-                            logger.info(f"Retrying in {wait_time}s...")
-                            time.sleep(wait_time)
-                        else:
-                            return None
-                else:
-                    # Check if it's a rate limit or timeout error
-                    stderr_lower = result.stderr.lower()
-                    if '429' in stderr_lower or 'rate limit' in stderr_lower:
-                        wait_time = RETRY_DELAY * (3 ** attempt)  # More aggressive backoff for rate limits
-                        logger.warning(f"Rate limited by API! Waiting {wait_time}s...")
-                        time.sleep(wait_time)
-                    elif 'timeout' in stderr_lower or 'timed out' in stderr_lower:
-                        logger.warning(f"Request timeout (attempt {attempt + 1}/{MAX_RETRIES})")
-                        if attempt < MAX_RETRIES - 1:
-                            wait_time = RETRY_DELAY * (2 ** attempt)
-                            logger.info(f"Retrying in {wait_time}s...")
-                            time.sleep(wait_time)
-                        else:
-                            logger.error(f"Failed after {MAX_RETRIES} timeout attempts")
-                            return None
-                    else:
-                        logger.error(f"PowerShell error: {result.stderr}")
-                        if attempt < MAX_RETRIES - 1:
-                            wait_time = RETRY_DELAY * (2 ** attempt)
-                            logger.info(f"Retrying in {wait_time}s...")
-                            time.sleep(wait_time)
-                        else:
-                            return None
-                    
-            except subprocess.TimeoutExpired:
-                logger.warning(f"Process timeout on attempt {attempt + 1}/{MAX_RETRIES}")
-                if attempt < MAX_RETRIES - 1:
-                    wait_time = RETRY_DELAY * (2 ** attempt)
-                    logger.info(f"Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                else:
-                    logger.error(f"Failed after {MAX_RETRIES} timeout attempts")
-                    return None
-                    
-            except Exception as e:
-                logger.warning(f"Request error on attempt {attempt + 1}/{MAX_RETRIES}: {e}")
-                if attempt < MAX_RETRIES - 1:
-                    wait_time = RETRY_DELAY * (2 ** attempt)
-                    logger.info(f"Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                else:
-                    logger.error(f"Failed after {MAX_RETRIES} attempts")
-                    return None
-        
-        return None
+    def make_request(self, endpoint, params=None, timeout=30):
+        """GET an API endpoint over the pooled client; None if every attempt failed"""
+        return self.client.get_json(endpoint, params, timeout=timeout)
     
     def sync_cards_for_set(self, set_id):
         """Sync cards for a specific set with improved pagination"""
@@ -181,7 +82,7 @@ class ImprovedPokemonTCGSync:
                 }
                 
                 logger.info(f"Fetching page {page} (batch size: {self.batch_size})...")
-                data = self.make_request_powershell('cards', params, timeout=45)
+                data = self.make_request('cards', params, timeout=45)
                 
                 if not data or 'data' not in data:
                     logger.error(f"Failed to fetch page {page} for set {set_id}")
@@ -198,9 +99,11 @@ class ImprovedPokemonTCGSync:
                     break
                 
                 # Process cards
+                written = []
                 for card_data in cards_data:
                     try:
                         self._process_card(session, card_data)
+                        written.append(card_data['id'])
                         processed += 1
                         
                         if processed % 25 == 0:
@@ -213,6 +116,12 @@ class ImprovedPokemonTCGSync:
                 
                 session.commit()
                 
+                # The API serves cards from their pre-rendered documents; the
+                # simplified write leaves the stored hashes behind, so the next
+                # full sync rewrites these cards instead of skipping them
+                self._clear_content_hashes(card_ids=written)
+                self._refresh_card_documents(written)
+                
                 # Check if we're done
                 if len(cards_data) < self.batch_size:
                     logger.info(f"Reached end of set {set_id} (page {page})")
@@ -291,6 +200,9 @@ class ImprovedPokemonTCGSync:
         card.image_small = images.get('small')
         card.image_large = images.get('large')
         
+        # Stored sort keys
+        apply_sort_keys(card, card_data['set'].get('releaseDate'))
+        
         card.synced_at = datetime.now(timezone.utc)
         
         session.add(card)
@@ -323,8 +235,11 @@ if __name__ == '__main__':
     
     syncer = ImprovedPokemonTCGSync()
     
-    if args.set:
-        syncer.init_database()
-        syncer.sync_cards_for_set(args.set)
-    else:
-        parser.print_help()
\ No newline at end of file
+    try:
+        if args.set:
+            syncer.init_database()
+            syncer.sync_cards_for_set(args.set)
+        else:
+            parser.print_help()
+    finally:
+        syncer.client.close()
@@ -12,6 +12,8 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
 from pokemontcg.tcgplayer_proxy import get_tcgplayer_products, get_tcgplayer_prices
+from pokemontcg.documents import refresh_set_card_documents
+from pokemontcg.generation import bump_generation
 
 
 async def populate_variants_for_set(db_path: str, set_id: str, group_id: int, set_name: str):
@@ -162,6 +164,11 @@ async def populate_variants_for_set(db_path: str, set_id: str, group_id: int, se
         conn.commit()
         print(f"  ✅ Added {variants_added} variants for {cards_with_variants} cards")
         
+        # Variants are embedded in the pre-rendered card documents served by the API
+        refreshed = refresh_set_card_documents(conn, [set_id])
+        print(f"  📝 Re-rendered {refreshed} card documents")
+        bump_generation(conn)
+        
     except Exception as e:
         print(f"  ❌ Error processing set {set_id}: {e}")
         import traceback
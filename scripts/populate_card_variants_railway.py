@@ -12,6 +12,8 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
 from pokemontcg.tcgplayer_proxy import get_tcgplayer_products, get_tcgplayer_prices
+from pokemontcg.documents import refresh_set_card_documents
+from pokemontcg.generation import bump_generation
 
 # Check for psycopg2
 try:
@@ -145,6 +147,11 @@ async def populate_variants_for_set_pg(db_url: str, set_id: str, group_id: int,
             
             conn.commit()
             print(f"  ✅ Added {len(variants_to_insert)} variants for {cards_with_variants} cards")
+            
+            # Variants are embedded in the pre-rendered card documents served by the API
+            refreshed = refresh_set_card_documents(conn, [set_id], '%s')
+            print(f"  📝 Re-rendered {refreshed} card documents")
+            bump_generation(conn, '%s')
         else:
             print(f"  ⚠️ No variants to add")
         
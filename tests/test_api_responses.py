@@ -0,0 +1,289 @@
+"""
+API responses through the full middleware stack, with FastAPI's TestClient
+against a small catalog database: the response cache with ETag / 304,
+invalidation when a sync bumps the data generation, compression negotiation,
+batch lookups, NDJSON export and sparse fieldsets
+"""
+import gzip
+import json
+import sqlite3
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+import pokemontcg.api as api
+from pokemontcg.cache import GenerationCache
+from pokemontcg.card_writer import CardWriter
+from pokemontcg.db import ConnectionPool, QueryRunner
+from pokemontcg.documents import refresh_card_documents, refresh_set_documents
+from pokemontcg.generation import bump_generation
+from pokemontcg.models import Base, Rarity, Set, Subtype, Supertype, Type
+from pokemontcg.search import ensure_search_index, refresh_card_search
+
+SETS = [
+    {"id": "base1", "name": "Base", "series": "Base", "total": 4, "release_date": "1999/01/09"},
+    {"id": "jungle", "name": "Jungle", "series": "Base", "total": 3, "release_date": "1999/06/16"},
+]
+
+
+def make_card(card_id, name, types, hp="60"):
+    set_id, number = card_id.split("-")
+    return {
+        "id": card_id,
+        "name": name,
+        "supertype": "Pokémon",
+        "subtypes": ["Basic"],
+        "hp": hp,
+        "types": types,
+        "number": number,
+        "rarity": "Common",
+        "attacks": [{"name": "Tackle", "cost": ["Colorless"], "convertedEnergyCost": 1, "damage": "10", "text": ""}],
+        "legalities": {"unlimited": "Legal"},
+        "images": {"small": f"https://images.test/{card_id}.png"},
+        "set": {"id": set_id},
+    }
+
+
+CARDS = [
+    make_card("base1-1", "Alakazam", ["Psychic"], hp="80"),
+    make_card("base1-2", "Blastoise", ["Water"], hp="100"),
+    make_card("base1-3", "Charmander", ["Fire"], hp="50"),
+    make_card("base1-4", "Charizard", ["Fire"], hp="120"),
+    make_card("jungle-1", "Clefable", ["Colorless"], hp="70"),
+    make_card("jungle-2", "Electrode", ["Lightning"], hp="90"),
+    make_card("jungle-3", "Flareon", ["Fire"], hp="70"),
+]
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "catalog.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    ensure_search_index(engine)
+    with engine.begin() as conn:
+        conn.execute(Type.__table__.insert(), [{"name": name} for name in ("Colorless", "Fire", "Lightning", "Psychic", "Water")])
+        conn.execute(Subtype.__table__.insert(), [{"name": "Basic"}])
+        conn.execute(Supertype.__table__.insert(), [{"name": "Pokémon"}])
+        conn.execute(Rarity.__table__.insert(), [{"name": "Common"}])
+        conn.execute(Set.__table__.insert(), SETS)
+
+    release_dates = {set_row["id"]: set_row["release_date"] for set_row in SETS}
+    CardWriter(engine, include_pricing=False).write(
+        (card, card["set"]["id"], release_dates[card["set"]["id"]]) for card in CARDS
+    )
+
+    conn = engine.raw_connection()
+    try:
+        card_ids = [card["id"] for card in CARDS]
+        refresh_set_documents(conn)
+        refresh_card_documents(conn, card_ids)
+        refresh_card_search(conn, card_ids)
+        bump_generation(conn)
+    finally:
+        conn.close()
+    engine.dispose()
+    return path
+
+
+@pytest.fixture
+def client(database, monkeypatch):
+    pool = ConnectionPool(database, size=2)
+    monkeypatch.setattr(api, "db_pool", pool)
+    monkeypatch.setattr(api, "db_runner", QueryRunner(pool, max_workers=2))
+    # Every request sees a sync's generation bump straight away
+    monkeypatch.setattr(api, "GENERATION_CHECK_INTERVAL", 0)
+    monkeypatch.setattr(api, "count_cache", GenerationCache(max_entries=64))
+    monkeypatch.setattr(api, "facet_cache", GenerationCache(max_entries=64))
+    monkeypatch.setattr(api, "response_cache", GenerationCache(max_bytes=1024 * 1024))
+    monkeypatch.setitem(api._reference, "catalog", None)
+    # httpx asks for gzip and brotli by default; tests opt in to compression
+    with TestClient(api.app, headers={"Accept-Encoding": "identity"}) as client:
+        yield client
+
+
+def sync(database, *statements):
+    """Commit statements to the database and bump the generation, as a sync does"""
+    conn = sqlite3.connect(database)
+    try:
+        for sql, params in statements:
+            conn.execute(sql, params)
+        conn.commit()
+        bump_generation(conn)
+    finally:
+        conn.close()
+
+
+def test_repeat_requests_are_served_from_the_response_cache(client):
+    first = client.get("/cards", params={"pageSize": 3})
+    assert first.status_code == 200
+    assert first.headers["cache-control"].startswith("public")
+    assert api.response_cache.misses == 1
+
+    second = client.get("/cards", params={"pageSize": 3})
+    assert second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+    assert api.response_cache.hits == 1
+
+
+def test_matching_etag_gets_304(client):
+    etag = client.get("/cards/base1-4").headers["etag"]
+
+    not_modified = client.get("/cards/base1-4", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+
+    assert client.get("/cards/base1-4", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_a_sync_invalidates_cached_responses(client, database):
+    before = client.get("/cards", params={"pageSize": 1})
+    assert before.json()["totalCount"] == 7
+
+    sync(database, ("DELETE FROM cards WHERE id = ?", ("jungle-3",)))
+
+    after = client.get("/cards", params={"pageSize": 1}, headers={"If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.headers["etag"] != before.headers["etag"]
+    assert after.json()["totalCount"] == 6
+
+
+def test_count_cache_is_dropped_by_a_generation_bump(client, database):
+    assert client.get("/cards", params={"type": "Fire"}).json()["totalCount"] == 3
+    # count=none only answers from the cache
+    assert client.get("/cards", params={"type": "Fire", "count": "none"}).json()["totalCount"] == 3
+
+    sync(database, ("DELETE FROM card_types WHERE card_id = ?", ("jungle-3",)))
+
+    assert client.get("/cards", params={"type": "Fire", "count": "none"}).json()["totalCount"] is None
+    assert client.get("/cards", params={"type": "Fire", "count": "exact"}).json()["totalCount"] == 2
+
+
+def test_reference_catalog_is_reloaded_after_a_sync(client, database):
+    assert "Dragon" not in client.get("/types").json()["data"]
+
+    sync(database, ("INSERT INTO types (name) VALUES (?)", ("Dragon",)))
+
+    assert "Dragon" in client.get("/types").json()["data"]
+
+
+def test_gzip_is_negotiated(client):
+    identity = client.get("/cards", params={"pageSize": 7})
+    assert "content-encoding" not in identity.headers
+    assert "Accept-Encoding" in identity.headers["vary"]
+
+    compressed = client.get("/cards", params={"pageSize": 7}, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["vary"]
+    # Each encoding is its own representation
+    assert compressed.headers["etag"] != identity.headers["etag"]
+    assert compressed.json() == identity.json()
+
+
+def test_gzip_is_not_used_when_refused(client):
+    response = client.get("/cards", params={"pageSize": 7}, headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in response.headers
+
+
+def test_gzip_body_is_cached_compressed(client):
+    client.get("/cards", params={"pageSize": 7}, headers={"Accept-Encoding": "gzip"})
+    key = api.request_cache_key("/cards", [("pageSize", "7")])
+    body, _, content_encoding = api.response_cache.get(f"{key}#gzip")
+    assert content_encoding == "gzip"
+    assert len(json.loads(gzip.decompress(body))["data"]) == 7
+
+
+def test_small_bodies_are_not_compressed(client):
+    response = client.get("/sets/base1", headers={"Accept-Encoding": "gzip"})
+    assert len(response.content) < api.COMPRESS_MIN_SIZE
+    assert "content-encoding" not in response.headers
+
+
+def test_batch_returns_cards_in_request_order(client):
+    response = client.post("/cards/batch", json={"ids": ["jungle-2", "base1-1", "nope-1", "jungle-2"]})
+
+    body = response.json()
+    assert [card["id"] for card in body["data"]] == ["jungle-2", "base1-1"]
+    assert body["count"] == 2
+    assert body["missing"] == ["nope-1"]
+    assert body["data"][0]["set"]["name"] == "Jungle"
+
+
+def test_batch_rejects_an_empty_request(client):
+    assert client.post("/cards/batch", json={"ids": []}).status_code == 422
+
+
+def test_export_streams_every_card_as_ndjson(client):
+    response = client.get("/cards/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [card["id"] for card in lines] == sorted(card["id"] for card in CARDS)
+    assert lines[0]["attacks"][0]["name"] == "Tackle"
+
+
+def test_export_filters_and_fieldsets(client):
+    response = client.get("/cards/export", params={"set_id": "jungle", "fields": "id,name"})
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [
+        {"id": "jungle-1", "name": "Clefable"},
+        {"id": "jungle-2", "name": "Electrode"},
+        {"id": "jungle-3", "name": "Flareon"},
+    ]
+
+
+def test_export_is_refused_when_every_stream_is_taken(client, monkeypatch):
+    monkeypatch.setattr(api, "export_slots", threading.BoundedSemaphore(1))
+    api.export_slots.acquire()
+
+    response = client.get("/cards/export")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(api.EXPORT_RETRY_AFTER)
+
+    api.export_slots.release()
+    assert client.get("/cards/export").status_code == 200
+    # The finished stream gave its slot back
+    assert api.export_slots.acquire(blocking=False)
+
+
+def test_fields_limit_the_card_keys(client):
+    cards = client.get("/cards", params={"fields": "id,name,hp", "sort": "name-asc", "pageSize": 2}).json()["data"]
+    assert cards == [{"id": "base1-1", "name": "Alakazam", "hp": "80"}, {"id": "base1-2", "name": "Blastoise", "hp": "100"}]
+
+
+def test_include_adds_relations_to_the_fieldset(client):
+    card = client.get("/cards/base1-4", params={"fields": "id", "include": "types,set"}).json()["data"]
+    assert card["id"] == "base1-4"
+    assert card["types"] == ["Fire"]
+    assert card["set"]["name"] == "Base"
+    assert "attacks" not in card
+
+
+def test_unknown_field_is_rejected(client):
+    assert client.get("/cards", params={"fields": "id,secret"}).status_code == 400
+
+
+def test_card_sets_follow_a_set_rename(client, database):
+    """Rendered sets come from the request's catalog snapshot, never an older one"""
+    def set_names():
+        return {
+            "cards": client.get("/cards", params={"set_id": "base1", "fields": "id,set", "pageSize": 1}).json()["data"][0]["set"]["name"],
+            "card": client.get("/cards/base1-4", params={"fields": "id,set"}).json()["data"]["set"]["name"],
+            "batch": client.post("/cards/batch", params={"fields": "id,set"}, json={"ids": ["base1-4"]}).json()["data"][0]["set"]["name"],
+            "export": json.loads(client.get("/cards/export", params={"set_id": "base1", "fields": "id,set"}).text.splitlines()[0])["set"]["name"],
+            "facets": {bucket["value"]: bucket["name"] for bucket in client.get("/cards/facets").json()["data"]["set"]}["base1"],
+            "sets": client.get("/sets/base1").json()["data"]["name"],
+        }
+
+    assert set(set_names().values()) == {"Base"}
+
+    sync(database, ("UPDATE sets SET name = ? WHERE id = ?", ("Base Set", "base1")))
+    with sqlite3.connect(database) as conn:
+        refresh_set_documents(conn, ["base1"])
+
+    assert set_names() == dict.fromkeys(["cards", "card", "batch", "export", "facets", "sets"], "Base Set")
@@ -0,0 +1,249 @@
+"""
+Bulk card writer: card upserts, child row replacement, removal of cards no
+longer listed upstream and skipping cards whose content hash is unchanged,
+on a throwaway SQLite database
+"""
+import copy
+import json
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from pokemontcg.card_writer import CardWriter, content_hash
+from pokemontcg.models import Base, Subtype, Type
+from pokemontcg.sort_keys import number_sort_key
+
+
+def make_card(card_id, set_id="base1", **fields):
+    card = {
+        "id": card_id,
+        "name": "Charmander",
+        "supertype": "Pokémon",
+        "subtypes": ["Basic"],
+        "hp": "50",
+        "types": ["Fire"],
+        "number": card_id.split("-")[-1],
+        "rarity": "Common",
+        "attacks": [
+            {"name": "Scratch", "cost": ["Colorless"], "convertedEnergyCost": 1, "damage": "10", "text": ""},
+            {"name": "Ember", "cost": ["Fire", "Colorless"], "convertedEnergyCost": 2, "damage": "30", "text": "Discard 1 Fire Energy."},
+        ],
+        "weaknesses": [{"type": "Water", "value": "×2"}],
+        "retreatCost": ["Colorless"],
+        "convertedRetreatCost": 1,
+        "legalities": {"unlimited": "Legal"},
+        "images": {"small": f"https://images.test/{card_id}.png"},
+        "set": {"id": set_id},
+    }
+    card.update(fields)
+    return card
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cards.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Type.__table__.insert(), [{"name": "Fire"}, {"name": "Water"}])
+        conn.execute(Subtype.__table__.insert(), [{"name": "Basic"}, {"name": "Stage 1"}])
+    yield engine
+    engine.dispose()
+
+
+def rows(engine, sql, **params):
+    with engine.connect() as conn:
+        return [tuple(row) for row in conn.execute(text(sql), params)]
+
+
+def write(writer, cards, release_date="1999/01/09"):
+    return writer.write((card, card["set"]["id"], release_date) for card in cards)
+
+
+def test_write_inserts_cards_and_children(engine):
+    writer = CardWriter(engine, include_pricing=False)
+    changes = write(writer, [make_card("base1-4"), make_card("base1-46")])
+
+    assert changes.inserted == ["base1-4", "base1-46"]
+    assert changes.updated == []
+    assert rows(engine, "SELECT id, name, set_id, number_sort, hp_value, set_release_date FROM cards ORDER BY id") == [
+        ("base1-4", "Charmander", "base1", number_sort_key("4"), 50, "1999/01/09"),
+        ("base1-46", "Charmander", "base1", number_sort_key("46"), 50, "1999/01/09"),
+    ]
+    assert rows(engine, "SELECT name, converted_energy_cost FROM attacks WHERE card_id = 'base1-4' ORDER BY id") == [
+        ("Scratch", 1), ("Ember", 2)
+    ]
+    assert rows(engine, "SELECT type, value FROM weaknesses WHERE card_id = 'base1-4'") == [("Water", "×2")]
+    assert rows(engine, "SELECT type_name FROM card_types WHERE card_id = 'base1-4'") == [("Fire",)]
+    assert rows(engine, "SELECT subtype_name FROM card_subtypes WHERE card_id = 'base1-4'") == [("Basic",)]
+    assert json.loads(rows(engine, "SELECT retreat_cost FROM cards WHERE id = 'base1-4'")[0][0]) == ["Colorless"]
+
+
+def test_rewrite_updates_the_row_and_replaces_children(engine):
+    writer = CardWriter(engine, include_pricing=False)
+    write(writer, [make_card("base1-4"), make_card("base1-46")])
+
+    evolved = make_card(
+        "base1-4", name="Charmeleon", hp="80", subtypes=["Stage 1"], weaknesses=[],
+        attacks=[{"name": "Flamethrower", "cost": ["Fire"], "convertedEnergyCost": 1, "damage": "50"}]
+    )
+    changes = write(writer, [evolved])
+
+    assert changes.updated == ["base1-4"]
+    assert rows(engine, "SELECT name, hp_value FROM cards WHERE id = 'base1-4'") == [("Charmeleon", 80)]
+    assert rows(engine, "SELECT name FROM attacks WHERE card_id = 'base1-4'") == [("Flamethrower",)]
+    # Children the card no longer has are gone, not left behind
+    assert rows(engine, "SELECT * FROM weaknesses WHERE card_id = 'base1-4'") == []
+    assert rows(engine, "SELECT subtype_name FROM card_subtypes WHERE card_id = 'base1-4'") == [("Stage 1",)]
+    # Other cards in the table are untouched
+    assert len(rows(engine, "SELECT * FROM attacks WHERE card_id = 'base1-46'")) == 2
+    assert rows(engine, "SELECT COUNT(*) FROM cards") == [(2,)]
+
+
+def test_unknown_types_are_not_linked(engine):
+    writer = CardWriter(engine, include_pricing=False)
+    write(writer, [make_card("base1-4", types=["Fire", "Dragon"], subtypes=["Basic", "Basic"])])
+
+    assert rows(engine, "SELECT type_name FROM card_types") == [("Fire",)]
+    assert rows(engine, "SELECT subtype_name FROM card_subtypes") == [("Basic",)]
+
+
+def test_cards_with_unknown_types_are_linked_once_the_type_exists(engine):
+    writer = CardWriter(engine, include_pricing=False)
+    cards = [make_card("base1-4", types=["Fire", "Dragon"]), make_card("base1-46")]
+    write(writer, cards)
+    assert rows(engine, "SELECT id FROM cards WHERE content_hash IS NULL") == [("base1-4",)]
+
+    with engine.begin() as conn:
+        conn.execute(Type.__table__.insert(), [{"name": "Dragon"}])
+    changes = write(writer, cards)
+
+    assert changes.updated == ["base1-4"]
+    assert changes.unchanged == ["base1-46"]
+    assert rows(engine, "SELECT type_name FROM card_types WHERE card_id = 'base1-4' ORDER BY type_name") == [
+        ("Dragon",), ("Fire",)
+    ]
+    # Fully linked now, so the next sync skips it
+    assert write(writer, cards).unchanged == ["base1-4", "base1-46"]
+
+
+def test_card_listed_twice_keeps_its_last_version(engine):
+    writer = CardWriter(engine, include_pricing=False)
+    changes = write(writer, [make_card("base1-4"), make_card("base1-4", name="Charmeleon")])
+
+    assert changes.inserted == ["base1-4"]
+    assert rows(engine, "SELECT name FROM cards") == [("Charmeleon",)]
+    assert rows(engine, "SELECT COUNT(*) FROM attacks") == [(2,)]
+
+
+def test_pricing_columns(engine):
+    card = make_card(
+        "base1-4",
+        tcgplayer={"url": "https://tcg.test/4", "prices": {"normal": {"low": 1.0, "market": 2.5}}},
+        cardmarket={"url": "https://cm.test/4", "prices": {"averageSellPrice": 3.0, "trendPrice": 2.0}}
+    )
+    write(CardWriter(engine, include_pricing=True), [card])
+    assert rows(engine, "SELECT market_price, low_price, cardmarket_avg_price, cardmarket_trend_price FROM cards") == [
+        (2.5, 1.0, 3.0, 2.0)
+    ]
+
+
+def test_delete_missing_removes_unlisted_cards_of_the_listed_sets(engine):
+    writer = CardWriter(engine, include_pricing=False)
+    write(writer, [make_card("base1-4"), make_card("base1-46"), make_card("base2-4", set_id="base2")])
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO card_documents (card_id, set_id, summary, detail) VALUES ('base1-46', 'base1', '{}', '{}')"
+        ))
+        conn.execute(text("INSERT INTO card_variants (card_id, variant_type) VALUES ('base1-46', 'Normal')"))
+
+    changes = writer.delete_missing(["base1-4"], ["base1"])
+
+    assert changes.deleted == ["base1-46"]
+    assert rows(engine, "SELECT id FROM cards ORDER BY id") == [("base1-4",), ("base2-4",)]
+    for table in ("attacks", "weaknesses", "card_types", "card_subtypes", "card_documents", "card_variants"):
+        assert rows(engine, f"SELECT COUNT(*) FROM {table} WHERE card_id = 'base1-46'") == [(0,)]
+
+
+def test_delete_missing_across_all_sets(engine):
+    writer = CardWriter(engine, include_pricing=False)
+    write(writer, [make_card("base1-4"), make_card("base2-4", set_id="base2")])
+
+    assert writer.delete_missing(["base1-4"]).deleted == ["base2-4"]
+    assert rows(engine, "SELECT id FROM cards") == [("base1-4",)]
+
+
+def test_delete_missing_ignores_an_empty_listing(engine):
+    writer = CardWriter(engine, include_pricing=False)
+    write(writer, [make_card("base1-4")])
+
+    assert writer.delete_missing([], ["base1"]).deleted == []
+    assert rows(engine, "SELECT COUNT(*) FROM cards") == [(1,)]
+
+
+def test_unchanged_cards_are_skipped(engine):
+    writer = CardWriter(engine, include_pricing=False)
+    cards = [make_card("base1-4"), make_card("base1-46")]
+    write(writer, cards)
+    before = rows(engine, "SELECT id, synced_at, content_hash FROM cards ORDER BY id")
+    attack_ids = rows(engine, "SELECT id FROM attacks ORDER BY id")
+
+    changes = write(writer, copy.deepcopy(cards))
+
+    assert changes.unchanged == ["base1-4", "base1-46"]
+    assert changes.changed_ids() == []
+    # Nothing was rewritten: not the rows, not their children
+    assert rows(engine, "SELECT id, synced_at, content_hash FROM cards ORDER BY id") == before
+    assert rows(engine, "SELECT id FROM attacks ORDER BY id") == attack_ids
+
+
+def test_only_changed_cards_are_rewritten(engine):
+    writer = CardWriter(engine, include_pricing=False)
+    cards = [make_card("base1-4"), make_card("base1-46")]
+    write(writer, cards)
+
+    cards = copy.deepcopy(cards)
+    cards[1]["attacks"][0]["damage"] = "20"
+    changes = write(writer, cards + [make_card("base1-50")])
+
+    assert changes.unchanged == ["base1-4"]
+    assert changes.updated == ["base1-46"]
+    assert changes.inserted == ["base1-50"]
+    assert changes.changed_ids() == ["base1-50", "base1-46"]
+    assert rows(engine, "SELECT damage FROM attacks WHERE card_id = 'base1-46' AND name = 'Scratch'") == [("20",)]
+
+
+def test_hash_covers_the_set_and_pricing_mode(engine):
+    card = make_card("base1-4")
+    write(CardWriter(engine, include_pricing=False), [card])
+
+    assert write(CardWriter(engine, include_pricing=True), [card]).updated == ["base1-4"]
+    assert CardWriter(engine).write([(card, "base1a", None)]).updated == ["base1-4"]
+    assert rows(engine, "SELECT set_id FROM cards") == [("base1a",)]
+
+
+def test_content_hash_ignores_key_order():
+    card = make_card("base1-4")
+    reordered = dict(reversed(list(card.items())))
+    assert content_hash(card, "base1") == content_hash(reordered, "base1")
+    assert content_hash(card, "base1") != content_hash(card, "base1", include_pricing=False)
+
+
+def test_cleared_hashes_are_rewritten(engine):
+    writer = CardWriter(engine, include_pricing=False)
+    cards = [make_card("base1-4"), make_card("base1-46"), make_card("base2-4", set_id="base2")]
+    write(writer, cards)
+
+    writer.clear_hashes(card_ids=["base1-4"])
+    assert write(writer, cards).updated == ["base1-4"]
+
+    writer.clear_hashes(set_ids=["base2"])
+    changes = write(writer, cards)
+    assert changes.updated == ["base2-4"]
+    assert changes.unchanged == ["base1-4", "base1-46"]
+
+
+def test_changed_ids_include_deletions(engine):
+    writer = CardWriter(engine, include_pricing=False)
+    write(writer, [make_card("base1-4"), make_card("base1-46")])
+
+    assert writer.delete_missing(["base1-4"], ["base1"]).changed_ids() == ["base1-46"]
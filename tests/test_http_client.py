@@ -0,0 +1,287 @@
+"""
+Pokemon TCG API client: retries, backoff and Retry-After handling, and the
+concurrent page fetcher with its adaptive rate limiter, against an
+httpx.MockTransport standing in for the API
+"""
+import asyncio
+import random
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+
+from pokemontcg.config import MAX_RETRY_AFTER
+from pokemontcg.http_client import (
+    APIClient, AdaptiveRateLimiter, backoff_seconds, fetch_pages, query_url, retry_after_seconds
+)
+
+
+def scripted(*responses):
+    """Transport answering each request with the next of responses (a status or an exception)"""
+    requests = []
+    remaining = list(responses)
+
+    def handler(request):
+        requests.append(request)
+        response = remaining.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        status, headers = response if isinstance(response, tuple) else (response, {})
+        body = {"data": [], "page": len(requests)} if status == 200 else {"error": status}
+        return httpx.Response(status, json=body, headers=headers)
+
+    return httpx.MockTransport(handler), requests
+
+
+def make_client(transport, max_retries=3):
+    sleeps = []
+    client = APIClient(
+        base_url="https://api.test/v2", api_key="key", max_retries=max_retries,
+        retry_delay=1, rate_limit_delay=0, transport=transport, sleep=sleeps.append
+    )
+    return client, sleeps
+
+
+def test_success_sends_api_key_and_encoded_query():
+    transport, requests = scripted(200)
+    client, sleeps = make_client(transport)
+
+    assert client.get_json("cards", {"q": "name:Mr. Mime", "page": 2}) == {"data": [], "page": 1}
+    assert requests[0].headers["X-Api-Key"] == "key"
+    assert requests[0].url.raw_path == b"/v2/cards?q=name%3AMr.%20Mime&page=2"
+    assert sleeps == []
+    assert client.stats.requests == 1
+
+
+def test_server_errors_are_retried_with_exponential_backoff():
+    transport, requests = scripted(503, 502, 200)
+    client, sleeps = make_client(transport)
+
+    assert client.get_json("sets") is not None
+    assert len(requests) == 3
+    assert sleeps == [1, 2]
+    assert client.stats.retries == 2
+    assert client.stats.failures == 0
+
+
+def test_rate_limit_without_retry_after_backs_off_harder():
+    transport, _ = scripted(429, 429, 200)
+    client, sleeps = make_client(transport)
+
+    assert client.get_json("sets") is not None
+    assert sleeps == [1, 3]
+
+
+def test_retry_after_seconds_is_honoured():
+    transport, _ = scripted((429, {"Retry-After": "7"}), 200)
+    client, sleeps = make_client(transport)
+
+    assert client.get_json("sets") is not None
+    assert sleeps == [7.0]
+
+
+def test_retry_after_is_capped():
+    transport, _ = scripted((503, {"Retry-After": str(MAX_RETRY_AFTER * 10)}), 200)
+    client, sleeps = make_client(transport)
+
+    assert client.get_json("sets") is not None
+    assert sleeps == [MAX_RETRY_AFTER]
+
+
+def test_retry_after_http_date():
+    now = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    response = httpx.Response(429, headers={"Retry-After": "Mon, 01 Jan 2024 12:00:30 GMT"})
+    assert retry_after_seconds(response, now=now) == 30.0
+
+    past = httpx.Response(429, headers={"Retry-After": "Mon, 01 Jan 2024 11:00:00 GMT"})
+    assert retry_after_seconds(past, now=now) == 0.0
+
+    assert retry_after_seconds(httpx.Response(429, headers={"Retry-After": "soon"})) is None
+    assert retry_after_seconds(httpx.Response(429)) is None
+
+
+def test_backoff_without_response():
+    assert [backoff_seconds(attempt, None, 2) for attempt in range(3)] == [2, 4, 8]
+
+
+def test_client_errors_fail_without_retrying():
+    transport, requests = scripted(404)
+    client, sleeps = make_client(transport)
+
+    assert client.get_json("cards/nope") is None
+    assert len(requests) == 1
+    assert sleeps == []
+    assert client.stats.failures == 1
+
+
+def test_transport_errors_are_retried():
+    transport, requests = scripted(httpx.ConnectError("refused"), httpx.ReadTimeout("slow"), 200)
+    client, sleeps = make_client(transport)
+
+    assert client.get_json("sets") is not None
+    assert len(requests) == 3
+    assert sleeps == [1, 2]
+
+
+def test_gives_up_after_max_retries():
+    transport, requests = scripted(500, 500, 500)
+    client, sleeps = make_client(transport)
+
+    assert client.get_json("sets") is None
+    assert len(requests) == 3
+    # No wait after the last attempt
+    assert sleeps == [1, 2]
+    assert client.stats.failures == 1
+
+
+def test_query_url():
+    assert query_url("cards") == "cards"
+    assert query_url("cards", {"q": "set.id:base1", "pageSize": 250}) == "cards?q=set.id%3Abase1&pageSize=250"
+
+
+@pytest.mark.parametrize("status", [408, 425, 429, 500, 502, 503, 504])
+def test_every_retry_status_is_retried(status):
+    transport, requests = scripted(status, 200)
+    client, _ = make_client(transport)
+
+    assert client.get_json("sets") is not None
+    assert len(requests) == 2
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_limiter_increases_additively_up_to_max():
+    limiter = AdaptiveRateLimiter(rate=2, min_rate=0.5, max_rate=3, increase=0.25)
+    for _ in range(3):
+        limiter.on_success()
+    assert limiter.rate == 2.75
+    for _ in range(10):
+        limiter.on_success()
+    assert limiter.rate == 3
+
+
+def test_limiter_halves_once_per_slot_on_throttle():
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(rate=8, min_rate=0.5, max_rate=20, clock=clock)
+
+    limiter.on_throttle()
+    # Requests in flight together fail together: one decrease per slot
+    limiter.on_throttle()
+    limiter.on_throttle()
+    assert limiter.rate == 4
+
+    clock.now += 1 / limiter.rate
+    limiter.on_throttle()
+    assert limiter.rate == 2
+
+    for _ in range(10):
+        clock.now += 10
+        limiter.on_throttle()
+    assert limiter.rate == 0.5
+
+
+def test_limiter_retry_after_pauses_every_request(monkeypatch):
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(rate=10, clock=clock)
+    limiter.on_throttle(pause=5)
+    assert limiter.paused_until == clock.now + 5
+
+    waits = []
+
+    async def sleep(seconds):
+        waits.append(seconds)
+
+    async def acquire_two():
+        monkeypatch.setattr(asyncio, "sleep", sleep)
+        await limiter.acquire()
+        await limiter.acquire()
+        monkeypatch.undo()
+
+    asyncio.run(acquire_two())
+    # Slots resume after the pause, 1/rate apart
+    assert waits == pytest.approx([5, 5 + 1 / limiter.rate])
+
+
+def page_transport(total_pages, throttled=(), missing=()):
+    """Async stand-in for /cards: pages finish in random order, throttled pages answer 429 once"""
+    requests = []
+    pending_throttle = set(throttled)
+
+    async def handler(request):
+        page = int(request.url.params["page"])
+        requests.append(page)
+        await asyncio.sleep(random.uniform(0, 0.01))
+        if page in pending_throttle:
+            pending_throttle.discard(page)
+            return httpx.Response(429)
+        if page in missing:
+            return httpx.Response(404)
+        return httpx.Response(200, json={"data": [{"id": f"card-{page}"}], "page": page})
+
+    return httpx.MockTransport(handler), requests
+
+
+def fetch_options(limiter=None):
+    return {
+        "base_url": "https://api.test/v2",
+        "retry_delay": 0,
+        "limiter": limiter or AdaptiveRateLimiter(rate=1000, min_rate=1, max_rate=2000)
+    }
+
+
+def test_fetch_pages_yields_in_page_order():
+    random.seed(22)
+    transport, requests = page_transport(40)
+    pages = list(fetch_pages(
+        "cards", {"pageSize": 1}, range(1, 41), concurrency=8,
+        transport=transport, client_options=fetch_options()
+    ))
+
+    assert [page for page, _ in pages] == list(range(1, 41))
+    assert all(data["page"] == page for page, data in pages)
+    assert sorted(requests) == list(range(1, 41))
+
+
+def test_fetch_pages_yields_none_for_failed_pages():
+    transport, _ = page_transport(5, missing={3})
+    pages = dict(fetch_pages(
+        "cards", {}, range(1, 6), concurrency=2,
+        transport=transport, client_options=fetch_options()
+    ))
+
+    assert pages[3] is None
+    assert [page for page, data in pages.items() if data] == [1, 2, 4, 5]
+
+
+def test_fetch_pages_backs_off_on_429_and_retries():
+    limiter = AdaptiveRateLimiter(rate=1000, min_rate=1, max_rate=1000, increase=0)
+    transport, requests = page_transport(10, throttled={4})
+    pages = list(fetch_pages(
+        "cards", {}, range(1, 11), concurrency=4,
+        transport=transport, client_options=fetch_options(limiter)
+    ))
+
+    # The throttled page was retried and came back in its place
+    assert [page for page, data in pages if data] == list(range(1, 11))
+    assert requests.count(4) == 2
+    # Multiplicative decrease (no increase configured to undo it)
+    assert limiter.rate == 500
+
+
+def test_fetch_pages_stops_when_the_consumer_does():
+    transport, requests = page_transport(100)
+    pages = fetch_pages(
+        "cards", {}, range(1, 101), concurrency=2,
+        transport=transport, client_options=fetch_options()
+    )
+    assert [page for page, _ in (next(pages), next(pages))] == [1, 2]
+    pages.close()
+
+    # At most 2 * concurrency pages were fetched ahead of the consumer
+    assert len(requests) <= 2 + 2 * 2
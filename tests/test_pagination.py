@@ -0,0 +1,140 @@
+"""
+Keyset (cursor) pagination: cursor tokens and the WHERE fragment that
+continues a sort after the last row of a page
+"""
+import sqlite3
+
+import pytest
+
+from pokemontcg.pagination import (
+    InvalidCursor, encode_cursor, decode_cursor, order_by_sql, select_keys_sql,
+    pop_key_values, keyset_sql
+)
+
+# id, name, hp (NULL for trainers), rarity_rank (NULL when unknown)
+CARDS = [
+    ("c01", "Pikachu", 60, 1),
+    ("c02", "Pikachu", 60, 2),
+    ("c03", "Pikachu", None, 1),
+    ("c04", "Bulbasaur", 70, None),
+    ("c05", "Bulbasaur", None, None),
+    ("c06", "Charmander", 50, 3),
+    ("c07", "Charmander", 50, 3),
+    ("c08", "Potion", None, 1),
+    ("c09", "Switch", None, None),
+    ("c10", "Squirtle", 60, 2),
+    ("c11", "Squirtle", 70, 1),
+]
+
+SORTS = {
+    "name-asc": [("c.name", "ASC"), ("c.id", "ASC")],
+    "hp-asc": [("c.hp", "ASC"), ("c.name", "ASC"), ("c.id", "ASC")],
+    "hp-desc": [("c.hp", "DESC"), ("c.name", "ASC"), ("c.id", "ASC")],
+    "rarity-desc": [("c.rarity_rank", "DESC"), ("c.name", "DESC"), ("c.id", "ASC")],
+    "null-first": [("c.hp IS NULL", "DESC"), ("c.hp", "ASC"), ("c.id", "ASC")],
+}
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE cards (id TEXT PRIMARY KEY, name TEXT, hp INTEGER, rarity_rank INTEGER)")
+    conn.executemany("INSERT INTO cards VALUES (?, ?, ?, ?)", CARDS)
+    yield conn
+    conn.close()
+
+
+def offset_pages(conn, keys, page_size):
+    """Every page of a sort, read with LIMIT/OFFSET"""
+    pages = []
+    offset = 0
+    while True:
+        rows = conn.execute(
+            f"SELECT c.id FROM cards c {order_by_sql(keys)} LIMIT ? OFFSET ?", (page_size, offset)
+        ).fetchall()
+        if not rows:
+            return pages
+        pages.append([row["id"] for row in rows])
+        offset += page_size
+
+
+def keyset_pages(conn, sort, keys, page_size):
+    """Every page of a sort, each continued from the previous page's cursor"""
+    pages = []
+    cursor = None
+    while True:
+        where_sql, params = "1=1", []
+        if cursor:
+            where_sql, params = keyset_sql(keys, decode_cursor(cursor, sort, len(keys)))
+        rows = conn.execute(
+            f"SELECT c.id, {select_keys_sql(keys)} FROM cards c WHERE {where_sql} "
+            f"{order_by_sql(keys)} LIMIT ?",
+            params + [page_size]
+        ).fetchall()
+        if not rows:
+            return pages
+        rows = [dict(row) for row in rows]
+        cursor = encode_cursor(sort, pop_key_values(rows[-1], keys))
+        pages.append([row["id"] for row in rows])
+
+
+def test_cursor_round_trip():
+    token = encode_cursor("hp-desc", [None, "Pikachu", "c03"])
+    assert "=" not in token
+    assert decode_cursor(token, "hp-desc", 3) == [None, "Pikachu", "c03"]
+
+
+def test_cursor_for_another_sort_is_rejected():
+    token = encode_cursor("hp-desc", [60, "Pikachu", "c01"])
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, "hp-asc", 3)
+
+
+@pytest.mark.parametrize("token", ["not a cursor", "", encode_cursor("hp-desc", [60, "c01"])])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, "hp-desc", 3)
+
+
+def test_pop_key_values_strips_sort_key_columns():
+    keys = SORTS["hp-asc"]
+    row = {"id": "c01", "sort_key_0": 60, "sort_key_1": "Pikachu", "sort_key_2": "c01"}
+    assert pop_key_values(row, keys) == [60, "Pikachu", "c01"]
+    assert row == {"id": "c01"}
+
+
+@pytest.mark.parametrize("sort", sorted(SORTS))
+@pytest.mark.parametrize("page_size", [1, 2, 3, 5, 20])
+def test_keyset_pages_match_offset_pages(conn, sort, page_size):
+    keys = SORTS[sort]
+    assert keyset_pages(conn, sort, keys, page_size) == offset_pages(conn, keys, page_size)
+
+
+@pytest.mark.parametrize("sort", sorted(SORTS))
+def test_keyset_continues_after_every_row(conn, sort):
+    keys = SORTS[sort]
+    ordered = [
+        dict(row) for row in
+        conn.execute(f"SELECT c.id, {select_keys_sql(keys)} FROM cards c {order_by_sql(keys)}").fetchall()
+    ]
+    for position, row in enumerate(ordered):
+        where_sql, params = keyset_sql(keys, pop_key_values(row, keys))
+        after = conn.execute(
+            f"SELECT c.id FROM cards c WHERE {where_sql} {order_by_sql(keys)}", params
+        ).fetchall()
+        assert [r["id"] for r in after] == [r["id"] for r in ordered[position + 1:]]
+
+
+def test_null_leading_key_ascending_has_no_index_bound():
+    # Ascending NULLs sort first, so there is no lower bound to seek to
+    sql, params = keyset_sql(SORTS["hp-asc"], [None, "Bulbasaur", "c05"])
+    assert sql.startswith("((")
+    assert params == ["Bulbasaur", "Bulbasaur", "c05"]
+
+
+def test_null_leading_key_descending_stays_in_the_null_block():
+    # Descending NULLs sort last: only rows still inside the NULL block follow
+    sql, params = keyset_sql(SORTS["hp-desc"], [None, "Bulbasaur", "c05"])
+    assert sql.startswith("(c.hp) IS NULL AND ")
+    assert params == ["Bulbasaur", "Bulbasaur", "c05"]